@@ -183,10 +183,46 @@ DJMAIL_SEND_ASYNC = True
 DJMAIL_MAX_RETRY_NUMBER = 3
 DJMAIL_TEMPLATE_EXTENSION = "jinja"
 
+# Permissions cache: share the memberships permissions data between requests. It is
+# only used if PERMISSIONS_CACHE is shared by all the processes (not local memory).
+PERMISSIONS_CACHE_ENABLED = False
+PERMISSIONS_CACHE = "default" # Cache alias
+PERMISSIONS_CACHE_TIMEOUT = 60*60 # In seconds
+
+# History values cache: share the names of statuses, points, priorities... resolved
+# for the history entries between requests (0 = only memoized inside each request
+# or task). The renames are visible in the new entries after this timeout.
+HISTORY_VALUES_CACHE_TIMEOUT = 0 # In seconds
+HISTORY_VALUES_MEMO_SIZE = 10000 # Values of every type memoized inside each request or task
+
+# Markdown render cache: the renders are cached in a LRU in the memory of every
+# process in front of a (shared) cache. The version of the project (changed when
+# its wiki pages or references change) is kept in memory some seconds.
+MDRENDER_CACHE = "default" # Cache alias
+MDRENDER_CACHE_TIMEOUT = 60*60*24*7 # In seconds
+MDRENDER_LOCAL_CACHE_SIZE = 1024 # Items
+MDRENDER_VERSION_TIMEOUT = 5 # In seconds
+MDRENDER_POOL_SIZE = 16 # Idle Markdown converters kept by every process
+
+# Token authentication cache: share the verified tokens and their users between
+# requests (0 = disabled). The changes of the users discard their cached tokens.
+# It is only used if AUTH_TOKEN_CACHE is shared by all the processes (not local memory).
+AUTH_TOKEN_CACHE = "default" # Cache alias
+AUTH_TOKEN_CACHE_TIMEOUT = 60 # In seconds
+# Buffer the last login of the users authenticated by token in LAST_LOGIN_CACHE and
+# save them in batches at most every these seconds (0 = save them in the request).
+# It is only used if the cache is shared by all the processes (not local memory).
+# Run the "flush_last_logins" command periodically (e.g. every minute with cron) to
+# save them also when there are no requests.
+LAST_LOGIN_CACHE = "default" # Cache alias
+LAST_LOGIN_FLUSH_INTERVAL = 0 # In seconds
+
 # Events backend
 EVENTS_PUSH_BACKEND = "taiga.events.backends.postgresql.EventsPushBackend"
 # EVENTS_PUSH_BACKEND = "taiga.events.backends.rabbitmq.EventsPushBackend"
 # EVENTS_PUSH_BACKEND_OPTIONS = {"url": "//guest:guest@127.0.0.1/"}
+# Use "batch": True in the backend options to send all the events of a transaction together
+# EVENTS_PUSH_BACKEND_OPTIONS = {"url": "//guest:guest@127.0.0.1/", "batch": True}
 
 # Message System
 MESSAGE_STORAGE = "django.contrib.messages.storage.session.SessionStorage"
@@ -262,6 +298,7 @@ TEMPLATES = [
 MIDDLEWARE_CLASSES = [
     "taiga.base.middleware.cors.CoorsMiddleware",
     "taiga.events.middleware.SessionIDMiddleware",
+    "taiga.projects.history.middleware.HistoryValuesMemoMiddleware",
 
     # Common middlewares
     "django.middleware.common.CommonMiddleware",
@@ -509,6 +546,8 @@ THUMBNAIL_ALIASES = {
     },
 }
 
+ATTACHMENT_THUMBNAILS_WORKERS = 2   # threads generating the attachment thumbnails without celery
+
 TAGS_PREDEFINED_COLORS = ["#fce94f", "#edd400", "#c4a000", "#8ae234",
                           "#73d216", "#4e9a06", "#d3d7cf", "#fcaf3e",
                           "#f57900", "#ce5c00", "#729fcf", "#3465a4",
@@ -529,6 +568,19 @@ STATS_CACHE_TIMEOUT = 60*60  # In second
 # collapsed during that interval
 CHANGE_NOTIFICATIONS_MIN_INTERVAL = 0 #seconds
 
+# Emails of the change notifications sent through each connection of the email backend
+CHANGE_NOTIFICATIONS_SEND_BATCH_SIZE = 50
+# >1 the batches of emails will be sent in parallel by this number of threads
+CHANGE_NOTIFICATIONS_SEND_WORKERS = 1
+
+# 0 project totals (fans and activity) will be refreshed after every timeline change
+# >0 the refreshes of the same project will be coalesced in one per interval (with
+# celery the coalescing between processes needs a shared cache as default cache)
+PROJECT_TOTALS_REFRESH_INTERVAL = 0 #seconds
+
+# Distance between the orders of the elements after the rebalance_orders command
+ORDER_REBALANCE_STEP = 1000
+
 
 # List of functions called for filling correctly the ProjectModulesConfig associated to a project
 # This functions should receive a Project parameter and return a dict with the desired configuration
@@ -544,9 +596,18 @@ BITBUCKET_VALID_ORIGIN_IPS = ["131.103.20.165", "131.103.20.166", "104.192.143.1
 GITLAB_VALID_ORIGIN_IPS = []
 
 EXPORTS_TTL = 60 * 60 * 24  # 24 hours
+EXPORT_RENDER_WORKERS = 4 # Threads rendering the big sections of a dump (1 = render them sequentially)
+IMPORT_BULK_BATCH_SIZE = 500 # Objects created with every bulk insert when loading a dump
 
 CELERY_ENABLED = False
 WEBHOOKS_ENABLED = False
+WEBHOOKS_REQUEST_TIMEOUT = 10 # In seconds
+WEBHOOKS_MAX_RETRIES = 2 # Retries of the connection errors and the 502, 503 and 504 responses
+WEBHOOKS_RETRY_BACKOFF = 0.5 # In seconds, doubled after every retry
+WEBHOOKS_DELIVERY_WORKERS = 4 # Concurrent deliveries of the same event
+WEBHOOKS_MAX_CONCURRENCY_PER_HOST = 2
+WEBHOOKS_POOL_CONNECTIONS = 10 # Hosts with a pool of keep-alive connections
+WEBHOOKS_POOL_MAXSIZE = 10 # Keep-alive connections per host
 
 
 # If is True /front/sitemap.xml show a valid sitemap of taiga-front client
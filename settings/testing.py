@@ -20,6 +20,12 @@ from .development import *
 
 CELERY_ENABLED = False
 
+# Some tests disconnect the signals that invalidate it
+PERMISSIONS_CACHE_ENABLED = False
+
+# The data of the tests is not visible from the connections of other threads
+EXPORT_RENDER_WORKERS = 1
+
 MEDIA_ROOT = "/tmp"
 
 EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
@@ -37,9 +37,8 @@ fraudulent modifications.
 import re
 
 from django.conf import settings
-from django.utils import timezone
-from datetime import timedelta
 from taiga.base.api.authentication import BaseAuthentication
+from taiga.users.services import register_last_login
 
 from .tokens import get_user_for_token
 
@@ -86,11 +85,8 @@ class Token(BaseAuthentication):
         token = token_rx_match.group(1)
         max_age_auth_token = getattr(settings, "MAX_AGE_AUTH_TOKEN", None)
         user = get_user_for_token(token, "authentication",
-                                  max_age=max_age_auth_token)
-
-        if user.last_login is None or user.last_login < (timezone.now() - timedelta(minutes=1)):
-            user.last_login = timezone.now()
-            user.save(update_fields=["last_login"])
+                                  max_age=max_age_auth_token, use_cache=True)
+        register_last_login(user)
 
         return (user, token)
 
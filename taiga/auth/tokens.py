@@ -17,11 +17,19 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from django.contrib.auth import get_user_model
 from taiga.base import exceptions as exc
+from taiga.base.utils.cache import is_shared_cache
 
 from django.apps import apps
+from django.conf import settings
 from django.core import signing
+from django.core.cache import caches
+from django.db import connection
 from django.utils.translation import ugettext as _
 
+import hashlib
+import time
+import uuid
+
 
 def get_token_for_user(user, scope):
     """
@@ -32,7 +40,28 @@ def get_token_for_user(user, scope):
     return signing.dumps(data)
 
 
-def get_user_for_token(token, scope, max_age=None):
+def _load_token(token, scope, max_age=None):
+    try:
+        data = signing.loads(token, max_age=max_age)
+    except signing.BadSignature:
+        raise exc.NotAuthenticated(_("Invalid token"))
+
+    try:
+        return data["user_%s_id" % (scope)]
+    except KeyError:
+        raise exc.NotAuthenticated(_("Invalid token"))
+
+
+def _get_user(user_id):
+    model_cls = get_user_model()
+
+    try:
+        return model_cls.objects.get(pk=user_id)
+    except model_cls.DoesNotExist:
+        raise exc.NotAuthenticated(_("Invalid token"))
+
+
+def get_user_for_token(token, scope, max_age=None, use_cache=False):
     """
     Given a selfcontained token and a scope try to parse and
     unsign it.
@@ -42,17 +71,77 @@ def get_user_for_token(token, scope, max_age=None):
     If token passes a validation, returns
     a user instance corresponding with user_id stored
     in the incoming token.
+
+    If use_cache is True the verified tokens and their users are
+    shared between requests for AUTH_TOKEN_CACHE_TIMEOUT seconds.
     """
-    try:
-        data = signing.loads(token, max_age=max_age)
-    except signing.BadSignature:
-        raise exc.NotAuthenticated(_("Invalid token"))
+    if not use_cache or not _is_tokens_cache_enabled():
+        return _get_user(_load_token(token, scope, max_age=max_age))
 
-    model_cls = get_user_model()
+    tokens_cache = _get_tokens_cache()
+    key = "auth:token:{}:{}".format(scope, hashlib.sha1(token.encode("utf-8")).hexdigest())
 
-    try:
-        user = model_cls.objects.get(pk=data["user_%s_id" % (scope)])
-    except (model_cls.DoesNotExist, KeyError):
-        raise exc.NotAuthenticated(_("Invalid token"))
-    else:
-        return user
+    cached = tokens_cache.get(key)
+    if cached is not None and cached["version"] == _get_user_tokens_version(cached["user_id"]):
+        return cached["user"]
+
+    user_id = _load_token(token, scope, max_age=max_age)
+    # The version is read before the user so a change saved in the middle
+    # discards this entry
+    version = _get_user_tokens_version(user_id)
+    user = _get_user(user_id)
+
+    cache_timeout = settings.AUTH_TOKEN_CACHE_TIMEOUT
+    if max_age is not None:
+        # Don't keep the token in the cache after its expiration
+        timestamp = signing.b62_decode(token.rsplit(":", 2)[1])
+        cache_timeout = min(cache_timeout, int(timestamp + max_age - time.time()))
+
+    if cache_timeout > 0:
+        tokens_cache.set(key, {"user_id": user_id, "user": user, "version": version}, cache_timeout)
+
+    return user
+
+
+######################################################################
+# Shared (cross request) cache of the verified tokens
+######################################################################
+
+def _get_tokens_cache():
+    return caches[getattr(settings, "AUTH_TOKEN_CACHE", "default")]
+
+
+def _is_tokens_cache_enabled():
+    # The users changed by a process must be discarded for the rest
+    return getattr(settings, "AUTH_TOKEN_CACHE_TIMEOUT", 0) > 0 and is_shared_cache(_get_tokens_cache())
+
+
+def _get_user_version_key(user_id):
+    return "auth:user-version:{}".format(user_id)
+
+
+def _get_user_tokens_version(user_id):
+    tokens_cache = _get_tokens_cache()
+    key = _get_user_version_key(user_id)
+
+    version = tokens_cache.get(key)
+    if version is None:
+        tokens_cache.add(key, uuid.uuid4().hex, None)
+        version = tokens_cache.get(key)
+    return version
+
+
+def invalidate_user_tokens_cache(user_id):
+    """
+    Discard the cached tokens of a user (when it is changed, for example its
+    password or its active flag). It is done again on commit so no other
+    request can cache the user it was reading before the transaction ended.
+    """
+    if not _is_tokens_cache_enabled():
+        return
+
+    def _invalidate():
+        _get_tokens_cache().set(_get_user_version_key(user_id), uuid.uuid4().hex, None)
+
+    _invalidate()
+    connection.on_commit(_invalidate)
@@ -32,24 +32,30 @@ from taiga.base.utils.db import to_tsquery
 logger = logging.getLogger(__name__)
 
 
+def get_member_projects_subquery(user, permission, project_id=None):
+    """
+    Queryset with the ids of the projects where the user is admin or has the
+    permission through its role. It is meant to be used as a subquery
+    (`project_id__in=...`) so it is evaluated by the database instead of
+    loading all the user memberships.
+    """
+    membership_model = apps.get_model("projects", "Membership")
+    memberships_qs = membership_model.objects.filter(user=user)
+    if project_id:
+        memberships_qs = memberships_qs.filter(project_id=project_id)
+    memberships_qs = memberships_qs.filter(Q(role__permissions__contains=[permission]) |
+                                           Q(is_admin=True))
+    return memberships_qs.values("project_id")
+
+
 def get_filter_expression_can_view_projects(user, project_id=None):
     # Filter by user permissions
     if user.is_authenticated() and user.is_superuser:
         return Q()
     elif user.is_authenticated():
         # authenticated user & project member
-        membership_model = apps.get_model("projects", "Membership")
-        memberships_qs = membership_model.objects.filter(user=user)
-        if project_id:
-            memberships_qs = memberships_qs.filter(project_id=project_id)
-        memberships_qs = memberships_qs.filter(
-            Q(role__permissions__contains=['view_project']) |
-            Q(is_admin=True))
-
-        projects_list = [membership.project_id for membership in
-                         memberships_qs]
-
-        return (Q(id__in=projects_list) |
+        projects_qs = get_member_projects_subquery(user, "view_project", project_id=project_id)
+        return (Q(id__in=projects_qs) |
                 Q(public_permissions__contains=["view_project"]))
     else:
         # external users / anonymous
@@ -164,16 +170,8 @@ class PermissionBasedFilterBackend(FilterBackend):
         if request.user.is_authenticated() and request.user.is_superuser:
             qs = qs
         elif request.user.is_authenticated():
-            membership_model = apps.get_model('projects', 'Membership')
-            memberships_qs = membership_model.objects.filter(user=request.user)
-            if project_id:
-                memberships_qs = memberships_qs.filter(project_id=project_id)
-            memberships_qs = memberships_qs.filter(Q(role__permissions__contains=[self.permission]) |
-                                                   Q(is_admin=True))
-
-            projects_list = [membership.project_id for membership in memberships_qs]
-
-            qs = qs.filter(Q(project_id__in=projects_list) |
+            projects_qs = get_member_projects_subquery(request.user, self.permission, project_id=project_id)
+            qs = qs.filter(Q(project_id__in=projects_qs) |
                            Q(project__public_permissions__contains=[self.permission]))
         else:
             qs = qs.filter(project__anon_permissions__contains=[self.permission])
@@ -254,6 +252,23 @@ class CanViewWikiAttachmentFilterBackend(PermissionBasedAttachmentFilterBackend)
 class MembersFilterBackend(PermissionBasedFilterBackend):
     permission = "view_project"
 
+    def _filter_by_member_projects(self, qs, user, project):
+        project_id = project.id if project else None
+        projects_qs = get_member_projects_subquery(user, self.permission, project_id=project_id)
+
+        if project:
+            has_project_public_view_permission = "view_project" in project.public_permissions
+            if not has_project_public_view_permission and not projects_qs.exists():
+                qs = qs.none()
+
+        q = Q(memberships__project_id__in=projects_qs) | Q(id=user.id)
+
+        # If there is no selected project we want access to users from public projects
+        if not project:
+            q = q | Q(memberships__project__public_permissions__contains=[self.permission])
+
+        return qs.filter(q)
+
     def filter_queryset(self, request, queryset, view):
         project_id = None
         project = None
@@ -273,29 +288,7 @@ class MembersFilterBackend(PermissionBasedFilterBackend):
         if request.user.is_authenticated() and request.user.is_superuser:
             qs = qs
         elif request.user.is_authenticated():
-            Membership = apps.get_model('projects', 'Membership')
-            memberships_qs = Membership.objects.filter(user=request.user)
-            if project_id:
-                memberships_qs = memberships_qs.filter(project_id=project_id)
-            memberships_qs = memberships_qs.filter(Q(role__permissions__contains=[self.permission]) |
-                                                   Q(is_admin=True))
-
-            projects_list = [membership.project_id for membership in memberships_qs]
-
-            if project:
-                is_member = project.id in projects_list
-                has_project_public_view_permission = "view_project" in project.public_permissions
-                if not is_member and not has_project_public_view_permission:
-                    qs = qs.none()
-
-            q = Q(memberships__project_id__in=projects_list) | Q(id=request.user.id)
-
-            # If there is no selected project we want access to users from public projects
-            if not project:
-                q = q | Q(memberships__project__public_permissions__contains=[self.permission])
-
-            qs = qs.filter(q)
-
+            qs = self._filter_by_member_projects(qs, request.user, project)
         else:
             if project and "view_project" not in project.anon_permissions:
                 qs = qs.none()
@@ -326,9 +319,8 @@ class BaseIsProjectAdminFilterBackend(object):
         if project_id:
             memberships_qs = memberships_qs.filter(project_id=project_id)
 
-        projects_list = [membership.project_id for membership in memberships_qs]
-
-        return projects_list
+        # Evaluated as a subquery by the filters
+        return memberships_qs.values("project_id")
 
 
 class IsProjectAdminFilterBackend(FilterBackend, BaseIsProjectAdminFilterBackend):
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Examples:
+# python manage.py benchmark_mdrender
+# python manage.py benchmark_mdrender --iterations 500
+
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from markdown import Markdown
+
+import bleach
+
+from taiga.mdrender import service
+
+
+COMMENT = ("Fixed in the last deploy, @admin can you check it? The problem was in the "
+           "**permissions** of the `backlog` (see [[Home]]).\n")
+
+TEXTS = (
+    ("short", COMMENT),
+    ("medium", COMMENT * 10),
+    ("long", ("## Description\n\n" + COMMENT * 5 + "\n* one\n* two\n* three\n\n"
+              "```python\nprint('hello')\n```\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n") * 10),
+)
+
+
+def _convert_without_pool(project, text):
+    # The old implementation: a new converter (and extensions) for every text
+    md = Markdown(extensions=service._make_extensions_list(project=project))
+    md.extracted_data = {"mentions": [], "references": []}
+    return (bleach.clean(md.convert(text)), md.extracted_data)
+
+
+class Command(BaseCommand):
+    help = ('Compare the throughput of the markdown render (without cache) creating a new '
+            'converter for every text and using the pool of converters.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations',
+                            type=int,
+                            dest='iterations',
+                            default=200,
+                            help='Number of renders of every text')
+
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        Project = apps.get_model("projects", "Project")
+        # The references are not resolved, so the project is not saved
+        project = Project(id=0, slug="benchmark")
+        iterations = options["iterations"]
+
+        self.stdout.write("{:>8} {:>8} {:>10} {:>14}".format("text", "chars", "strategy", "renders/s"))
+
+        for name, text in TEXTS:
+            for strategy, convert in (("new", _convert_without_pool), ("pool", service._convert)):
+                # Warm up (the pool and the imports)
+                convert(project, text)
+
+                start = time.monotonic()
+                for i in range(iterations):
+                    convert(project, text)
+                elapsed = time.monotonic() - start
+
+                self.stdout.write("{:>8} {:>8} {:>10} {:>14.1f}".format(
+                    name, len(text), strategy, iterations / elapsed))
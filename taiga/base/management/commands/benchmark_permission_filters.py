@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Examples:
+# python manage.py benchmark_permission_filters
+# python manage.py benchmark_permission_filters --sizes 10 100 1000 --repeat 5
+
+import time
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db import transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from taiga.base.filters import get_member_projects_subquery
+from taiga.base.utils import json
+
+
+PERMISSION = "view_us"
+
+
+def _legacy_queryset(user, queryset):
+    # The old implementation: the projects ids are loaded in python and
+    # sent back to the database as a literal list
+    Membership = apps.get_model("projects", "Membership")
+    memberships_qs = Membership.objects.filter(user=user)
+    memberships_qs = memberships_qs.filter(Q(role__permissions__contains=[PERMISSION]) |
+                                           Q(is_admin=True))
+    projects_list = [membership.project_id for membership in memberships_qs]
+    return queryset.filter(Q(project_id__in=projects_list) |
+                           Q(project__public_permissions__contains=[PERMISSION]))
+
+
+def _subquery_queryset(user, queryset):
+    projects_qs = get_member_projects_subquery(user, PERMISSION)
+    return queryset.filter(Q(project_id__in=projects_qs) |
+                           Q(project__public_permissions__contains=[PERMISSION]))
+
+
+def _explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Planning Time"], plan[0]["Execution Time"]
+
+
+def _create_memberships(size):
+    Project = apps.get_model("projects", "Project")
+    Role = apps.get_model("users", "Role")
+    Membership = apps.get_model("projects", "Membership")
+
+    user = get_user_model().objects.create(username="benchmark-permissions-{}".format(size),
+                                           email="benchmark-permissions-{}@taiga.io".format(size))
+
+    now = timezone.now()
+    prefix = "benchmark-permissions-{}-{}".format(size, int(time.time()))
+    projects = Project.objects.bulk_create([
+        Project(name="{} {}".format(prefix, i), slug="{}-{}".format(prefix, i),
+                description="", created_date=now, modified_date=now,
+                anon_permissions=[], public_permissions=[])
+        for i in range(size)
+    ])
+    roles = Role.objects.bulk_create([
+        Role(name="Role", slug="role", project=project, permissions=[PERMISSION])
+        for project in projects
+    ])
+    Membership.objects.bulk_create([
+        Membership(user=user, project=project, role=role)
+        for project, role in zip(projects, roles)
+    ])
+    return user
+
+
+class Command(BaseCommand):
+    help = ('Compare the plan time and latency of the permission filters using the memberships '
+            'as a subquery and as a literal list of project ids. All the data is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes',
+                            nargs='+',
+                            type=int,
+                            dest='sizes',
+                            default=[10, 1000, 10000],
+                            help='Number of memberships of the benchmarked user')
+        parser.add_argument('--repeat',
+                            type=int,
+                            dest='repeat',
+                            default=3,
+                            help='Number of runs of every query (the best one is shown)')
+
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        UserStory = apps.get_model("userstories", "UserStory")
+
+        self.stdout.write("{:>10} {:>10} {:>14} {:>14} {:>14}".format(
+            "members", "strategy", "planning (ms)", "execution (ms)", "latency (ms)"))
+
+        for size in options["sizes"]:
+            with transaction.atomic():
+                user = _create_memberships(size)
+
+                for name, build_queryset in (("list", _legacy_queryset), ("subquery", _subquery_queryset)):
+                    results = []
+                    for i in range(options["repeat"]):
+                        start = time.monotonic()
+                        queryset = build_queryset(user, UserStory.objects.all())
+                        queryset.count()
+                        latency = (time.monotonic() - start) * 1000
+
+                        planning, execution = _explain(build_queryset(user, UserStory.objects.all()))
+                        results.append((planning, execution, latency))
+
+                    planning, execution, latency = min(results, key=lambda r: r[2])
+                    self.stdout.write("{:>10} {:>10} {:>14.2f} {:>14.2f} {:>14.2f}".format(
+                        size, name, planning, execution, latency))
+
+                transaction.set_rollback(True)
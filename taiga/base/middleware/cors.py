@@ -29,6 +29,7 @@ COORS_ALLOWED_HEADERS = ["content-type", "x-requested-with",
 COORS_ALLOWED_CREDENTIALS = True
 COORS_EXPOSE_HEADERS = ["x-pagination-count", "x-paginated", "x-paginated-by",
                         "x-pagination-current", "x-pagination-next", "x-pagination-prev",
+                        "x-pagination-next-after",
                         "x-site-host", "x-site-register"]
 
 COORS_EXTRA_EXPOSE_HEADERS = getattr(settings, "APP_EXTRA_EXPOSE_HEADERS", [])
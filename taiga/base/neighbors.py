@@ -18,9 +18,12 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from collections import namedtuple
+from functools import reduce
+import operator
 
 from django.db import connection
-from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
 from django.db.models.sql.datastructures import EmptyResultSet
 from taiga.base.api import serializers
 from taiga.base.fields import Field, MethodField
@@ -28,29 +31,117 @@ from taiga.base.fields import Field, MethodField
 Neighbor = namedtuple("Neighbor", "left right")
 
 
-def get_neighbors(obj, results_set=None):
-    """Get the neighbors of a model instance.
+def _get_ordering_field(query, opts, item):
+    """Get the `(field, descending)` of an `ordering` item of `query`, or None if it's not supported."""
+    if not isinstance(item, str) or item == "?":
+        return None
 
-    The neighbors are the objects that are at the left/right of `obj` in the results set.
+    descending = item.startswith("-")
+    name = item.lstrip("-")
+    if name == "pk":
+        name = opts.pk.name
 
-    :param obj: The object you want to know its neighbors.
-    :param results_set: Find the neighbors applying the constraints of this set (a Django queryset
-        object).
+    if "__" in name or name in query.annotations or name in query.extra:
+        return None
 
-    :return: Tuple `<left neighbor>, <right neighbor>`. Left and right neighbors can be `None`.
+    try:
+        field = opts.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+    # The project is the only supported relation (see `_get_keyset_ordering`)
+    if getattr(field, "attname", None) != "project_id" and (field.is_relation or not field.concrete):
+        return None
+
+    return (field, descending)
+
+
+def _get_keyset_ordering(results_set):
+    """Get the ordering of `results_set` as a list of `(attname, descending, nullable)`
+    tuples ending with the primary key, or None if it can't be used to seek the neighbors.
+
+    Only the concrete and not related fields of the model are supported, the
+    orderings by related fields, annotations, extra selects, expressions or
+    reversed querysets need the window query.
     """
-    if results_set is None:
-        results_set = type(obj).objects.get_queryset()
+    query = results_set.query
+    if query.extra_order_by or not query.standard_ordering:
+        return None
 
-    # Neighbors calculation is at least at project level
-    results_set = results_set.filter(project_id=obj.project.id)
+    opts = query.get_meta()
+    if query.order_by:
+        ordering = query.order_by
+    elif query.default_ordering:
+        ordering = opts.ordering
+    else:
+        ordering = []
+
+    keys = []
+    for item in ordering:
+        ordering_field = _get_ordering_field(query, opts, item)
+        if ordering_field is None:
+            return None
+
+        field, descending = ordering_field
+        # Neighbors calculation is at project level so its value is constant
+        if field.attname == "project_id":
+            continue
+
+        keys.append((field.attname, descending, field.null))
+        if field.primary_key:
+            return keys
+
+    keys.append((opts.pk.attname, False, False))
+    return keys
+
+
+def _get_next_neighbor(results_set, keys, values):
+    """Seek the first object of `results_set` after `values` in the `keys` ordering.
+
+    PostgreSQL sorts the NULL values as the largest ones, so they go last in
+    ascending order and first in descending order.
+    """
+    conditions = []
+    previous_are_equal = Q()
+    for (attname, descending, nullable), value in zip(keys, values):
+        if value is None:
+            after = Q(**{"{}__isnull".format(attname): False}) if descending else None
+            equal = Q(**{"{}__isnull".format(attname): True})
+        else:
+            after = Q(**{"{}__{}".format(attname, "lt" if descending else "gt"): value})
+            if nullable and not descending:
+                after |= Q(**{"{}__isnull".format(attname): True})
+            equal = Q(**{attname: value})
 
+        if after is not None:
+            conditions.append(previous_are_equal & after)
+        previous_are_equal &= equal
+
+    if not conditions:
+        return None
+
+    ordering = ["-{}".format(attname) if descending else attname for attname, descending, _ in keys]
+    return results_set.filter(reduce(operator.or_, conditions)).order_by(*ordering).first()
+
+
+def _get_neighbors_with_keyset(obj, results_set, keys):
+    rows = list(results_set.filter(pk=obj.pk).values_list(*[attname for attname, _, _ in keys]))
+    if not rows:
+        return None
+
+    values = rows[0]
+    reversed_keys = [(attname, not descending, nullable) for attname, descending, nullable in keys]
+    return Neighbor(_get_next_neighbor(results_set, reversed_keys, values),
+                    _get_next_neighbor(results_set, keys, values))
+
+
+def _get_neighbors_with_window(obj, results_set):
     compiler = results_set.query.get_compiler('default')
     try:
         base_sql, base_params = compiler.as_sql(with_col_aliases=True)
     except EmptyResultSet:
         # Generate a not empty queryset
-        results_set = type(obj).objects.get_queryset().filter(project_id=obj.project.id)
+        results_set = type(obj).objects.get_queryset().filter(project_id=obj.project_id)
         compiler = results_set.query.get_compiler('default')
         base_sql, base_params = compiler.as_sql(with_col_aliases=True)
 
@@ -88,6 +179,37 @@ def get_neighbors(obj, results_set=None):
     return Neighbor(left, right)
 
 
+def get_neighbors(obj, results_set=None):
+    """Get the neighbors of a model instance.
+
+    The neighbors are the objects that are at the left/right of `obj` in the results set.
+
+    When the results set is ordered by fields of the model the neighbors are
+    seeked with two queries that fetch only the row before and the one after `obj`
+    (with the primary key as the last ordering key). Otherwise, or if `obj` isn't in
+    the results set, a window query over the whole results set is used.
+
+    :param obj: The object you want to know its neighbors.
+    :param results_set: Find the neighbors applying the constraints of this set (a Django queryset
+        object).
+
+    :return: Tuple `<left neighbor>, <right neighbor>`. Left and right neighbors can be `None`.
+    """
+    if results_set is None:
+        results_set = type(obj).objects.get_queryset()
+
+    # Neighbors calculation is at least at project level
+    results_set = results_set.filter(project_id=obj.project_id)
+
+    keys = _get_keyset_ordering(results_set)
+    if keys is not None:
+        neighbors = _get_neighbors_with_keyset(obj, results_set, keys)
+        if neighbors is not None:
+            return neighbors
+
+    return _get_neighbors_with_window(obj, results_set)
+
+
 class NeighborSerializer(serializers.LightSerializer):
     id = Field()
     ref = Field()
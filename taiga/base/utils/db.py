@@ -25,6 +25,7 @@ from django.shortcuts import _get_queryset
 from . import functions
 
 import re
+import zlib
 
 
 def get_object_or_none(klass, *args, **kwargs):
@@ -161,6 +162,33 @@ def update_attr_in_bulk_for_ids(values, attr, model):
     transaction.on_commit(_run_sql)
 
 
+def get_advisory_lock_id(name: str) -> int:
+    """
+    Id of the postgres advisory lock used by `django_pglocks.advisory_lock`
+    for a lock name (its crc32 as a signed 32 bits integer).
+    """
+    pos = zlib.crc32(name.encode("utf-8"))
+    lock_id = (2**31 - 1) & pos
+    if pos & 2**31:
+        lock_id -= 2**31
+    return lock_id
+
+
+def advisory_xact_locks(names):
+    """
+    Take the postgres advisory locks of several names (the same ones of
+    `django_pglocks.advisory_lock`) with one query. They are taken in
+    order, to avoid deadlocks, and released at the end of the transaction.
+    """
+    lock_ids = sorted(set(get_advisory_lock_id(name) for name in names))
+    if not lock_ids:
+        return
+
+    sql = "SELECT pg_advisory_xact_lock(lock_id) FROM unnest(%s::bigint[]) AS lock_id"
+    cursor = connection.cursor()
+    cursor.execute(sql, [lock_ids])
+
+
 def to_tsquery(term):
     """
     Based on: https://gist.github.com/wolever/1a5ccf6396f00229b2dc
@@ -16,13 +16,17 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import logging
 import os
+import threading
+import time
 
 from psd_tools import PSDImage
 from django.db.models.fields.files import FieldFile
 
 from taiga.base.utils.urls import get_absolute_url
 
+from easy_thumbnails.alias import aliases
 from easy_thumbnails.files import get_thumbnailer
 from easy_thumbnails.exceptions import InvalidImageFormatError
 from PIL import Image
@@ -30,6 +34,8 @@ from PIL.PngImagePlugin import PngImageFile
 
 from io import BytesIO
 
+logger = logging.getLogger(__name__)
+
 # SVG thumbnail generator
 try:
     from cairosvg.surface import PNGSurface
@@ -68,20 +74,112 @@ def psd_image_factory(data, *args):
 Image.register_open("PSD", psd_image_factory)
 
 
-def get_thumbnail_url(file_obj, thumbnailer_size):
+# Images that the browsers show while their thumbnails aren't generated
+_PLACEHOLDER_EXTENSIONS = ("bmp", "gif", "jpeg", "jpg", "png", "webp")
+
+
+def _is_thumbnailable(file_obj):
     # Ugly hack to temporary ignore tiff files
     relative_name = file_obj
     if isinstance(file_obj, FieldFile):
         relative_name = file_obj.name
 
     source_extension = os.path.splitext(relative_name)[1][1:]
-    if source_extension == "tiff":
+    return source_extension != "tiff"
+
+
+def get_thumbnail_url(file_obj, thumbnailer_size, generate=True):
+    """
+    Return the absolute url of a thumbnail of `file_obj`.
+
+    With `generate=False` the source image is never opened: the url of an
+    already generated thumbnail is returned or, if it doesn't exist yet, the
+    url of the source image when browsers can show it (None otherwise).
+    """
+    if not _is_thumbnailable(file_obj):
         return None
 
+    thumbnailer = get_thumbnailer(file_obj)
     try:
-        path_url = get_thumbnailer(file_obj)[thumbnailer_size].url
-        thumb_url = get_absolute_url(path_url)
+        if generate:
+            thumbnail = thumbnailer[thumbnailer_size]
+        else:
+            thumbnail = thumbnailer.get_existing_thumbnail(aliases.get(thumbnailer_size))
     except InvalidImageFormatError:
-        thumb_url = None
-
-    return thumb_url
+        thumbnail = None
+
+    if thumbnail is not None:
+        return get_absolute_url(thumbnail.url)
+
+    source_extension = os.path.splitext(thumbnailer.name)[1][1:].lower()
+    if not generate and source_extension in _PLACEHOLDER_EXTENSIONS:
+        return get_absolute_url(thumbnailer.source_storage.url(thumbnailer.name))
+    return None
+
+
+class ThumbnailGenerationStats(object):
+    """
+    Counters and timings of the thumbnails generated by the current process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._sizes = {}
+
+    def add(self, thumbnailer_size, result, elapsed):
+        with self._lock:
+            stats = self._sizes.setdefault(thumbnailer_size, {"generated": 0, "invalid": 0, "failed": 0,
+                                                              "total_time": 0.0, "max_time": 0.0})
+            stats[result] += 1
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+
+    def as_dict(self):
+        with self._lock:
+            result = {}
+            for size, stats in self._sizes.items():
+                count = stats["generated"] + stats["invalid"] + stats["failed"]
+                result[size] = dict(stats, avg_time=stats["total_time"] / count if count else 0.0)
+            return result
+
+
+_stats = ThumbnailGenerationStats()
+
+
+def get_thumbnail_generation_stats():
+    """
+    Return the counters and timings (in seconds) by size of the thumbnails
+    generated by the current process.
+    """
+    return _stats.as_dict()
+
+
+def generate_thumbnails(file_obj, thumbnailer_sizes):
+    """
+    Generate (if needed) the thumbnails of `file_obj` for every size and
+    return a dict with their absolute urls (None for the failed ones).
+    """
+    if not _is_thumbnailable(file_obj):
+        return {size: None for size in thumbnailer_sizes}
+
+    thumbnailer = get_thumbnailer(file_obj)
+    urls = {}
+    for size in thumbnailer_sizes:
+        urls[size] = None
+        start = time.perf_counter()
+        try:
+            urls[size] = get_absolute_url(thumbnailer[size].url)
+            result = "generated"
+        except InvalidImageFormatError:
+            result = "invalid"
+        except Exception:
+            result = "failed"
+            logger.exception("Error generating the %s thumbnail of %s", size, thumbnailer.name)
+
+        elapsed = time.perf_counter() - start
+        _stats.add(size, result, elapsed)
+        logger.debug("Thumbnail %s of %s: %s in %.3fs", size, thumbnailer.name, result, elapsed)
+
+    return urls
@@ -21,10 +21,22 @@ from django.conf import settings
 
 
 class BaseEventsPushBackend(object, metaclass=abc.ABCMeta):
+    # If True, the events emitted on commit are collected during the
+    # transaction and sent together with `emit_events`
+    batch = False
+
     @abc.abstractmethod
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
         pass
 
+    def emit_events(self, messages, *, channel:str="events"):
+        """
+        Emit a list of `(routing_key, message)`. Backends able to send them
+        more efficiently than one by one should override it.
+        """
+        for routing_key, message in messages:
+            self.emit_event(message, routing_key=routing_key, channel=channel)
+
 
 def load_class(path):
     """
@@ -20,12 +20,19 @@ from . import base
 
 
 class EventsPushBackend(base.BaseEventsPushBackend):
-    @transaction.atomic
+    def __init__(self, batch=False):
+        self.batch = batch
+
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
-        routing_key = routing_key.replace(".", "__")
-        channel = "{channel}_{routing_key}".format(channel=channel,
-                                                   routing_key=routing_key)
-        sql = "NOTIFY {channel}, %s".format(channel=channel)
+        self.emit_events([(routing_key, message)], channel=channel)
+
+    @transaction.atomic
+    def emit_events(self, messages, *, channel:str="events"):
         cursor = connection.cursor()
-        cursor.execute(sql, [message])
+        for routing_key, message in messages:
+            routing_key = routing_key.replace(".", "__")
+            pg_channel = "{channel}_{routing_key}".format(channel=channel,
+                                                          routing_key=routing_key)
+            sql = "NOTIFY {channel}, %s".format(channel=pg_channel)
+            cursor.execute(sql, [message])
         cursor.close()
@@ -15,9 +15,14 @@
 
 import json
 import logging
+import os
+import threading
+import time
 
 from amqp import Connection as AmqpConnection
 from amqp.exceptions import AccessRefused
+from amqp.exceptions import ConnectionError as AmqpConnectionError
+from amqp.exceptions import RecoverableConnectionError
 from amqp.basic_message import Message as AmqpMessage
 from urllib.parse import urlparse
 
@@ -26,6 +31,11 @@ from . import base
 log = logging.getLogger("tagia.events")
 
 
+# Errors that invalidate the current connection; the message is retried
+# once over a new one.
+CONNECTION_ERRORS = (OSError, AmqpConnectionError, RecoverableConnectionError)
+
+
 def _make_rabbitmq_connection(url):
     parse_result = urlparse(url)
 
@@ -45,14 +55,145 @@ def _make_rabbitmq_connection(url):
                           password=password, virtual_host=vhost[1:])
 
 
-class EventsPushBackend(base.BaseEventsPushBackend):
+class PublisherStats(object):
+    """
+    Throughput and latency counters of a publisher.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.connections = 0
+        self.errors = 0
+        self.batches = 0
+        self.messages = 0
+        self.publish_time = 0.0
+
+    def as_dict(self):
+        return {
+            "connections": self.connections,
+            "errors": self.errors,
+            "batches": self.batches,
+            "messages": self.messages,
+            "publish_time": self.publish_time,
+            "avg_batch_latency": self.publish_time / self.batches if self.batches else 0.0,
+            "avg_message_latency": self.publish_time / self.messages if self.messages else 0.0,
+        }
+
+
+class PersistentPublisher(object):
+    """
+    Keep one AMQP connection and channel per process, reused by all the
+    published events and transparently reopened if it is broken (or if the
+    process has been forked).
+    """
     def __init__(self, url):
         self.url = url
+        self.stats = PublisherStats()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._connection = None
+        self._channel = None
+        self._exchanges = set()
+
+    def _connect(self):
+        self._disconnect()
 
-    def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
         connection = _make_rabbitmq_connection(self.url)
+        connection.connect()
+
+        self._connection = connection
+        self._channel = connection.channel()
+        self._pid = os.getpid()
+        self._exchanges = set()
+        self.stats.connections += 1
+
+    def _disconnect(self):
+        connection = self._connection
+        owned = self._pid == os.getpid()
+
+        self._connection = None
+        self._channel = None
+        self._exchanges = set()
+
+        # Never close the socket inherited from the parent process
+        if connection is not None and owned:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _publish(self, messages, exchange):
+        if self._connection is None or self._pid != os.getpid():
+            self._connect()
+
+        if exchange not in self._exchanges:
+            self._channel.exchange_declare(exchange=exchange, type="topic", auto_delete=True)
+            self._exchanges.add(exchange)
+
+        for routing_key, message in messages:
+            self._channel.basic_publish(AmqpMessage(message), routing_key=routing_key, exchange=exchange)
+
+    def publish(self, messages, *, exchange:str):
+        """
+        Publish a list of `(routing_key, message)` in `exchange`.
+        """
+        if not messages:
+            return
+
+        with self._lock:
+            start = time.monotonic()
+            try:
+                try:
+                    self._publish(messages, exchange)
+                except CONNECTION_ERRORS:
+                    self._disconnect()
+                    self._publish(messages, exchange)
+            except Exception:
+                self.stats.errors += 1
+                self._disconnect()
+                raise
+            else:
+                self.stats.batches += 1
+                self.stats.messages += len(messages)
+            finally:
+                self.stats.publish_time += time.monotonic() - start
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+_publishers = {}
+_publishers_lock = threading.Lock()
+
+
+def get_publisher(url):
+    with _publishers_lock:
+        if url not in _publishers:
+            _publishers[url] = PersistentPublisher(url)
+        return _publishers[url]
+
+
+def get_stats():
+    """
+    Return the counters of every publisher of the current process by url.
+    """
+    return {url: publisher.stats.as_dict() for url, publisher in _publishers.items()}
+
+
+class EventsPushBackend(base.BaseEventsPushBackend):
+    def __init__(self, url, batch=False):
+        self.url = url
+        self.batch = batch
+        self.publisher = get_publisher(url)
+
+    def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
+        self.emit_events([(routing_key, message)], channel=channel)
+
+    def emit_events(self, messages, *, channel:str="events"):
         try:
-            connection.connect()
+            self.publisher.publish(messages, exchange=channel)
         except ConnectionRefusedError:
             err_msg = "EventsPushBackend: Unable to connect with RabbitMQ (connection refused) at {}".format(
                                                                                                      self.url)
@@ -61,15 +202,5 @@ class EventsPushBackend(base.BaseEventsPushBackend):
             err_msg = "EventsPushBackend: Unable to connect with RabbitMQ (access refused) at {}".format(
                                                                                                  self.url)
             log.error(err_msg, exc_info=True)
-        else:
-            try:
-                message = AmqpMessage(message)
-                rchannel = connection.channel()
-
-                rchannel.exchange_declare(exchange=channel, type="topic", auto_delete=True)
-                rchannel.basic_publish(message, routing_key=routing_key, exchange=channel)
-                rchannel.close()
-            except Exception:
-                log.error("EventsPushBackend: Unhandled exception", exc_info=True)
-            finally:
-                connection.close()
+        except Exception:
+            log.error("EventsPushBackend: Unhandled exception", exc_info=True)
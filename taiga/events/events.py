@@ -37,17 +37,111 @@ watched_types = set([
 ])
 
 
+class TransactionEvents(object):
+    """
+    Events emitted during a transaction, sent when it is committed.
+
+    The change events of the same kind (routing key, type and content type)
+    are merged in only one message with the list of changed pks, and
+    repeated changes of the same object are sent only once.
+    """
+    def __init__(self, backend, savepoint_ids=()):
+        self.backend = backend
+        self.savepoint_ids = savepoint_ids
+        self.events = collections.OrderedDict()
+
+    def add(self, data:dict, routing_key:str, channel:str, sessionid:str):
+        key = ("message", len(self.events))
+        self.events[key] = (channel, routing_key, {"session_id": sessionid, "data": data})
+
+    def add_changes(self, pks, content_type:str, routing_key:str, type:str, channel:str,
+                    sessionid:str, as_list:bool):
+        key = ("changes", channel, routing_key, sessionid, content_type, type)
+        changes = self.events.setdefault(key, {"pks": collections.OrderedDict(), "as_list": False})
+        changes["pks"].update((pk, None) for pk in pks)
+        changes["as_list"] = changes["as_list"] or as_list
+
+    def _get_messages(self):
+        for key, value in self.events.items():
+            if key[0] == "message":
+                yield value
+                continue
+
+            _, channel, routing_key, sessionid, content_type, type = key
+            pks = list(value["pks"])
+
+            # The creation or deletion of an object already notifies its changes
+            if type == "change":
+                for other_type in ("create", "delete"):
+                    other = self.events.get(("changes", channel, routing_key, sessionid, content_type, other_type))
+                    if other is not None:
+                        pks = [pk for pk in pks if pk not in other["pks"]]
+
+            if not pks:
+                continue
+
+            data = {"type": type,
+                    "matches": content_type,
+                    "pk": pks if value["as_list"] or len(pks) > 1 else pks[0]}
+            yield (channel, routing_key, {"session_id": sessionid, "data": data})
+
+    def flush(self):
+        transaction_events = getattr(connection, "_transaction_events", None)
+        if transaction_events and transaction_events.get(self.savepoint_ids) is self:
+            del transaction_events[self.savepoint_ids]
+
+        messages_by_channel = collections.OrderedDict()
+        for channel, routing_key, data in self._get_messages():
+            messages_by_channel.setdefault(channel, []).append((routing_key, json.dumps(data)))
+
+        for channel, messages in messages_by_channel.items():
+            if self.backend.batch:
+                self.backend.emit_events(messages, channel=channel)
+            else:
+                for routing_key, message in messages:
+                    self.backend.emit_event(message=message, routing_key=routing_key, channel=channel)
+
+
+def _get_transaction_events(backend):
+    """
+    Get the events collected in the current transaction, one buffer for every
+    savepoint. The first time it registers their flush on commit, and Django
+    discards it if one of the savepoints of the buffer is rolled back.
+    """
+    if getattr(connection, "_transaction_events", None) is None:
+        connection._transaction_events = {}
+
+    pending_flushes = [func for sids, func in connection.run_on_commit]
+    savepoint_ids = tuple(connection.savepoint_ids)
+    transaction_events = connection._transaction_events.get(savepoint_ids)
+
+    if transaction_events is None or transaction_events.flush not in pending_flushes:
+        # Forget the buffers of the rolled back transactions or savepoints
+        connection._transaction_events = {sids: events for sids, events in connection._transaction_events.items()
+                                          if events.flush in pending_flushes}
+
+        transaction_events = TransactionEvents(backend, savepoint_ids)
+        connection._transaction_events[savepoint_ids] = transaction_events
+        connection.on_commit(transaction_events.flush)
+
+    return transaction_events
+
+
 def emit_event(data:dict, routing_key:str, *,
                sessionid:str=None, channel:str="events",
                on_commit:bool=True):
     if not sessionid:
         sessionid = mw.get_current_session_id()
 
+    backend = backends.get_events_backend()
+
+    if on_commit and connection.in_atomic_block:
+        _get_transaction_events(backend).add(data, routing_key, channel, sessionid)
+        return
+
     data = {"session_id": sessionid,
             "data": data}
 
-    backend = backends.get_events_backend()
-
     def backend_emit_event():
         backend.emit_event(message=json.dumps(data), routing_key=routing_key, channel=channel)
 
@@ -57,6 +151,30 @@ def emit_event(data:dict, routing_key:str, *,
         backend_emit_event()
 
 
+def _emit_changes(pks, content_type:str, projectid:int, *, type:str, channel:str,
+                  sessionid:str, as_list:bool):
+    app_name, model_name = content_type.split(".", 1)
+    routing_key = "changes.project.{0}.{1}".format(projectid, app_name)
+
+    if connection.in_atomic_block:
+        if not sessionid:
+            sessionid = mw.get_current_session_id()
+
+        backend = backends.get_events_backend()
+        _get_transaction_events(backend).add_changes(pks, content_type, routing_key, type, channel,
+                                                     sessionid, as_list)
+        return
+
+    data = {"type": type,
+            "matches": content_type,
+            "pk": pks if as_list else pks[0]}
+
+    return emit_event(routing_key=routing_key,
+                      channel=channel,
+                      sessionid=sessionid,
+                      data=data)
+
+
 def emit_event_for_model(obj, *, type:str="change", channel:str="events",
                          content_type:str=None, sessionid:str=None):
     """
@@ -75,17 +193,8 @@ def emit_event_for_model(obj, *, type:str="change", channel:str="events",
     projectid = getattr(obj, "project_id")
     pk = getattr(obj, "pk", None)
 
-    app_name, model_name = content_type.split(".", 1)
-    routing_key = "changes.project.{0}.{1}".format(projectid, app_name)
-
-    data = {"type": type,
-            "matches": content_type,
-            "pk": pk}
-
-    return emit_event(routing_key=routing_key,
-                      channel=channel,
-                      sessionid=sessionid,
-                      data=data)
+    return _emit_changes([pk], content_type, projectid, type=type, channel=channel,
+                         sessionid=sessionid, as_list=False)
 
 
 def emit_event_for_ids(ids, content_type:str, projectid:int, *,
@@ -94,14 +203,5 @@ def emit_event_for_ids(ids, content_type:str, projectid:int, *,
     assert isinstance(ids, collections.Iterable)
     assert content_type, "'content_type' parameter is mandatory"
 
-    app_name, model_name = content_type.split(".", 1)
-    routing_key = "changes.project.{0}.{1}".format(projectid, app_name)
-
-    data = {"type": type,
-            "matches": content_type,
-            "pk": ids}
-
-    return emit_event(routing_key=routing_key,
-                      channel=channel,
-                      sessionid=sessionid,
-                      data=data)
+    return _emit_changes(list(ids), content_type, projectid, type=type, channel=channel,
+                         sessionid=sessionid, as_list=True)
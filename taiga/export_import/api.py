@@ -16,7 +16,6 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import codecs
 import uuid
 import gzip
 
@@ -28,7 +27,6 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 
-from taiga.base.utils import json
 from taiga.base.decorators import detail_route, list_route
 from taiga.base import exceptions as exc
 from taiga.base import response
@@ -76,8 +74,9 @@ class ProjectExporterViewSet(mixins.ImportThrottlingPolicyMixin, GenericViewSet)
 
         if dump_format == "gzip":
             path = "exports/{}/{}-{}.json.gz".format(project.pk, project.slug, uuid.uuid4().hex)
-            with default_storage.open(path, mode="wb") as outfile:
-                services.render_project(project, gzip.GzipFile(fileobj=outfile))
+            with default_storage.open(path, mode="wb") as outfile, \
+                    gzip.GzipFile(fileobj=outfile, mode="wb") as gzfile:
+                services.render_project(project, gzfile)
         else:
             path = "exports/{}/{}-{}.json".format(project.pk, project.slug, uuid.uuid4().hex)
             with default_storage.open(path, mode="wb") as outfile:
@@ -322,27 +321,27 @@ class ProjectImporterViewSet(mixins.ImportThrottlingPolicyMixin, CreateModelMixi
         if not dump:
             raise exc.WrongArguments(_("Needed dump file"))
 
-        if dump.content_type == "application/gzip":
-            dump = gzip.GzipFile(fileobj=dump)
-
-        reader = codecs.getreader("utf-8")
+        is_gzip = dump.content_type == "application/gzip"
+        dump_file = gzip.GzipFile(fileobj=dump) if is_gzip else dump
 
+        # Read the dump without its big sections (they are only validated)
         try:
-            dump = json.load(reader(dump))
+            header = services.load_dump_header(dump_file)
         except Exception:
             raise exc.WrongArguments(_("Invalid dump format"))
 
-        slug = dump.get('slug', None)
+        ignore_fields = []
+        slug = header.get('slug', None)
         if slug is not None and Project.objects.filter(slug=slug).exists():
-            del dump['slug']
+            ignore_fields.append('slug')
 
         user = request.user
-        dump['owner'] = user.email
+        header['owner'] = user.email
 
         # Validate if the project can be imported
-        is_private = dump.get("is_private", False)
-        total_memberships = len([m for m in dump.get("memberships", [])
-                                            if m.get("email", None) != dump["owner"]])
+        is_private = header.get("is_private", False)
+        total_memberships = len([m for m in header.get("memberships", [])
+                                            if m.get("email", None) != header["owner"]])
         total_memberships = total_memberships + 1 # 1 is the owner
         (enough_slots, error_message) = users_services.has_available_slot_for_new_project(
             user,
@@ -354,12 +353,16 @@ class ProjectImporterViewSet(mixins.ImportThrottlingPolicyMixin, CreateModelMixi
 
         # Async mode
         if settings.CELERY_ENABLED:
-            task = tasks.load_project_dump.delay(user, dump)
+            dump.seek(0)
+            path = "imports/{}/{}.json{}".format(user.id, uuid.uuid4().hex, ".gz" if is_gzip else "")
+            path = default_storage.save(path, dump)
+            task = tasks.load_project_dump.delay(user, path, ignore_fields)
             return response.Accepted({"import_id": task.id})
 
         # Sync mode
         try:
-            project = services.store_project_from_dict(dump, request.user)
+            dump_file.seek(0)
+            project = services.store_project_from_file(dump_file, request.user, ignore_fields)
         except err.TaigaImportError as e:
             # On Error
             ## remove project
@@ -67,10 +67,11 @@ class Command(BaseCommand):
             if options["format"] == "gzip":
                 dst_file = os.path.join(dst_dir, "{}.json.gz".format(project_slug))
                 with gzip.GzipFile(dst_file, "wb") as f:
-                    render_project(project, f)
+                    stats = render_project(project, f)
             else:
                 dst_file = os.path.join(dst_dir, "{}.json".format(project_slug))
                 with open(dst_file, "wb") as f:
-                    render_project(project, f)
+                    stats = render_project(project, f)
 
-            print("-> Generate dump of project '{}' in '{}'".format(project.name, dst_file))
+            print("-> Generate dump of project '{}' in '{}' ({:.2f}s, max RSS of the process {} KB)".format(
+                project.name, dst_file, stats["time"], stats["process_max_rss"]))
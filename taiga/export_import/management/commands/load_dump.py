@@ -43,12 +43,22 @@ class Command(BaseCommand):
                             default=False,
                             help='Overwrite the project if exists')
 
+        parser.add_argument("-b", '--bulk',
+                            action='store_true',
+                            dest='bulk',
+                            default=False,
+                            help='Store the epics, user stories, tasks and issues in batches')
+
     def handle(self, *args, **options):
         dump_file_path = options["dump_file"]
         owner_email = options["owner_email"]
         overwrite = options["overwrite"]
+        bulk = options["bulk"]
+
+        with open(dump_file_path, 'rb') as dump_file:
+            data = services.load_dump_header(dump_file)
 
-        data = json.loads(open(dump_file_path, 'r').read())
+        ignore_fields = []
         try:
             if overwrite:
                 receivers_back = signals.post_delete.receivers
@@ -67,10 +77,11 @@ class Command(BaseCommand):
             else:
                 slug = data.get('slug', None)
                 if slug is not None and Project.objects.filter(slug=slug).exists():
-                    del data['slug']
+                    ignore_fields.append('slug')
 
             user = User.objects.get(email=owner_email)
-            services.store_project_from_dict(data, user)
+            with open(dump_file_path, 'rb') as dump_file:
+                services.store_project_from_file(dump_file, user, ignore_fields, bulk=bulk)
         except err.TaigaImportError as e:
             if e.project:
                 e.project.delete_related_content()
@@ -22,6 +22,9 @@
 from .render import render_project
 from . import render
 
-from .store import store_project_from_dict
+from .store import store_project_from_dict, store_project_from_file
 from . import store
 
+from .stream import load_dump_header
+from . import stream
+
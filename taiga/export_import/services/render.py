@@ -19,7 +19,17 @@
 # This makes all code that import services works and
 # is not the baddest practice ;)
 
-import gc
+import logging
+import resource
+import shutil
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import connection
 
 from taiga.base.utils import json
 from taiga.base.fields import MethodField
@@ -28,72 +38,144 @@ from taiga.base.api.fields import get_component
 
 from .. import serializers
 
+logger = logging.getLogger("taiga.export_import")
 
-def render_project(project, outfile, chunk_size=8190):
-    serializer = serializers.ProjectExportSerializer(project)
-    outfile.write(b'{\n')
 
-    first_field = True
-    for field_name in serializer._field_map.keys():
-        # Avoid writing "," in the last element
-        if not first_field:
-            outfile.write(b",\n")
+# These "special" fields are rendered in parallel, each one in its own chunk file
+SECTIONS = ["wiki_pages", "user_stories", "tasks", "issues", "epics"]
+
+
+def _get_section_queryset(project, field_name):
+    value = get_component(project, field_name)
+    if field_name != "wiki_pages":
+        value = value.select_related('owner', 'status',
+                                     'project', 'assigned_to',
+                                     'custom_attributes_values')
+
+    if field_name in ["user_stories", "tasks", "issues"]:
+        value = value.select_related('milestone')
+
+    if field_name == "issues":
+        value = value.select_related('severity', 'priority', 'type')
+    return value.prefetch_related('history_entry', 'attachments')
+
+
+def _write_items(chunk, items, to_value):
+    # Avoid writing "," in the last element
+    first_item = True
+    for item in items:
+        if not first_item:
+            chunk.write(b",\n")
         else:
-            first_field = False
+            first_item = False
 
-        field = serializer._field_map.get(field_name)
-        # field.initialize(parent=serializer, field_name=field_name)
+        chunk.write(json.dumps(to_value(item)).encode())
 
-        # These four "special" fields hava attachments so we use them in a special way
-        if field_name in ["wiki_pages", "user_stories", "tasks", "issues", "epics"]:
-            value = get_component(project, field_name)
-            if field_name != "wiki_pages":
-                value = value.select_related('owner', 'status',
-                                             'project', 'assigned_to',
-                                             'custom_attributes_values')
 
-            if field_name in ["user_stories", "tasks", "issues"]:
-                value = value.select_related('milestone')
+def _render_section(project, field_name):
+    """
+    Render the items of a section of the dump (without the enclosing
+    brackets) into a temporary chunk file.
+    """
+    chunk = tempfile.TemporaryFile()
+    try:
+        if field_name == "timeline":
+            _write_items(chunk, get_project_timeline(project).iterator(),
+                         lambda item: serializers.TimelineExportSerializer(item).data)
+        else:
+            field = serializers.ProjectExportSerializer._field_map.get(field_name)
+            field.many = False
+            _write_items(chunk, _get_section_queryset(project, field_name).iterator(), field.to_value)
+    except Exception:
+        chunk.close()
+        raise
 
-            if field_name == "issues":
-                value = value.select_related('severity', 'priority', 'type')
-            value = value.prefetch_related('history_entry', 'attachments')
+    chunk.seek(0)
+    return chunk
 
-            outfile.write('"{}": [\n'.format(field_name).encode())
 
-            first_item = True
-            for item in value.iterator():
-                # Avoid writing "," in the last element
-                if not first_item:
-                    outfile.write(b",\n")
-                else:
-                    first_item = False
+def _render_section_in_thread(project, field_name):
+    try:
+        return _render_section(project, field_name)
+    finally:
+        connection.close()
+
 
-                field.many = False
-                dumped_value = json.dumps(field.to_value(item))
-                outfile.write(dumped_value.encode())
-                outfile.flush()
-            gc.collect()
+def render_project(project, outfile, chunk_size=8190):
+    """
+    Write the dump of a project in `outfile`.
+
+    The big sections (SECTIONS and the timeline) are rendered by a pool of
+    EXPORT_RENDER_WORKERS threads (each one with its own database connection)
+    into temporary chunk files that are stitched at the end. Returns a dict
+    with the total time and the maximum resident set size reached by the
+    process so far (it is not reset between exports).
+    """
+    start = time.time()
+    serializer = serializers.ProjectExportSerializer(project)
+    workers = getattr(settings, "EXPORT_RENDER_WORKERS", 4)
+
+    sections = [field_name for field_name in serializer._field_map.keys() if field_name in SECTIONS]
+    sections.append("timeline")
+
+    if workers > 1:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        chunks = {field_name: executor.submit(_render_section_in_thread, project, field_name)
+                  for field_name in sections}
+
+        def get_chunk(field_name):
+            return chunks[field_name].result()
+    else:
+        executor = None
+        get_chunk = partial(_render_section, project)
+
+    def _write_chunk(field_name):
+        with get_chunk(field_name) as chunk:
+            outfile.write('"{}": [\n'.format(field_name).encode())
+            shutil.copyfileobj(chunk, outfile, chunk_size)
             outfile.write(b']')
-        else:
-            if isinstance(field, MethodField):
-                value = field.as_getter(field_name, serializers.ProjectExportSerializer)(serializer, project)
+
+    try:
+        outfile.write(b'{\n')
+
+        first_field = True
+        for field_name in serializer._field_map.keys():
+            # Avoid writing "," in the last element
+            if not first_field:
+                outfile.write(b",\n")
             else:
-                attr = getattr(project, field_name)
-                value = field.to_value(attr)
-            outfile.write('"{}": {}'.format(field_name, json.dumps(value)).encode())
-
-    # Generate the timeline
-    outfile.write(b',\n"timeline": [\n')
-    first_timeline = True
-    for timeline_item in get_project_timeline(project).iterator():
-        # Avoid writing "," in the last element
-        if not first_timeline:
-            outfile.write(b",\n")
-        else:
-            first_timeline = False
+                first_field = False
 
-        dumped_value = json.dumps(serializers.TimelineExportSerializer(timeline_item).data)
-        outfile.write(dumped_value.encode())
+            field = serializer._field_map.get(field_name)
+            # field.initialize(parent=serializer, field_name=field_name)
 
-    outfile.write(b']}\n')
+            if field_name in SECTIONS:
+                _write_chunk(field_name)
+            else:
+                if isinstance(field, MethodField):
+                    value = field.as_getter(field_name, serializers.ProjectExportSerializer)(serializer, project)
+                else:
+                    attr = getattr(project, field_name)
+                    value = field.to_value(attr)
+                outfile.write('"{}": {}'.format(field_name, json.dumps(value)).encode())
+
+        # Generate the timeline
+        outfile.write(b',\n')
+        _write_chunk("timeline")
+        outfile.write(b'}\n')
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+            # Remove the chunks not stitched because of an error
+            for future in chunks.values():
+                if future.done() and not future.exception():
+                    future.result().close()
+
+    stats = {
+        "time": time.time() - start,
+        # Of the whole life of the process, in kilobytes on linux
+        "process_max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    logger.info("Project %s rendered in %.2fs (max RSS of the process %s KB)",
+                project.slug, stats["time"], stats["process_max_rss"])
+    return stats
@@ -22,24 +22,45 @@
 import os
 import uuid
 
+from itertools import groupby
+
 from unidecode import unidecode
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 from django.template.defaultfilters import slugify
+from django.utils import timezone
 from django.utils.translation import ugettext as _
 
-from taiga.projects.history.services import make_key_from_model_object, take_snapshot
+from taiga.projects.custom_attributes.models import (EpicCustomAttributesValues,
+                                                     UserStoryCustomAttributesValues,
+                                                     TaskCustomAttributesValues,
+                                                     IssueCustomAttributesValues)
+from taiga.projects.epics.models import Epic, RelatedUserStory
+from taiga.projects.history.models import HistoryEntry
+from taiga.projects.history.services import (make_key_from_model_object, take_snapshot,
+                                             take_snapshots_in_bulk)
+from taiga.projects.issues import signals as issues_handlers
+from taiga.projects.issues.models import Issue
 from taiga.projects.models import Membership
+from taiga.projects.notifications import services as notifications_services
 from taiga.projects.references import sequences as seq
 from taiga.projects.references import models as refs
-from taiga.projects.userstories.models import RolePoints
+from taiga.projects.tagging import signals as tagging_handlers
+from taiga.projects.tasks import signals as tasks_handlers
+from taiga.projects.tasks.models import Task
+from taiga.projects.userstories.models import UserStory, RolePoints
+from taiga.projects.wiki.models import WikiLink
 from taiga.projects.services import find_invited_user
+from taiga.timeline.models import Timeline
 from taiga.timeline.service import build_project_namespace
 from taiga.users import services as users_service
 
 from .. import exceptions as err
 from .. import validators
+from . import stream
 
 
 ########################################################################
@@ -71,6 +92,31 @@ def reset_errors():
 ## Store functions
 ########################################################################
 
+def _bulk_create_in_batches(model, items, validate_fn):
+    """
+    Create the objects returned by `validate_fn` for every item in `items`
+    with `bulk_create`, IMPORT_BULK_BATCH_SIZE objects at a time (`validate_fn`
+    returns None for the invalid items or for the ones it has saved itself).
+    Only for models without signals that need to run on save.
+    """
+    batch_size = getattr(settings, "IMPORT_BULK_BATCH_SIZE", 500)
+    stored = 0
+    batch = []
+    for item in items:
+        obj = validate_fn(item)
+        if obj is not None:
+            batch.append(obj)
+
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            stored += len(batch)
+            batch = []
+
+    if batch:
+        model.objects.bulk_create(batch)
+        stored += len(batch)
+    return stored
+
 
 ## PROJECT
 
@@ -280,7 +326,7 @@ def store_custom_attributes(project, data, field, serializer):
 
 ## MILESTONE
 
-def store_milestone(project, milestone):
+def store_milestone(project, milestone, bulk=False):
     validator = validators.MilestoneExportValidator(data=milestone, project=project)
     if validator.is_valid():
         validator.object.project = project
@@ -288,21 +334,27 @@ def store_milestone(project, milestone):
         validator.save()
         validator.save_watchers()
 
-        for task_without_us in milestone.get("tasks_without_us", []):
+        tasks_without_us = milestone.get("tasks_without_us", [])
+        for task_without_us in tasks_without_us:
             task_without_us["user_story"] = None
-            store_task(project, task_without_us)
+
+        if bulk:
+            store_tasks_in_bulk(project, tasks_without_us)
+        else:
+            for task_without_us in tasks_without_us:
+                store_task(project, task_without_us)
         return validator
 
     add_errors("milestones", validator.errors)
     return None
 
 
-def store_milestones(project, data):
-    results = []
+def store_milestones(project, data, bulk=False):
+    stored = 0
     for milestone_data in data.get("milestones", []):
-        milestone = store_milestone(project, milestone_data)
-        results.append(milestone)
-    return results
+        if store_milestone(project, milestone_data, bulk=bulk):
+            stored += 1
+    return stored
 
 
 ## USER STORIES
@@ -384,12 +436,15 @@ def store_user_story(project, data):
     return None
 
 
-def store_user_stories(project, data):
-    results = []
+def store_user_stories(project, data, bulk=False):
+    if bulk:
+        return store_user_stories_in_bulk(project, data.get("user_stories", []))
+
+    stored = 0
     for userstory in data.get("user_stories", []):
-        us = store_user_story(project, userstory)
-        results.append(us)
-    return results
+        if store_user_story(project, userstory):
+            stored += 1
+    return stored
 
 
 ## EPICS
@@ -460,12 +515,15 @@ def store_epic(project, data):
     return None
 
 
-def store_epics(project, data):
-    results = []
+def store_epics(project, data, bulk=False):
+    if bulk:
+        return store_epics_in_bulk(project, data.get("epics", []))
+
+    stored = 0
     for epic in data.get("epics", []):
-        epic = store_epic(project, epic)
-        results.append(epic)
-    return results
+        if store_epic(project, epic):
+            stored += 1
+    return stored
 
 
 ## TASKS
@@ -522,12 +580,15 @@ def store_task(project, data):
     return None
 
 
-def store_tasks(project, data):
-    results = []
+def store_tasks(project, data, bulk=False):
+    if bulk:
+        return store_tasks_in_bulk(project, data.get("tasks", []))
+
+    stored = 0
     for task in data.get("tasks", []):
-        task = store_task(project, task)
-        results.append(task)
-    return results
+        if store_task(project, task):
+            stored += 1
+    return stored
 
 
 ## ISSUES
@@ -593,11 +654,15 @@ def store_issue(project, data):
     return None
 
 
-def store_issues(project, data):
-    issues = []
+def store_issues(project, data, bulk=False):
+    if bulk:
+        return store_issues_in_bulk(project, data.get("issues", []))
+
+    stored = 0
     for issue in data.get("issues", []):
-        issues.append(store_issue(project, issue))
-    return issues
+        if store_issue(project, issue):
+            stored += 1
+    return stored
 
 
 ## WIKI PAGES
@@ -631,10 +696,11 @@ def store_wiki_page(project, wiki_page):
 
 
 def store_wiki_pages(project, data):
-    results = []
+    stored = 0
     for wiki_page in data.get("wiki_pages", []):
-        results.append(store_wiki_page(project, wiki_page))
-    return results
+        if store_wiki_page(project, wiki_page):
+            stored += 1
+    return stored
 
 
 ## WIKI LINKS
@@ -652,10 +718,21 @@ def store_wiki_link(project, wiki_link):
 
 
 def store_wiki_links(project, data):
-    results = []
-    for wiki_link in data.get("wiki_links", []):
-        results.append(store_wiki_link(project, wiki_link))
-    return results
+    def validate_wiki_link(wiki_link):
+        validator = validators.WikiLinkExportValidator(data=wiki_link)
+        if not validator.is_valid():
+            add_errors("wiki_links", validator.errors)
+            return None
+
+        validator.object.project = project
+        if not validator.object.href:
+            # The href is generated on save (it needs a lock)
+            validator.object._importing = True
+            validator.save()
+            return None
+        return validator.object
+
+    return _bulk_create_in_batches(WikiLink, data.get("wiki_links", []), validate_wiki_link)
 
 
 ## TAGS COLORS
@@ -668,7 +745,7 @@ def store_tags_colors(project, data):
 
 ## TIMELINE
 
-def _store_timeline_entry(project, timeline):
+def _validate_timeline_entry(project, timeline):
     validator = validators.TimelineExportValidator(data=timeline, context={"project": project})
     if validator.is_valid():
         validator.object.project = project
@@ -676,18 +753,254 @@ def _store_timeline_entry(project, timeline):
         validator.object.object_id = project.id
         validator.object.content_type = ContentType.objects.get_for_model(project.__class__)
         validator.object._importing = True
-        validator.save()
         return validator
     add_errors("timeline", validator.errors)
-    return validator
+    return None
 
 
 def store_timeline_entries(project, data):
-    results = []
-    for timeline in data.get("timeline", []):
-        tl = _store_timeline_entry(project, timeline)
-        results.append(tl)
-    return results
+    def validate_timeline_entry(timeline):
+        validator = _validate_timeline_entry(project, timeline)
+        return validator.object if validator else None
+
+    return _bulk_create_in_batches(Timeline, data.get("timeline", []), validate_timeline_entry)
+
+
+## BULK STORE
+
+# The bulk mode stores the epics, user stories, tasks and issues of a dump in
+# batches of IMPORT_BULK_BATCH_SIZE items: every batch is validated, inserted
+# with one bulk_create and its related data (references, watchers, custom
+# attributes values, role points, history...) is created with a few queries.
+# It only replicates the work done on save for imported objects (the rest of
+# the signals ignore them).
+
+def _iter_batches(items):
+    batch_size = getattr(settings, "IMPORT_BULK_BATCH_SIZE", 500)
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def _store_watchers_in_bulk(objs_and_emails):
+    emails = set(email for obj, obj_emails in objs_and_emails for email in obj_emails)
+    if not emails:
+        return
+
+    users = {user.email: user for user in get_user_model().objects.filter(email__in=emails)}
+    notifications_services.add_watchers_in_bulk([
+        (obj, users[email])
+        for obj, obj_emails in objs_and_emails
+        for email in set(obj_emails) if email in users
+    ])
+
+
+def _store_custom_attributes_values_in_bulk(objs_and_values, custom_attributes, model, obj_field):
+    # Every object has its custom attributes values (empty if they aren't in the dump)
+    custom_attributes_values = []
+    for obj, values in objs_and_values:
+        if values:
+            values = _use_id_instead_name_as_key_in_custom_attributes_values(custom_attributes, values)
+        custom_attributes_values.append(model(**{obj_field: obj, "attributes_values": values or {}}))
+
+    model.objects.bulk_create(custom_attributes_values)
+
+
+def _store_history_in_bulk(project, objs_and_history, statuses={}):
+    history_entries = []
+    objs_without_history = []
+    for obj, history in objs_and_history:
+        if not history:
+            objs_without_history.append(obj)
+            continue
+
+        key = make_key_from_model_object(obj)
+        for history_entry in history:
+            validator = validators.HistoryExportValidator(data=history_entry,
+                                                          context={"project": project, "statuses": statuses})
+            if validator.is_valid():
+                validator.object.key = key
+                if validator.object.diff is None:
+                    validator.object.diff = []
+                validator.object.project_id = project.id
+                validator.object._importing = True
+                history_entries.append(validator.object)
+            else:
+                add_errors("history", validator.errors)
+
+    HistoryEntry.objects.bulk_create(history_entries)
+
+    # Objects without history get an initial snapshot made by its owner
+    objs_without_history.sort(key=lambda obj: obj.owner_id)
+    for owner_id, objs in groupby(objs_without_history, key=lambda obj: obj.owner_id):
+        objs = list(objs)
+        take_snapshots_in_bulk(objs, user=objs[0].owner)
+
+
+def _validate_item_for_bulk(project, data, *, section, model, validator_class, default_values,
+                            prepare_object=None):
+    for field, default_field in default_values:
+        default_value = getattr(project, default_field)
+        if field not in data and default_value:
+            data[field] = default_value.name
+
+    obj_data = {key: value for key, value in data.items() if key not in
+                ["role_points", "custom_attributes_values"]}
+    validator = validator_class(data=obj_data, context={"project": project})
+    if not validator.is_valid():
+        add_errors(section, validator.errors)
+        return None
+
+    obj = validator.object
+    obj.project = project
+    if obj.owner is None:
+        obj.owner = project.owner
+    obj._importing = True
+    obj._not_notify = True
+    if not obj.modified_date:
+        obj.modified_date = timezone.now()
+    tagging_handlers.tags_normalization(model, obj)
+    if prepare_object:
+        prepare_object(obj)
+
+    return (obj, data, validator._watchers)
+
+
+def _store_items_in_bulk(project, items, *, section, model, validator_class, default_values,
+                         custom_attributes, custom_attributes_values_model, obj_field,
+                         statuses, prepare_object=None, store_related=None):
+    stored = 0
+    for batch in _iter_batches(items):
+        validated = [_validate_item_for_bulk(project, data, section=section, model=model,
+                                             validator_class=validator_class, default_values=default_values,
+                                             prepare_object=prepare_object)
+                     for data in batch]
+        validated = [item for item in validated if item is not None]
+        if not validated:
+            continue
+
+        objs = [obj for obj, data, watchers in validated]
+        objs_with_new_ref = refs.reserve_references_in_bulk(objs, project, create=True)
+        model.objects.bulk_create(objs)
+
+        refs.make_references_in_bulk(objs_with_new_ref, project)
+        _store_watchers_in_bulk([(obj, watchers) for obj, data, watchers in validated])
+        _store_custom_attributes_values_in_bulk([(obj, data.get("custom_attributes_values", None))
+                                                 for obj, data, watchers in validated],
+                                                custom_attributes, custom_attributes_values_model, obj_field)
+        if store_related:
+            store_related(validated)
+
+        for obj, data, watchers in validated:
+            for attachment in data.get("attachments", []):
+                _store_attachment(project, obj, attachment)
+
+        _store_history_in_bulk(project, [(obj, data.get("history", [])) for obj, data, watchers in validated],
+                               statuses)
+        stored += len(objs)
+
+    return stored
+
+
+def store_user_stories_in_bulk(project, items):
+    def store_role_points(validated):
+        # Like Project.update_role_points, every computable role has points (the
+        # null ones if they aren't in the dump) and the other roles have none
+        roles_ids = list(project.roles.filter(computable=True).values_list("id", flat=True))
+        null_points = project.get_null_points() if roles_ids else None
+        role_points = []
+        for us, data, watchers in validated:
+            points_by_role = {role_id: null_points for role_id in roles_ids}
+            for role_point in data.get("role_points", []):
+                validator = validators.RolePointsExportValidator(data=role_point, context={"project": project})
+                if not validator.is_valid():
+                    add_errors("role_points", validator.errors)
+                elif not roles_ids or validator.object.role.id in points_by_role:
+                    points_by_role[validator.object.role.id] = validator.object.points
+
+            role_points += [RolePoints(user_story=us, role_id=role_id, points=points)
+                            for role_id, points in points_by_role.items()]
+
+        RolePoints.objects.bulk_create(role_points)
+
+    return _store_items_in_bulk(
+        project, items,
+        section="user_stories",
+        model=UserStory,
+        validator_class=validators.UserStoryExportValidator,
+        default_values=[("status", "default_us_status")],
+        custom_attributes=list(project.userstorycustomattributes.all().values('id', 'name')),
+        custom_attributes_values_model=UserStoryCustomAttributesValues,
+        obj_field="user_story",
+        statuses={s.name: s.id for s in project.us_statuses.all()},
+        store_related=store_role_points,
+    )
+
+
+def store_epics_in_bulk(project, items):
+    def store_related_user_stories(validated):
+        related_user_stories = []
+        for epic, data, watchers in validated:
+            for related_user_story in data.get("related_user_stories", []):
+                validator = validators.EpicRelatedUserStoryExportValidator(data=related_user_story,
+                                                                           context={"project": project})
+                if validator.is_valid():
+                    validator.object.epic = epic
+                    related_user_stories.append(validator.object)
+                else:
+                    add_errors("epic_related_user_stories", validator.errors)
+
+        RelatedUserStory.objects.bulk_create(related_user_stories)
+
+    return _store_items_in_bulk(
+        project, items,
+        section="epics",
+        model=Epic,
+        validator_class=validators.EpicExportValidator,
+        default_values=[("status", "default_epic_status")],
+        custom_attributes=list(project.epiccustomattributes.all().values('id', 'name')),
+        custom_attributes_values_model=EpicCustomAttributesValues,
+        obj_field="epic",
+        statuses={s.name: s.id for s in project.epic_statuses.all()},
+        store_related=store_related_user_stories,
+    )
+
+
+def store_tasks_in_bulk(project, items):
+    return _store_items_in_bulk(
+        project, items,
+        section="tasks",
+        model=Task,
+        validator_class=validators.TaskExportValidator,
+        default_values=[("status", "default_task_status")],
+        custom_attributes=list(project.taskcustomattributes.all().values('id', 'name')),
+        custom_attributes_values_model=TaskCustomAttributesValues,
+        obj_field="task",
+        statuses={s.name: s.id for s in project.task_statuses.all()},
+        prepare_object=lambda task: tasks_handlers.set_finished_date_when_edit_task(Task, task),
+    )
+
+
+def store_issues_in_bulk(project, items):
+    return _store_items_in_bulk(
+        project, items,
+        section="issues",
+        model=Issue,
+        validator_class=validators.IssueExportValidator,
+        default_values=[("type", "default_issue_type"), ("status", "default_issue_status"),
+                        ("priority", "default_priority"), ("severity", "default_severity")],
+        custom_attributes=list(project.issuecustomattributes.all().values('id', 'name')),
+        custom_attributes_values_model=IssueCustomAttributesValues,
+        obj_field="issue",
+        statuses={s.name: s.id for s in project.issue_statuses.all()},
+        prepare_object=lambda issue: issues_handlers.set_finished_date_when_edit_issue(Issue, issue),
+    )
 
 
 #############################################
@@ -736,7 +1049,7 @@ def _create_membership_for_project_owner(project):
             )
 
 
-def _populate_project_object(project, data):
+def _populate_project_object(project, data, bulk=False):
     def check_if_there_is_some_error(message=_("error importing project data"), project=None):
         errors = get_errors(clear=True)
         if errors:
@@ -778,23 +1091,23 @@ def _populate_project_object(project, data):
     check_if_there_is_some_error(_("error importing custom attributes"), project)
 
     # Create milestones
-    store_milestones(project, data)
+    store_milestones(project, data, bulk=bulk)
     check_if_there_is_some_error(_("error importing sprints"), project)
 
     # Create issues
-    store_issues(project, data)
+    store_issues(project, data, bulk=bulk)
     check_if_there_is_some_error(_("error importing issues"), project)
 
     # Create user stories
-    store_user_stories(project, data)
+    store_user_stories(project, data, bulk=bulk)
     check_if_there_is_some_error(_("error importing user stories"), project)
 
     # Creat epics
-    store_epics(project, data)
+    store_epics(project, data, bulk=bulk)
     check_if_there_is_some_error(_("error importing epics"), project)
 
     # Createer tasks
-    store_tasks(project, data)
+    store_tasks(project, data, bulk=bulk)
     check_if_there_is_some_error(_("error importing tasks"), project)
 
     # Create wiki pages
@@ -817,7 +1130,7 @@ def _populate_project_object(project, data):
     project.refresh_totals()
 
 
-def store_project_from_dict(data, owner=None):
+def store_project_from_dict(data, owner=None, bulk=False):
     # Validate
     if owner:
         _validate_if_owner_have_enought_space_to_this_project(owner, data)
@@ -827,7 +1140,7 @@ def store_project_from_dict(data, owner=None):
 
     # Populate project
     try:
-        _populate_project_object(project, data)
+        _populate_project_object(project, data, bulk=bulk)
     except err.TaigaImportError:
         # reraise known inport errors
         raise
@@ -836,3 +1149,24 @@ def store_project_from_dict(data, owner=None):
         raise err.TaigaImportError(_("unexpected error importing project"), project)
 
     return project
+
+
+def store_project_from_file(fileobj, owner=None, ignore_fields=(), bulk=False):
+    """
+    Like `store_project_from_dict` but reading the dump from `fileobj`
+    incrementally. The big sections of the dump are spooled to temporary files
+    and stored item by item (in batches in bulk mode), so the memory usage
+    doesn't depend on the size of the dump.
+    """
+    try:
+        data = stream.load_dump(fileobj)
+    except ValueError:
+        raise err.TaigaImportError(_("Invalid dump format"), None)
+
+    try:
+        for field in ignore_fields:
+            data.pop(field, None)
+
+        return store_project_from_dict(data, owner, bulk=bulk)
+    finally:
+        stream.close_dump(data)
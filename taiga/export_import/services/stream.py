@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import codecs
+import io
+import json
+import tempfile
+
+from taiga.base.utils import json as taiga_json
+
+
+# The sections of a dump that can be (very) big. They are read item by item
+# and never kept in memory as a whole.
+STREAMED_SECTIONS = ("epics", "user_stories", "tasks", "milestones", "issues",
+                     "wiki_links", "wiki_pages", "timeline")
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+class JSONStreamReader:
+    """
+    A minimal incremental reader for a JSON document.
+
+    Only the containers that the caller enters with `iter_object` or
+    `iter_array` are tokenized here, every other value is decoded as a whole
+    with the stdlib decoder, so the memory needed is bounded by the size of the
+    biggest value read and not by the size of the document.
+    """
+    def __init__(self, fileobj, chunk_size=64 * 1024):
+        if not isinstance(fileobj, io.TextIOBase):
+            fileobj = codecs.getreader("utf-8")(fileobj)
+
+        self._fileobj = fileobj
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size=None):
+        if self._eof:
+            return False
+
+        # Discard the consumed part of the buffer
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+
+        data = self._fileobj.read(size or self._chunk_size)
+        if not data:
+            self._eof = True
+            return False
+
+        self._buffer += data
+        return True
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError("Expected '{}' but found '{}'".format(char, found or "EOF"))
+        self._pos += 1
+
+    def read_value(self):
+        """Decode and return the next value of the document."""
+        if not self._peek():
+            raise ValueError("Unexpected end of the document")
+
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Probably an incomplete value, read more (growing the reads
+                # to avoid decoding big values too many times)
+                if not self._fill(max(self._chunk_size, len(self._buffer))):
+                    raise
+                continue
+
+            # A value not followed by a delimiter could be incomplete (i.e. numbers)
+            if (end == len(self._buffer) or self._buffer[end] not in _DELIMITERS) and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+    def skip_value(self):
+        """Consume the next value of the document without keeping it."""
+        char = self._peek()
+        if char == "[":
+            for item in self.iter_array():
+                pass
+        elif char == "{":
+            for key in self.iter_object():
+                self.skip_value()
+        else:
+            self.read_value()
+
+    def iter_array(self):
+        """Yield the items of the next value of the document, an array."""
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield self.read_value()
+
+            if self._peek() == ",":
+                self._pos += 1
+            else:
+                self._expect("]")
+                return
+
+    def iter_object(self):
+        """
+        Yield the keys of the next value of the document, an object. The value
+        of every key must be consumed by the caller before asking for the next.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            if self._peek() != '"':
+                raise ValueError("Expected a key but found '{}'".format(self._peek() or "EOF"))
+            key = self.read_value()
+            self._expect(":")
+
+            yield key
+
+            if self._peek() == ",":
+                self._pos += 1
+            else:
+                self._expect("}")
+                return
+
+    def ensure_end(self):
+        if self._peek():
+            raise ValueError("Extra data after the end of the document")
+
+
+class SpooledSection:
+    """
+    The items of a big section of a dump spooled to a temporary file (one json
+    item per line). Iterating over it yields the items one by one.
+    """
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._count = 0
+
+    def append(self, item):
+        self._file.write(taiga_json.dumps(item).encode("utf-8"))
+        self._file.write(b"\n")
+        self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield taiga_json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+
+def _read_dump(fileobj, on_section):
+    reader = JSONStreamReader(fileobj)
+    data = {}
+    try:
+        for key in reader.iter_object():
+            if key in STREAMED_SECTIONS:
+                data[key] = on_section(key, reader)
+            else:
+                data[key] = reader.read_value()
+        reader.ensure_end()
+    except Exception:
+        close_dump(data)
+        raise
+
+    return data
+
+
+def load_dump(fileobj):
+    """
+    Read a project dump from `fileobj` and return it as a dict. The items of
+    the STREAMED_SECTIONS are spooled to temporary files and returned as
+    SpooledSection objects, so they can be processed in any order with a
+    constant memory usage. Use `close_dump` to remove them.
+    """
+    def spool_section(key, reader):
+        section = SpooledSection()
+        try:
+            for item in reader.iter_array():
+                section.append(item)
+        except Exception:
+            section.close()
+            raise
+        return section
+
+    return _read_dump(fileobj, spool_section)
+
+
+def load_dump_header(fileobj):
+    """
+    Read a project dump from `fileobj` and return a dict with all the data
+    except the STREAMED_SECTIONS (that are validated and discarded).
+    """
+    def skip_section(key, reader):
+        reader.skip_value()
+        return []
+
+    return _read_dump(fileobj, skip_section)
+
+
+def close_dump(data):
+    for value in data.values():
+        if isinstance(value, SpooledSection):
+            value.close()
@@ -46,8 +46,9 @@ def dump_project(self, user, project, dump_format):
     try:
         if dump_format == "gzip":
             path = "exports/{}/{}-{}.json.gz".format(project.pk, project.slug, self.request.id)
-            with default_storage.open(path, mode="wb") as outfile:
-                services.render_project(project, gzip.GzipFile(fileobj=outfile))
+            with default_storage.open(path, mode="wb") as outfile, \
+                    gzip.GzipFile(fileobj=outfile, mode="wb") as gzfile:
+                services.render_project(project, gzfile)
         else:
             path = "exports/{}/{}-{}.json".format(project.pk, project.slug, self.request.id)
             with default_storage.open(path, mode="wb") as outfile:
@@ -106,9 +107,14 @@ TRACE ERROR:
 
 
 @app.task
-def load_project_dump(user, dump):
+def load_project_dump(user, dump_path, ignore_fields=()):
     try:
-        project = services.store_project_from_dict(dump, user)
+        with default_storage.open(dump_path, mode="rb") as dump_file:
+            if dump_path.endswith(".gz"):
+                with gzip.GzipFile(fileobj=dump_file, mode="rb") as gzfile:
+                    project = services.store_project_from_file(gzfile, user, ignore_fields)
+            else:
+                project = services.store_project_from_file(dump_file, user, ignore_fields)
     except err.TaigaImportError as e:
         # On Error
         ## remove project
@@ -142,3 +148,6 @@ def load_project_dump(user, dump):
         ctx = {"user": user, "project": project}
         email = mail_builder.load_dump(user, ctx)
         email.send()
+
+    finally:
+        default_storage.delete(dump_path)
@@ -22,6 +22,7 @@ from django.core.files.base import ContentFile
 
 from taiga.projects.models import Project, ProjectTemplate
 from taiga.projects.references.models import recalc_reference_counter
+from taiga.projects.references.models import make_references_in_bulk, reserve_references_in_bulk
 from taiga.projects.userstories.models import UserStory
 from taiga.projects.issues.models import Issue
 from taiga.projects.milestones.models import Milestone
@@ -226,6 +227,32 @@ class GithubImporter:
             )
         return project
 
+    def _save_issues_page(self, project, page_objs, users_bindings):
+        """
+        Save the user stories or issues built from a page of GitHub issues, a
+        list of `(github_issue, obj)` tuples.
+        """
+        # The refs are the GitHub numbers, assigned before the INSERT
+        reserve_references_in_bulk([obj for issue, obj in page_objs], project)
+        for issue, obj in page_objs:
+            obj.save()
+
+            assignees = issue.get('assignees', [])
+            if len(assignees) > 1:
+                for assignee in assignees:
+                    if assignee['id'] != issue.get('assignee', {}).get('id', None):
+                        assignee_user = users_bindings.get(assignee['id'], None)
+                        if assignee_user is not None:
+                            obj.add_watcher(assignee_user)
+
+            obj.__class__.objects.filter(id=obj.id).update(
+                modified_date=issue['updated_at'],
+                created_date=issue['created_at']
+            )
+
+            take_snapshot(obj, comment="", user=None, delete=False)
+        make_references_in_bulk([obj for issue, obj in page_objs], project)
+
     def _import_user_stories_data(self, project, repo, options):
         users_bindings = options.get('users_bindings', {})
 
@@ -239,6 +266,7 @@ class GithubImporter:
                 "per_page": 100
             })
             page += 1
+            page_user_stories = []
             for issue in issues:
                 tags = []
                 for label in issue['labels']:
@@ -250,7 +278,7 @@ class GithubImporter:
                 if options.get('keep_external_reference', False):
                     external_reference = ["github", issue['html_url']]
 
-                us = UserStory.objects.create(
+                page_user_stories.append((issue, UserStory(
                     ref=issue['number'],
                     project=project,
                     owner=users_bindings.get(issue['user']['id'], self._user),
@@ -266,23 +294,9 @@ class GithubImporter:
                     external_reference=external_reference,
                     modified_date=issue['updated_at'],
                     created_date=issue['created_at'],
-                )
+                )))
 
-                assignees = issue.get('assignees', [])
-                if len(assignees) > 1:
-                    for assignee in assignees:
-                        if assignee['id'] != issue.get('assignee', {}).get('id', None):
-                            assignee_user = users_bindings.get(assignee['id'], None)
-                            if assignee_user is not None:
-                                us.add_watcher(assignee_user)
-
-                UserStory.objects.filter(id=us.id).update(
-                    ref=issue['number'],
-                    modified_date=issue['updated_at'],
-                    created_date=issue['created_at']
-                )
-
-                take_snapshot(us, comment="", user=None, delete=False)
+            self._save_issues_page(project, page_user_stories, users_bindings)
 
             if len(issues) < 100:
                 break
@@ -300,6 +314,7 @@ class GithubImporter:
                 "per_page": 100
             })
             page += 1
+            page_issues = []
             for issue in issues:
                 tags = []
                 for label in issue['labels']:
@@ -311,7 +326,7 @@ class GithubImporter:
                 if options.get('keep_external_reference', False):
                     external_reference = ["github", issue['html_url']]
 
-                taiga_issue = Issue.objects.create(
+                page_issues.append((issue, Issue(
                     ref=issue['number'],
                     project=project,
                     owner=users_bindings.get(issue['user']['id'], self._user),
@@ -323,23 +338,9 @@ class GithubImporter:
                     external_reference=external_reference,
                     modified_date=issue['updated_at'],
                     created_date=issue['created_at'],
-                )
-
-                assignees = issue.get('assignees', [])
-                if len(assignees) > 1:
-                    for assignee in assignees:
-                        if assignee['id'] != issue.get('assignee', {}).get('id', None):
-                            assignee_user = users_bindings.get(assignee['id'], None)
-                            if assignee_user is not None:
-                                taiga_issue.add_watcher(assignee_user)
-
-                Issue.objects.filter(id=taiga_issue.id).update(
-                    ref=issue['number'],
-                    modified_date=issue['updated_at'],
-                    created_date=issue['created_at']
-                )
+                )))
 
-                take_snapshot(taiga_issue, comment="", user=None, delete=False)
+            self._save_issues_page(project, page_issues, users_bindings)
 
             if len(issues) < 100:
                 break
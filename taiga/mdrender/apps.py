@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.apps import AppConfig
+from django.apps import apps
+from django.db.models import signals
+
+
+def connect_mdrender_signals():
+    from . import signals as handlers
+    signals.post_save.connect(handlers.invalidate_render_cache_when_create_reference,
+                              sender=apps.get_model("references", "Reference"),
+                              dispatch_uid="mdrender_invalidate_reference")
+    signals.post_delete.connect(handlers.invalidate_render_cache_when_delete_reference,
+                                sender=apps.get_model("references", "Reference"),
+                                dispatch_uid="mdrender_invalidate_reference")
+    signals.post_save.connect(handlers.invalidate_render_cache_when_create_wiki_page,
+                              sender=apps.get_model("wiki", "WikiPage"),
+                              dispatch_uid="mdrender_invalidate_wiki_page")
+    signals.post_delete.connect(handlers.invalidate_render_cache_when_delete_wiki_page,
+                                sender=apps.get_model("wiki", "WikiPage"),
+                                dispatch_uid="mdrender_invalidate_wiki_page")
+
+
+class MdRenderAppConfig(AppConfig):
+    name = "taiga.mdrender"
+    verbose_name = "Markdown render"
+
+    def ready(self):
+        connect_mdrender_signals()
@@ -32,26 +32,27 @@ from taiga.front.templatetags.functions import resolve
 
 
 class TaigaReferencesExtension(Extension):
-    def __init__(self, project, *args, **kwargs):
+    def __init__(self, project=None, *args, **kwargs):
         self.project = project
         return super().__init__(*args, **kwargs)
 
     def extendMarkdown(self, md, md_globals):
+        # The references are resolved with `md.project`, so the same Markdown
+        # instance can be used to render texts of different projects.
+        md.project = self.project
+
         TAIGA_REFERENCE_RE = r'(?<=^|(?<=[^a-zA-Z0-9-\[]))#(\d+)'
-        referencesPattern = TaigaReferencesPattern(TAIGA_REFERENCE_RE, self.project)
+        referencesPattern = TaigaReferencesPattern(TAIGA_REFERENCE_RE)
         referencesPattern.md = md
         md.inlinePatterns.add('taiga-references', referencesPattern, '_begin')
 
 
 class TaigaReferencesPattern(Pattern):
-    def __init__(self, pattern, project):
-        self.project = project
-        super().__init__(pattern)
-
     def handleMatch(self, m):
         obj_ref = m.group(2)
+        project = self.md.project
 
-        instance = get_instance_by_ref(self.project.id, obj_ref)
+        instance = get_instance_by_ref(project.id, obj_ref)
         if instance is None or instance.content_object is None:
             return "#{}".format(obj_ref)
 
@@ -68,7 +69,7 @@ class TaigaReferencesPattern(Pattern):
         else:
             return "#{}".format(obj_ref)
 
-        url = resolve(instance.content_type.model, self.project.slug, obj_ref)
+        url = resolve(instance.content_type.model, project.slug, obj_ref)
 
         link_text = "&num;{}".format(obj_ref)
 
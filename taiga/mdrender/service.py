@@ -18,8 +18,14 @@
 
 import hashlib
 import functools
+import logging
+import threading
+import time
 import bleach
 
+from collections import OrderedDict
+from contextlib import contextmanager
+
 # BEGIN PATCH
 import html5lib
 from html5lib.serializer import HTMLSerializer
@@ -37,7 +43,10 @@ def _serialize(domtree):
 bleach._serialize = _serialize
 # END PATCH
 
-from django.core.cache import cache
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.utils.encoding import force_bytes
 
 from markdown import Markdown
@@ -87,41 +96,264 @@ def _make_extensions_list(project=None):
 import diff_match_patch
 
 
+logger = logging.getLogger(__name__)
+
+
+######################################################################
+## Render cache
+######################################################################
+
+# The rendered texts are cached in two tiers: a small LRU in the memory of
+# the process in front of the MDRENDER_CACHE backend (that should be shared
+# by all the workers). The keys include a version of the project, changed
+# with `invalidate_project_render_cache` when the wiki pages or the
+# references of the project change.
+
+class LRUCache(object):
+    """
+    A thread safe LRU cache with (at most) MDRENDER_LOCAL_CACHE_SIZE items.
+    """
+    def __init__(self):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                return None
+            return self._items[key]
+
+    def set(self, key, value):
+        maxsize = getattr(settings, "MDRENDER_LOCAL_CACHE_SIZE", 1024)
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class RenderCacheStats(object):
+    """
+    Hit and miss counters of the render cache of the current process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def incr(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        total = self.local_hits + self.shared_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.local_hits + self.shared_hits) / total if total else 0.0,
+        }
+
+
+_local_cache = LRUCache()
+_local_versions = {}
+_stats = RenderCacheStats()
+
+
+def get_render_cache_stats():
+    """
+    Return the hit and miss counters of the render cache of the current process.
+    """
+    return _stats.as_dict()
+
+
+def _get_shared_cache():
+    return caches[getattr(settings, "MDRENDER_CACHE", "default")]
+
+
+def _make_version_key(project_id):
+    return "mdrender-version-{}".format(project_id)
+
+
+def _get_project_version(project_id):
+    # The versions are kept some seconds in memory to avoid a request to the
+    # shared cache in every render
+    now = time.monotonic()
+    local_version = _local_versions.get(project_id, None)
+    if local_version is not None and local_version[1] > now:
+        return local_version[0]
+
+    shared_cache = _get_shared_cache()
+    version_key = _make_version_key(project_id)
+    version = shared_cache.get(version_key)
+    if version is None:
+        # Not an incremental number, the keys of an evicted version can't be reused
+        shared_cache.add(version_key, int(time.time() * 1000), timeout=None)
+        version = shared_cache.get(version_key)
+
+    _local_versions[project_id] = (version, now + getattr(settings, "MDRENDER_VERSION_TIMEOUT", 5))
+    return version
+
+
+def invalidate_project_render_cache(project_id):
+    """
+    Discard all the cached renders of a project.
+    """
+    shared_cache = _get_shared_cache()
+    version_key = _make_version_key(project_id)
+    try:
+        version = shared_cache.incr(version_key)
+    except ValueError:
+        version = int(time.time() * 1000)
+        shared_cache.set(version_key, version, timeout=None)
+
+    _local_versions[project_id] = (version, time.monotonic() + getattr(settings, "MDRENDER_VERSION_TIMEOUT", 5))
+
+
 def cache_by_sha(func):
     @functools.wraps(func)
     def _decorator(project, text):
-        sha1_hash = hashlib.sha1(force_bytes(text)).hexdigest()
-        key = "{}-{}".format(sha1_hash, project.id)
+        sha1_hash = hashlib.sha1(force_bytes(project.slug) + b"\0" + force_bytes(text)).hexdigest()
+        key = "mdrender-{}-{}-{}".format(project.id, _get_project_version(project.id), sha1_hash)
 
-        # Try to get it from the cache
-        cached = cache.get(key)
+        # Try to get it from the local cache
+        cached = _local_cache.get(key)
         if cached is not None:
+            _stats.incr("local_hits")
             return cached
 
+        # Try to get it from the shared cache
+        shared_cache = _get_shared_cache()
+        cached = shared_cache.get(key)
+        if cached is not None:
+            _stats.incr("shared_hits")
+            _local_cache.set(key, cached)
+            return cached
+
+        _stats.incr("misses")
         returned_value = func(project, text)
-        cache.set(key, returned_value, timeout=None)
+        try:
+            shared_cache.set(key, returned_value, timeout=getattr(settings, "MDRENDER_CACHE_TIMEOUT", None))
+        except Exception:
+            # Values that can't be pickled are only cached in memory
+            logger.warning("Error caching the render of '%s'", key, exc_info=True)
+        _local_cache.set(key, returned_value)
         return returned_value
 
     return _decorator
 
 
-def _get_markdown(project):
-    extensions = _make_extensions_list(project=project)
-    md = Markdown(extensions=extensions)
+######################################################################
+## Markdown converters pool
+######################################################################
+
+def _reset_markdown(md):
+    md.reset()
+    # The abbreviations are added as inline patterns and reset doesn't remove them
+    for key in [key for key in md.inlinePatterns.keys() if key.startswith("abbr-")]:
+        del md.inlinePatterns[key]
+    md.project = None
     md.extracted_data = {"mentions": [], "references": []}
-    return md
+
+
+class MarkdownPool(object):
+    """
+    A pool of Markdown converters with all the extensions already built, that
+    are expensive to create. The converters aren't bound to any project (the
+    project is set on every use) and every one is used by a single thread at
+    a time. At most MDRENDER_POOL_SIZE idle converters are kept.
+    """
+    def __init__(self):
+        self._converters = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def converter(self, project):
+        with self._lock:
+            md = self._converters.pop() if self._converters else None
+
+        if md is None:
+            md = Markdown(extensions=_make_extensions_list())
+            _reset_markdown(md)
+
+        md.project = project
+        yield md
+
+        # A converter that has failed is discarded (never returned to the pool)
+        _reset_markdown(md)
+        with self._lock:
+            if len(self._converters) < getattr(settings, "MDRENDER_POOL_SIZE", 16):
+                self._converters.append(md)
+
+    def clear(self):
+        with self._lock:
+            self._converters = []
+
+
+_markdown_pool = MarkdownPool()
+
+
+def _convert(project, text):
+    with _markdown_pool.converter(project) as md:
+        result = bleach.clean(md.convert(text))
+        return (result, md.extracted_data)
+
+
+def _dump_extracted_data(extracted_data):
+    # Only the ids are cached, the objects are loaded again on every use
+    return {
+        "mentions": [user.id for user in extracted_data["mentions"]],
+        "references": [(obj._meta.app_label, obj._meta.model_name, obj.pk)
+                       for obj in extracted_data["references"]],
+    }
+
+
+def _load_extracted_data(extracted_data):
+    users = get_user_model().objects.in_bulk(extracted_data["mentions"])
+
+    objs_ids = OrderedDict()
+    for app_label, model_name, obj_id in extracted_data["references"]:
+        objs_ids.setdefault((app_label, model_name), []).append(obj_id)
+    objs = {}
+    for (app_label, model_name), ids in objs_ids.items():
+        for obj_id, obj in apps.get_model(app_label, model_name).objects.in_bulk(ids).items():
+            objs[(app_label, model_name, obj_id)] = obj
+
+    return {
+        "mentions": [users[user_id] for user_id in extracted_data["mentions"] if user_id in users],
+        "references": [objs[tuple(key)] for key in extracted_data["references"] if tuple(key) in objs],
+    }
 
 
 @cache_by_sha
+def _render_and_extract(project, text):
+    result, extracted_data = _convert(project, text)
+    return (result, _dump_extracted_data(extracted_data))
+
+
 def render(project, text):
-    md = _get_markdown(project)
-    return bleach.clean(md.convert(text))
+    if not text:
+        return ""
+
+    return _render_and_extract(project, text)[0]
 
 
 def render_and_extract(project, text):
-    md = _get_markdown(project)
-    result = bleach.clean(md.convert(text))
-    return (result, md.extracted_data)
+    if not text:
+        return ("", {"mentions": [], "references": []})
+
+    result, extracted_data = _render_and_extract(project, text)
+    return (result, _load_extracted_data(extracted_data))
 
 
 class DiffMatchPatch(diff_match_patch.diff_match_patch):
@@ -172,4 +404,5 @@ def get_diff_of_htmls(html1, html2):
     return diffutil.diff_pretty_html(diffs)
 
 
-__all__ = ["render", "get_diff_of_htmls", "render_and_extract"]
+__all__ = ["render", "get_diff_of_htmls", "render_and_extract",
+           "invalidate_project_render_cache", "get_render_cache_stats"]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from .service import invalidate_project_render_cache
+
+
+# The renders of the references (#123) depend on the referenced objects and the
+# ones of the wiki links on the wiki pages of the project.
+
+def invalidate_render_cache_when_create_reference(sender, instance, created, **kwargs):
+    if created:
+        invalidate_project_render_cache(instance.project_id)
+
+
+def invalidate_render_cache_when_delete_reference(sender, instance, **kwargs):
+    invalidate_project_render_cache(instance.project_id)
+
+
+def invalidate_render_cache_when_create_wiki_page(sender, instance, created, **kwargs):
+    if created:
+        invalidate_project_render_cache(instance.project_id)
+
+
+def invalidate_render_cache_when_delete_wiki_page(sender, instance, **kwargs):
+    invalidate_project_render_cache(instance.project_id)
@@ -20,6 +20,13 @@
 from .choices import ADMINS_PERMISSIONS, MEMBERS_PERMISSIONS, ANON_PERMISSIONS
 
 from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+from taiga.base.utils.cache import is_shared_cache
+
+import uuid
 
 
 def _get_user_project_membership(user, project, cache="user"):
@@ -36,6 +43,81 @@ def _get_user_project_membership(user, project, cache="user"):
     return project.cached_memberships_for_user(user)
 
 
+######################################################################
+# Shared (cross request) cache of the memberships permissions data
+######################################################################
+
+def _get_permissions_cache():
+    return caches[getattr(settings, "PERMISSIONS_CACHE", "default")]
+
+
+def _is_permissions_cache_enabled():
+    # The invalidations must reach every process
+    return getattr(settings, "PERMISSIONS_CACHE_ENABLED", False) and is_shared_cache(_get_permissions_cache())
+
+
+def _get_project_version_key(project_id):
+    return "permissions:project-version:{}".format(project_id)
+
+
+def _get_project_permissions_version(project_id):
+    permissions_cache = _get_permissions_cache()
+    key = _get_project_version_key(project_id)
+
+    version = permissions_cache.get(key)
+    if version is None:
+        permissions_cache.add(key, uuid.uuid4().hex, None)
+        version = permissions_cache.get(key)
+    return version
+
+
+def invalidate_project_permissions_cache(project_id):
+    """
+    Discard the cached permissions data of all the users of a project. It is
+    done again on commit so no other request can cache the data it was
+    reading before the transaction ended.
+    """
+    def _invalidate():
+        _get_permissions_cache().set(_get_project_version_key(project_id), uuid.uuid4().hex, None)
+
+    _invalidate()
+    connection.on_commit(_invalidate)
+
+
+def _get_membership_data(membership):
+    if membership is None:
+        return None
+
+    return {
+        "is_admin": membership.is_admin,
+        "role_permissions": list(_get_membership_permissions(membership)),
+    }
+
+
+def _get_user_project_membership_data(user, project, cache="user"):
+    """
+    Return a dict with the data of the user membership in the project that
+    is relevant to calculate its permissions (or None if the user is not a
+    member). If PERMISSIONS_CACHE_ENABLED (and PERMISSIONS_CACHE is shared by
+    all the processes) it is shared between requests.
+    """
+    if user.is_anonymous():
+        return None
+
+    if not _is_permissions_cache_enabled():
+        return _get_membership_data(_get_user_project_membership(user, project, cache=cache))
+
+    permissions_cache = _get_permissions_cache()
+    key = "permissions:{}:{}:{}".format(project.id, _get_project_permissions_version(project.id), user.id)
+
+    cached = permissions_cache.get(key)
+    if cached is None:
+        cached = {"membership": _get_membership_data(_get_user_project_membership(user, project, cache=cache))}
+        permissions_cache.set(key, cached, getattr(settings, "PERMISSIONS_CACHE_TIMEOUT", 60*60))
+
+    return cached["membership"]
+
+
 def _get_object_project(obj):
     project = None
     Project = apps.get_model("projects", "Project")
@@ -65,8 +147,8 @@ def is_project_admin(user, obj):
     if project is None:
         return False
 
-    membership = _get_user_project_membership(user, project)
-    if membership and membership.is_admin:
+    membership_data = _get_user_project_membership_data(user, project)
+    if membership_data and membership_data["is_admin"]:
         return True
 
     return False
@@ -127,15 +209,15 @@ def get_user_project_permissions(user, project, cache="user"):
     cache param determines how memberships are calculated trying to reuse the existing data
     in cache
     """
-    membership = _get_user_project_membership(user, project, cache=cache)
-    is_member = membership is not None
-    is_admin = is_member and membership.is_admin
+    membership_data = _get_user_project_membership_data(user, project, cache=cache)
+    is_member = membership_data is not None
+    is_admin = is_member and membership_data["is_admin"]
     return calculate_permissions(
         is_authenticated = user.is_authenticated(),
         is_superuser =  user.is_superuser,
         is_member = is_member,
         is_admin = is_admin,
-        role_permissions = _get_membership_permissions(membership),
+        role_permissions = membership_data["role_permissions"] if is_member else [],
         anon_permissions = project.anon_permissions,
         public_permissions = project.public_permissions
     )
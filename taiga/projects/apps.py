@@ -66,6 +66,27 @@ def disconnect_memberships_signals():
                                  dispatch_uid='create-notify-policy')
 
 
+## Permissions cache Signals
+
+def connect_permissions_cache_signals():
+    from . import signals as handlers
+    for model in [apps.get_model("projects", "Membership"), apps.get_model("users", "Role")]:
+        signals.post_save.connect(handlers.invalidate_permissions_cache,
+                                  sender=model,
+                                  dispatch_uid="invalidate_permissions_cache_on_save")
+        signals.post_delete.connect(handlers.invalidate_permissions_cache,
+                                    sender=model,
+                                    dispatch_uid="invalidate_permissions_cache_on_delete")
+
+
+def disconnect_permissions_cache_signals():
+    for model in [apps.get_model("projects", "Membership"), apps.get_model("users", "Role")]:
+        signals.post_save.disconnect(sender=model,
+                                     dispatch_uid="invalidate_permissions_cache_on_save")
+        signals.post_delete.disconnect(sender=model,
+                                       dispatch_uid="invalidate_permissions_cache_on_delete")
+
+
 ## US Statuses Signals
 
 def connect_us_status_signals():
@@ -101,5 +122,6 @@ class ProjectsAppConfig(AppConfig):
     def ready(self):
         connect_projects_signals()
         connect_memberships_signals()
+        connect_permissions_cache_signals()
         connect_us_status_signals()
         connect_task_status_signals()
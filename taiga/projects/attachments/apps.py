@@ -18,8 +18,19 @@
 
 from django.apps import AppConfig
 from django.apps import apps
+from django.db.models import signals
+
+
+def connect_attachments_signals():
+    from . import signals as handlers
+    signals.post_save.connect(handlers.generate_thumbnails_when_upload_file,
+                              sender=apps.get_model("attachments", "Attachment"),
+                              dispatch_uid="attachments_generate_thumbnails")
 
 
 class AttachmentsAppConfig(AppConfig):
     name = "taiga.projects.attachments"
     verbose_name = "Attachments"
+
+    def ready(self):
+        connect_attachments_signals()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand
+
+from taiga.base.utils.thumbnails import get_thumbnail_generation_stats
+from taiga.projects.attachments.models import Attachment
+from taiga.projects.attachments.services import generate_attachment_thumbnails
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Generate the missing card, timeline and preview thumbnails of the attachments"
+
+    def handle(self, *args, **options):
+        attachment_ids = list(Attachment.objects.exclude(attached_file="")
+                                                .exclude(attached_file__isnull=True)
+                                                .order_by("id")
+                                                .values_list("id", flat=True))
+        total = rest = len(attachment_ids)
+
+        for attachment_id in attachment_ids:
+            generate_attachment_thumbnails(attachment_id)
+
+            rest -= 1
+            logger.debug("[{} / {} remaining] - Generate thumbnails for attach {}".format(rest, total, attachment_id))
+
+        for size, stats in sorted(get_thumbnail_generation_stats().items()):
+            self.stdout.write("{}: {generated} generated, {invalid} invalid, {failed} failed, "
+                              "avg {avg_time:.3f}s, max {max_time:.3f}s".format(size, **stats))
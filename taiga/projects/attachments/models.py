@@ -63,6 +63,7 @@ class Attachment(models.Model):
     order = models.IntegerField(default=0, null=False, blank=False, verbose_name=_("order"))
 
     _importing = None
+    _attached_file_changed = False
 
     class Meta:
         verbose_name = "attachment"
@@ -92,6 +93,7 @@ class Attachment(models.Model):
         if self.attached_file:
             if not self.sha1 or self.attached_file != self._orig_attached_file:
                 self._generate_sha1()
+                self._attached_file_changed = True
         save = super().save(*args, **kwargs)
         self._orig_attached_file = self.attached_file
         if self.attached_file:
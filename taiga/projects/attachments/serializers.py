@@ -77,6 +77,7 @@ class BasicAttachmentsInfoSerializerMixin(serializers.LightSerializer):
             return []
 
         for at in obj.attachments_attr:
-            at["thumbnail_card_url"] = get_thumbnail_url(at["attached_file"], settings.THN_ATTACHMENT_CARD)
+            at["thumbnail_card_url"] = get_thumbnail_url(at["attached_file"], settings.THN_ATTACHMENT_CARD,
+                                                         generate=False)
 
         return obj.attachments_attr
@@ -13,23 +13,128 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from django.apps import apps
 from django.conf import settings
+from django.db import connection, connections
+
+from taiga.base.utils.thumbnails import get_thumbnail_url, generate_thumbnails
+from taiga.celery import app
+
+import logging
+logger = logging.getLogger(__name__)
+
 
-from taiga.base.utils.thumbnails import get_thumbnail_url
+def get_attachment_thumbnail_sizes():
+    return (settings.THN_ATTACHMENT_TIMELINE,
+            settings.THN_ATTACHMENT_CARD,
+            settings.THN_ATTACHMENT_PREVIEW)
 
 
 def get_timeline_image_thumbnail_url(attachment):
     if attachment.attached_file:
-        return get_thumbnail_url(attachment.attached_file, settings.THN_ATTACHMENT_TIMELINE)
+        return get_thumbnail_url(attachment.attached_file, settings.THN_ATTACHMENT_TIMELINE, generate=False)
     return None
 
 
 def get_card_image_thumbnail_url(attachment):
     if attachment.attached_file:
-        return get_thumbnail_url(attachment.attached_file, settings.THN_ATTACHMENT_CARD)
+        return get_thumbnail_url(attachment.attached_file, settings.THN_ATTACHMENT_CARD, generate=False)
     return None
 
 def get_attachment_image_preview_url(attachment):
     if attachment.attached_file:
-        return get_thumbnail_url(attachment.attached_file, settings.THN_ATTACHMENT_PREVIEW)
+        return get_thumbnail_url(attachment.attached_file, settings.THN_ATTACHMENT_PREVIEW, generate=False)
     return None
+
+
+#####################################################
+# Thumbnails generation
+#####################################################
+
+def _update_history_thumbnail_url(attachment, thumb_url):
+    """
+    Set the timeline thumbnail url of `attachment` in the history entries of
+    its object frozen before the thumbnail was generated.
+    """
+    from taiga.projects.history.services import make_key_from_model_object, invalidate_last_snapshot_for_key
+    HistoryEntry = apps.get_model("history", "HistoryEntry")
+
+    def _update(attachments):
+        updated = False
+        for attach in attachments or []:
+            if attach.get("id") == attachment.id and attach.get("thumb_url") != thumb_url:
+                attach["thumb_url"] = thumb_url
+                updated = True
+        return updated
+
+    if attachment.content_object is None:
+        return
+
+    key = make_key_from_model_object(attachment.content_object)
+    for entry in HistoryEntry.objects.filter(key=key, created_at__gte=attachment.created_date):
+        attachments_lists = [(entry.snapshot or {}).get("attachments")]
+        attachments_lists += (entry.diff or {}).get("attachments", [])
+        if any([_update(attachments) for attachments in attachments_lists]):
+            entry.values_diff_cache = None
+            entry.save(update_fields=["snapshot", "diff", "values_diff_cache"])
+
+    invalidate_last_snapshot_for_key(key)
+
+
+@app.task
+def generate_attachment_thumbnails(attachment_id):
+    Attachment = apps.get_model("attachments", "Attachment")
+
+    try:
+        attachment = Attachment.objects.get(id=attachment_id)
+    except Attachment.DoesNotExist:
+        return
+
+    if attachment.attached_file:
+        urls = generate_thumbnails(attachment.attached_file, get_attachment_thumbnail_sizes())
+        _update_history_thumbnail_url(attachment, urls[settings.THN_ATTACHMENT_TIMELINE])
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_thumbnails_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=getattr(settings, "ATTACHMENT_THUMBNAILS_WORKERS", 2))
+        return _pool
+
+
+def _generate_attachment_thumbnails_in_pool(attachment_id):
+    try:
+        generate_attachment_thumbnails(attachment_id)
+    except Exception:
+        logger.exception("Error generating the thumbnails of attachment %s", attachment_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_attachment_thumbnails(attachment):
+    """
+    Generate the card, timeline and preview thumbnails of an attachment out of
+    the request, once the current transaction is commited.
+
+    With celery a task is queued, without it they are generated by a pool of
+    ATTACHMENT_THUMBNAILS_WORKERS threads. Until then the thumbnail urls of the
+    attachment are the url of the image (or None if browsers can't show it),
+    and the history entries frozen meanwhile are updated once they exist.
+    """
+    if not attachment.attached_file:
+        return
+
+    attachment_id = attachment.id
+    if settings.CELERY_ENABLED:
+        connection.on_commit(lambda: generate_attachment_thumbnails.delay(attachment_id))
+    else:
+        connection.on_commit(lambda: _get_thumbnails_pool().submit(_generate_attachment_thumbnails_in_pool,
+                                                                   attachment_id))
@@ -204,11 +204,10 @@ class EpicViewSet(OCCResourceMixin, VotedResourceMixin, HistoryResourceMixin, Wa
             status_id=data.get("status_id") or project.default_epic_status_id,
             project=project,
             owner=request.user,
-            callback=self.post_save, precall=self.pre_save)
+            callback=self.post_save_without_snapshot, precall=self.pre_save)
 
         epics = self.get_queryset().filter(id__in=[i.id for i in epics])
-        for epic in epics:
-            self.persist_history_snapshot(obj=epic)
+        self.persist_history_snapshots(epics, notify=True)
 
         epics_serialized = self.get_serializer_class()(epics, many=True)
 
@@ -290,9 +289,9 @@ class EpicRelatedUserStoryViewSet(NestedViewSetMixin, HistoryResourceMixin,
             owner=request.user
         )
 
-        for related_userstory in related_userstories:
-            self.persist_history_snapshot(obj=related_userstory)
-            self.persist_history_snapshot(obj=related_userstory.user_story)
+        self.persist_history_snapshots(related_userstories +
+                                       [related_userstory.user_story
+                                        for related_userstory in related_userstories])
 
         related_uss_serialized = self.get_serializer_class()(epic.relateduserstory_set.all(), many=True)
         return response.Ok(related_uss_serialized.data)
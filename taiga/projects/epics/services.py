@@ -28,7 +28,9 @@ from django.utils.translation import ugettext as _
 from taiga.base.utils import db, text
 from taiga.projects.epics.apps import connect_epics_signals
 from taiga.projects.epics.apps import disconnect_epics_signals
+from taiga.projects.references import models as refs
 from taiga.projects.services import apply_order_updates
+from taiga.projects.services import get_orders_to_update
 from taiga.projects.userstories.apps import connect_userstories_signals
 from taiga.projects.userstories.apps import disconnect_userstories_signals
 from taiga.projects.userstories.services import get_userstories_from_bulk
@@ -65,11 +67,16 @@ def create_epics_in_bulk(bulk_data, callback=None, precall=None, **additional_fi
     :return: List of created `Epic` instances.
     """
     epics = get_epics_from_bulk(bulk_data, **additional_fields)
+    project = additional_fields.get("project")
+    if project is not None:
+        refs.reserve_references_in_bulk(epics, project)
 
     disconnect_epics_signals()
 
     try:
         db.save_in_bulk(epics, callback, precall)
+        if project is not None:
+            refs.make_references_in_bulk(epics, project)
     finally:
         connect_epics_signals()
 
@@ -83,10 +90,8 @@ def update_epics_order_in_bulk(bulk_data: list, field: str, project: object):
 
     [{'epic_id': <value>, 'order': <value>}, ...]
     """
-    epics = project.epics.all()
-
-    epic_orders = {e.id: getattr(e, field) for e in epics}
     new_epic_orders = {d["epic_id"]: d["order"] for d in bulk_data}
+    epic_orders = get_orders_to_update(project.epics.all(), field, new_epic_orders)
     apply_order_updates(epic_orders, new_epic_orders)
 
     epic_ids = epic_orders.keys()
@@ -109,10 +114,12 @@ def create_related_userstories_in_bulk(bulk_data, epic, **additional_fields):
     """
     userstories = get_userstories_from_bulk(bulk_data, **additional_fields)
     project = additional_fields.get("project")
+    refs.reserve_references_in_bulk(userstories, project)
     disconnect_userstories_signals()
 
     try:
         db.save_in_bulk(userstories)
+        refs.make_references_in_bulk(userstories, project)
         related_userstories = []
         for userstory in userstories:
             related_userstories.append(
@@ -138,12 +145,11 @@ def update_epic_related_userstories_order_in_bulk(bulk_data: list, epic: object)
     [{'us_id': <value>, 'order': <value>}, ...]
     """
     related_user_stories = epic.relateduserstory_set.all()
-    # select_related
-    rus_orders = {rus.id: rus.order for rus in related_user_stories}
-
-    rus_conversion = {rus.user_story_id: rus.id for rus in related_user_stories}
+    rus_conversion = dict(related_user_stories.filter(user_story_id__in=[e["us_id"] for e in bulk_data])
+                                              .values_list("user_story_id", "id"))
     new_rus_orders = {rus_conversion[e["us_id"]]: e["order"] for e in bulk_data
                       if e["us_id"] in rus_conversion}
+    rus_orders = get_orders_to_update(related_user_stories, "order", new_rus_orders)
 
     apply_order_updates(rus_orders, new_rus_orders)
 
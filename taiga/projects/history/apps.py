@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from celery import signals as celery_signals
+
+from django.apps import AppConfig
+from django.apps import apps
+from django.db.models import signals
+
+
+def on_delete_history_entry(sender, instance, **kwargs):
+    from .services import invalidate_last_snapshot_for_key
+    if instance.key:
+        invalidate_last_snapshot_for_key(instance.key)
+
+
+def on_task_prerun(**kwargs):
+    from .freeze_impl import open_values_memo
+    open_values_memo()
+
+
+def on_task_postrun(**kwargs):
+    from .freeze_impl import close_values_memo
+    close_values_memo()
+
+
+class HistoryAppConfig(AppConfig):
+    name = "taiga.projects.history"
+    verbose_name = "History"
+
+    def ready(self):
+        signals.post_delete.connect(on_delete_history_entry,
+                                    sender=apps.get_model("history", "HistoryEntry"),
+                                    dispatch_uid="history_snapshot_cache")
+
+        # Memoize the resolved history values for the whole task
+        celery_signals.task_prerun.connect(on_task_prerun, dispatch_uid="history_values_memo")
+        celery_signals.task_postrun.connect(on_task_postrun, dispatch_uid="history_values_memo")
@@ -16,12 +16,14 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from contextlib import contextmanager
 from contextlib import suppress
 
 from functools import partial
 from django.apps import apps
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 
 from taiga.base.utils.iterators import as_tuple
@@ -31,43 +33,127 @@ from taiga.mdrender.service import render as mdrender
 from taiga.projects.attachments.services import get_timeline_image_thumbnail_url
 
 import os
+import threading
+
+####################
+# Values memo
+####################
+
+_local = threading.local()
+
+
+def open_values_memo():
+    """
+    Start memoizing the resolved values (id -> name) of the history diffs
+    in the current thread. Calls can be nested, the memo is shared until
+    the outer block is closed.
+    """
+    if getattr(_local, "memo_depth", 0) == 0:
+        _local.memo = {}
+    _local.memo_depth = getattr(_local, "memo_depth", 0) + 1
+
+
+def close_values_memo():
+    _local.memo_depth = max(getattr(_local, "memo_depth", 0) - 1, 0)
+    if _local.memo_depth == 0:
+        _local.memo = None
+
+
+@contextmanager
+def values_memo():
+    open_values_memo()
+    try:
+        yield
+    finally:
+        close_values_memo()
+
+
+def _get_values_cache_key(typename:str, id:str) -> str:
+    return "history-values:{}:{}".format(typename, id)
+
+
+def _resolve_values(typename:str, ids, fetch_fn, *, shared_cache:bool=False) -> dict:
+    """
+    Resolve `ids` with `fetch_fn` (that receives a set of ids and returns a
+    dict with the values of the existing ones) only for the ids not found in
+    the current memo or, if `shared_cache` is True and
+    HISTORY_VALUES_CACHE_TIMEOUT is set, in the django cache.
+    """
+    ids = {str(id) for id in ids if id is not None}
+    memo = getattr(_local, "memo", None)
+    resolved = {} if memo is None else memo.setdefault(typename, {})
+
+    values = {id: resolved[id] for id in ids if id in resolved}
+    missing = ids - values.keys()
+    cache_timeout = getattr(settings, "HISTORY_VALUES_CACHE_TIMEOUT", 0) if shared_cache else 0
+
+    if missing and cache_timeout:
+        cache_keys = {_get_values_cache_key(typename, id): id for id in missing}
+        for cache_key, value in cache.get_many(list(cache_keys.keys())).items():
+            values[cache_keys[cache_key]] = value
+        missing = ids - values.keys()
+
+    if missing:
+        fetched = fetch_fn(missing)
+        if cache_timeout and fetched:
+            cache.set_many({_get_values_cache_key(typename, id): value for id, value in fetched.items()},
+                           cache_timeout)
+        values.update(fetched)
+
+    # The memo lives for the whole request or task, it is reset when it grows
+    # too much (long imports or bulk tasks). The ids of the missing objects are
+    # not stored because they can be created later in the same task.
+    new_values = {id: value for id, value in values.items() if id not in resolved}
+    if len(resolved) + len(new_values) > getattr(settings, "HISTORY_VALUES_MEMO_SIZE", 10000):
+        resolved.clear()
+    resolved.update(new_values)
+
+    return {id: value for id, value in values.items() if value is not None}
+
 
 ####################
 # Values
 ####################
 
 @as_dict
-def _get_generic_values(ids:tuple, *, typename=None, attr:str="name") -> tuple:
-    app_label, model_name = typename.split(".", 1)
-    content_type = ContentType.objects.get(app_label=app_label, model=model_name)
-    model_cls = content_type.model_class()
-
-    ids = filter(lambda x: x is not None, ids)
-    qs = model_cls.objects.filter(pk__in=ids)
+def _fetch_generic_values(ids:set, *, model_cls, attr:str) -> dict:
+    qs = model_cls.objects.filter(pk__in=tuple(ids))
     for instance in qs:
         yield str(instance.pk), getattr(instance, attr)
 
 
+def _get_generic_values(ids:tuple, *, typename=None, attr:str="name", shared_cache:bool=True) -> dict:
+    model_cls = apps.get_model(typename)
+    fetch_fn = partial(_fetch_generic_values, model_cls=model_cls, attr=attr)
+    return _resolve_values(typename, ids, fetch_fn, shared_cache=shared_cache)
+
+
 @as_dict
-def _get_users_values(ids:set) -> dict:
+def _fetch_users_values(ids:set) -> dict:
     user_model = get_user_model()
-    ids = filter(lambda x: x is not None, ids)
     qs = user_model.objects.filter(pk__in=tuple(ids))
 
     for user in qs:
         yield str(user.pk), user.get_full_name()
 
 
+def _get_users_values(ids:set) -> dict:
+    return _resolve_values("users.user", ids, _fetch_users_values)
+
+
 @as_dict
-def _get_user_story_values(ids:set) -> dict:
+def _fetch_user_story_values(ids:set) -> dict:
     userstory_model = apps.get_model("userstories", "UserStory")
-    ids = filter(lambda x: x is not None, ids)
     qs = userstory_model.objects.filter(pk__in=tuple(ids))
 
     for userstory in qs:
         yield str(userstory.pk), "#{} {}".format(userstory.ref, userstory.subject)
 
 
+def _get_user_story_values(ids:set) -> dict:
+    return _resolve_values("userstories.userstory", ids, _fetch_user_story_values)
+
+
 _get_us_status_values = partial(_get_generic_values, typename="projects.userstorystatus")
 _get_task_status_values = partial(_get_generic_values, typename="projects.taskstatus")
 _get_epic_status_values = partial(_get_generic_values, typename="projects.epicstatus")
@@ -77,7 +163,7 @@ _get_role_values = partial(_get_generic_values, typename="users.role")
 _get_points_values = partial(_get_generic_values, typename="projects.points")
 _get_priority_values = partial(_get_generic_values, typename="projects.priority")
 _get_severity_values = partial(_get_generic_values, typename="projects.severity")
-_get_milestone_values = partial(_get_generic_values, typename="milestones.milestone")
+_get_milestone_values = partial(_get_generic_values, typename="milestones.milestone", shared_cache=False)
 
 
 def _common_users_values(diff):
@@ -325,11 +411,8 @@ def epic_related_userstory_freezer(related_us) -> dict:
 
 
 def userstory_freezer(us) -> dict:
-    rp_cls = apps.get_model("userstories", "RolePoints")
-    rpqsd = rp_cls.objects.filter(user_story=us)
-
     points = {}
-    for rp in rpqsd:
+    for rp in us.role_points.all():
         points[str(rp.role_id)] = rp.points_id
 
     snapshot = {
@@ -18,7 +18,9 @@
 
 import warnings
 
+from .services import make_key_from_model_object
 from .services import take_snapshot
+from .services import take_snapshots_in_bulk
 from taiga.projects.notifications import services as notifications_services
 from taiga.base.api import serializers
 from taiga.base.fields import MethodField
@@ -35,6 +37,7 @@ class HistoryResourceMixin(object):
     # notifications mixin.
     __last_history = None
     __object_saved = False
+    __snapshot_deferred = False
 
     def get_last_history(self):
         if not self.__object_saved:
@@ -75,8 +78,55 @@ class HistoryResourceMixin(object):
         self.__last_history = take_snapshot(sobj, comment=comment, user=user, delete=delete)
         self.__object_saved = True
 
+    def persist_history_snapshots(self, objs, notify:bool=False):
+        """
+        Bulk version of `persist_history_snapshot` for the
+        bulk endpoints. With `notify` the change notifications
+        of the new entries are sent too (the objects saved with
+        `post_save_without_snapshot` have not sent them).
+        """
+
+        user = self.request.user
+        comment = ""
+        if isinstance(self.request.DATA, dict):
+            comment = self.request.DATA.get("comment", "")
+
+        sobjs = []
+        for obj in objs:
+            notifications_services.analize_object_for_watchers(obj, comment, user)
+            sobjs.append(self.get_object_for_snapshot(obj))
+
+        entries = take_snapshots_in_bulk(sobjs, comment=comment, user=user)
+        if entries:
+            self.__last_history = entries[-1]
+        self.__object_saved = True
+
+        if notify and hasattr(self, "send_notifications"):
+            objs_by_key = {make_key_from_model_object(sobj): obj for obj, sobj in zip(objs, sobjs)}
+            for entry in entries:
+                self.send_notifications(objs_by_key[entry.key], history=entry)
+
+        return entries
+
+    def post_save_without_snapshot(self, obj, created=False):
+        """
+        `post_save` callback for the bulk endpoints. The snapshots
+        are taken later for all the objects at once with
+        `persist_history_snapshots`.
+        """
+        self.__snapshot_deferred = True
+        try:
+            self.post_save(obj, created=created)
+        finally:
+            self.__snapshot_deferred = False
+
     def post_save(self, obj, created=False):
-        self.persist_history_snapshot(obj=obj)
+        if self.__snapshot_deferred:
+            # There is no history entry yet for this object
+            self.__last_history = None
+            self.__object_saved = True
+        else:
+            self.persist_history_snapshot(obj=obj)
         super().post_save(obj, created=created)
 
     def pre_delete(self, obj):
@@ -29,6 +29,7 @@ This is possible example:
           # Do something...
           history.persist_history(object, user=request.user)
 """
+import json
 import logging
 from collections import namedtuple
 from copy import deepcopy
@@ -38,10 +39,14 @@ from functools import wraps
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.apps import apps
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction as tx
+from django.db.models import signals
 from django_pglocks import advisory_lock
 
 from taiga.mdrender.service import render as mdrender
+from taiga.base.utils.db import advisory_xact_locks
 from taiga.base.utils.db import get_typename_for_model_class
 from taiga.base.utils.diff import make_diff as make_diff_from_dicts
 
@@ -67,6 +72,8 @@ from .freeze_impl import issue_values
 from .freeze_impl import task_values
 from .freeze_impl import wikipage_values
 
+from .freeze_impl import values_memo
+
 # Type that represents a freezed object
 FrozenObj = namedtuple("FrozenObj", ["key", "snapshot"])
 FrozenDiff = namedtuple("FrozenDiff", ["key", "diff", "snapshot"])
@@ -77,6 +84,10 @@ _freeze_impl_map = {}
 # Dict containing registred containing with their values implementation.
 _values_impl_map = {}
 
+# Dict containing registred contentypes with the (select_related, prefetch_related)
+# lookups their freeze implementation needs to freeze many instances at once.
+_freeze_related_map = {}
+
 # Not important fields for models (history entries with only
 # this fields are marked as hidden).
 _not_important_fields = {
@@ -145,16 +156,22 @@ def register_values_implementation(typename: str, fn=None):
     return _wrapper
 
 
-def register_freeze_implementation(typename: str, fn=None):
+def register_freeze_implementation(typename: str, fn=None, *, select_related=(), prefetch_related=()):
     """
     Register freeze implementation for specified typename.
     This function can be used as decorator.
+
+    `select_related` and `prefetch_related` are the lookups used to load
+    the instances when they are freezed in bulk.
     """
 
     assert isinstance(typename, str), "typename must be specied"
 
     if fn is None:
-        return partial(register_freeze_implementation, typename)
+        return partial(register_freeze_implementation, typename,
+                       select_related=select_related, prefetch_related=prefetch_related)
+
+    _freeze_related_map[typename] = (tuple(select_related), tuple(prefetch_related))
 
     @wraps(fn)
     def _wrapper(*args, **kwargs):
@@ -166,6 +183,19 @@ def register_freeze_implementation(typename: str, fn=None):
 
 # Low level api
 
+def _freeze_instance(obj: object) -> FrozenObj:
+    typename = get_typename_for_model_class(obj.__class__)
+    if typename not in _freeze_impl_map:
+        raise RuntimeError("No implementation found for {}".format(typename))
+
+    key = make_key_from_model_object(obj)
+    impl_fn = _freeze_impl_map[typename]
+    snapshot = impl_fn(obj)
+    assert isinstance(snapshot, dict), "freeze handlers should return always a dict"
+
+    return FrozenObj(key, snapshot)
+
+
 def freeze_model_instance(obj: object) -> FrozenObj:
     """
     Creates a new frozen object from model instance.
@@ -184,16 +214,40 @@ def freeze_model_instance(obj: object) -> FrozenObj:
     except model_cls.DoesNotExist:
         return None
 
-    typename = get_typename_for_model_class(model_cls)
-    if typename not in _freeze_impl_map:
-        raise RuntimeError("No implementation found for {}".format(typename))
+    return _freeze_instance(obj)
 
-    key = make_key_from_model_object(obj)
-    impl_fn = _freeze_impl_map[typename]
-    snapshot = impl_fn(obj)
-    assert isinstance(snapshot, dict), "freeze handlers should return always a dict"
 
-    return FrozenObj(key, snapshot)
+def freeze_model_instances(objs) -> dict:
+    """
+    Creates the frozen objects of a list of model instances.
+
+    The instances are loaded again with one query per model (plus the
+    registered prefetches) instead of one per instance. Returns a dict
+    with the FrozenObj of each key, or None if the object was removed.
+    """
+
+    objs_by_model = {}
+    for obj in objs:
+        objs_by_model.setdefault(obj.__class__, []).append(obj)
+
+    result = {}
+    for model_cls, model_objs in objs_by_model.items():
+        typename = get_typename_for_model_class(model_cls)
+        select_related, prefetch_related = _freeze_related_map.get(typename, ((), ()))
+
+        qs = model_cls.objects.filter(pk__in=[obj.pk for obj in model_objs])
+        if select_related:
+            qs = qs.select_related(*select_related)
+        if prefetch_related:
+            qs = qs.prefetch_related(*prefetch_related)
+        instances_by_pk = {instance.pk: instance for instance in qs}
+
+        for obj in model_objs:
+            instance = instances_by_pk.get(obj.pk, None)
+            key = make_key_from_model_object(obj)
+            result[key] = None if instance is None else _freeze_instance(instance)
+
+    return result
 
 
 def is_hidden_snapshot(obj: FrozenDiff) -> bool:
@@ -259,9 +313,42 @@ def _rebuild_snapshot_from_diffs(keysnapshot, partials):
     return result
 
 
-def get_last_snapshot_for_key(key: str) -> FrozenObj:
+def _get_snapshot_cache_key(key: str) -> str:
+    return "history-snapshot:{}".format(key)
+
+
+def _cache_last_snapshot(key: str, entry_id: str, snapshot: dict, partials: int):
+    """
+    Cache the snapshot rebuilt up to the history entry `entry_id` and the
+    number of partial entries after the last real snapshot.
+    """
+    # Keep the same types the snapshots have when they are read from the
+    # json fields (lists instead of tuples, serialized dates...)
+    snapshot = json.loads(json.dumps(snapshot, cls=DjangoJSONEncoder))
+    cache.set(_get_snapshot_cache_key(key),
+              {"entry_id": entry_id, "snapshot": snapshot, "partials": partials},
+              getattr(settings, "HISTORY_SNAPSHOTS_CACHE_TIMEOUT", 60*60*24))
+
+
+def invalidate_last_snapshot_for_key(key: str):
+    cache.delete(_get_snapshot_cache_key(key))
+
+
+def _get_last_snapshot_and_partials_for_key(key: str):
     entry_model = apps.get_model("history", "HistoryEntry")
 
+    # The cached snapshot is valid while the last entry of the key is the
+    # last one it includes.
+    cached = cache.get(_get_snapshot_cache_key(key))
+    if cached is not None:
+        last_entry_id = (entry_model.objects
+                         .filter(key=key)
+                         .order_by("-created_at")
+                         .values_list("id", flat=True)
+                         .first())
+        if last_entry_id == cached["entry_id"]:
+            return FrozenObj(key, cached["snapshot"]), cached["partials"]
+
     # Search last snapshot
     qs = (entry_model.objects
           .filter(key=key, is_snapshot=True)
@@ -269,7 +356,7 @@ def get_last_snapshot_for_key(key: str) -> FrozenObj:
 
     keysnapshot = qs.first()
     if keysnapshot is None:
-        return None, True
+        return None, None
 
     # Get all partial snapshots
     entries = tuple(entry_model.objects
@@ -278,12 +365,23 @@ def get_last_snapshot_for_key(key: str) -> FrozenObj:
                     .order_by("created_at"))
 
     snapshot = _rebuild_snapshot_from_diffs(keysnapshot.snapshot, entries)
+    last_entry = entries[-1] if entries else keysnapshot
+    _cache_last_snapshot(key, last_entry.id, snapshot, len(entries))
+
+    return FrozenObj(keysnapshot.key, snapshot), len(entries)
+
+
+def get_last_snapshot_for_key(key: str) -> FrozenObj:
+    fobj, partials = _get_last_snapshot_and_partials_for_key(key)
+    if fobj is None:
+        return None, True
+
     max_partial_diffs = getattr(settings, "MAX_PARTIAL_DIFFS", 60)
 
-    if len(entries) >= max_partial_diffs:
-        return FrozenObj(keysnapshot.key, snapshot), True
+    if partials >= max_partial_diffs:
+        return fobj, True
 
-    return FrozenObj(keysnapshot.key, snapshot), False
+    return fobj, False
 
 
 # Public api
@@ -306,6 +404,97 @@ def get_modified_fields(obj: object, last_modifications):
     return modified_fields
 
 
+def _get_last_snapshots_and_partials_for_keys(keys) -> dict:
+    """
+    Bulk version of `_get_last_snapshot_and_partials_for_key`. The cached
+    snapshots are validated with one query for all the keys; only the keys
+    without a valid cached snapshot are rebuilt one by one.
+    """
+    entry_model = apps.get_model("history", "HistoryEntry")
+
+    cached = cache.get_many([_get_snapshot_cache_key(key) for key in keys])
+    last_entry_ids = dict(entry_model.objects
+                          .filter(key__in=keys)
+                          .order_by("key", "-created_at")
+                          .distinct("key")
+                          .values_list("key", "id"))
+
+    result = {}
+    for key in keys:
+        if key not in last_entry_ids:
+            result[key] = (None, None)
+            continue
+
+        cached_snapshot = cached.get(_get_snapshot_cache_key(key), None)
+        if cached_snapshot is not None and cached_snapshot["entry_id"] == last_entry_ids[key]:
+            result[key] = (FrozenObj(key, cached_snapshot["snapshot"]), cached_snapshot["partials"])
+        else:
+            result[key] = _get_last_snapshot_and_partials_for_key(key)
+
+    return result
+
+
+def _build_history_entry(obj: object, new_fobj: FrozenObj, old_fobj: FrozenObj, old_partials: int, *,
+                         comment: str, comment_html: str, user, delete: bool):
+    """
+    Build, without saving it, the history entry of the changes between
+    `old_fobj` and `new_fobj`. Returns None if there is nothing to record.
+    """
+    typename = get_typename_for_model_class(obj.__class__)
+    need_real_snapshot = (old_fobj is None or
+                          old_partials >= getattr(settings, "MAX_PARTIAL_DIFFS", 60))
+
+    entry_model = apps.get_model("history", "HistoryEntry")
+    user_id = None if user is None else user.id
+    user_name = "" if user is None else user.get_full_name()
+
+    # Determine history type
+    if delete:
+        entry_type = HistoryType.delete
+        need_real_snapshot = True
+    elif new_fobj and not old_fobj:
+        entry_type = HistoryType.create
+    elif new_fobj and old_fobj:
+        entry_type = HistoryType.change
+    else:
+        raise RuntimeError("Unexpected condition")
+
+    fdiff = make_diff(old_fobj, new_fobj)
+
+    # If diff and comment are empty, do
+    # not create empty history entry
+    if (not fdiff.diff and not comment and old_fobj is not None and entry_type != HistoryType.delete):
+        return None
+
+    fvals = make_diff_values(typename, fdiff)
+
+    if len(comment) > 0:
+        is_hidden = False
+    else:
+        is_hidden = is_hidden_snapshot(fdiff)
+
+    return entry_model(user={"pk": user_id, "name": user_name},
+                       project_id=getattr(obj, 'project_id', getattr(obj, 'id', None)),
+                       key=make_key_from_model_object(obj),
+                       type=entry_type,
+                       snapshot=fdiff.snapshot if need_real_snapshot else None,
+                       diff=fdiff.diff,
+                       values=fvals,
+                       comment=comment,
+                       comment_html=comment_html,
+                       is_hidden=is_hidden,
+                       is_snapshot=need_real_snapshot)
+
+
+def _update_last_snapshot_cache(entry, old_fobj: FrozenObj, old_partials: int):
+    # Update the cached last snapshot so the next entry don't need to rebuild it
+    if entry.is_snapshot:
+        _cache_last_snapshot(entry.key, entry.id, entry.snapshot, 0)
+    else:
+        snapshot = _rebuild_snapshot_from_diffs(old_fobj.snapshot, [entry])
+        _cache_last_snapshot(entry.key, entry.id, snapshot, old_partials + 1)
+
+
 @tx.atomic
 def take_snapshot(obj: object, *, comment: str="", user=None, delete: bool=False):
     """
@@ -318,55 +507,81 @@ def take_snapshot(obj: object, *, comment: str="", user=None, delete: bool=False
 
     key = make_key_from_model_object(obj)
     with advisory_lock("history-"+key):
-        typename = get_typename_for_model_class(obj.__class__)
-
         new_fobj = freeze_model_instance(obj)
-        old_fobj, need_real_snapshot = get_last_snapshot_for_key(key)
+        old_fobj, old_partials = _get_last_snapshot_and_partials_for_key(key)
 
-        entry_model = apps.get_model("history", "HistoryEntry")
-        user_id = None if user is None else user.id
-        user_name = "" if user is None else user.get_full_name()
-
-        # Determine history type
-        if delete:
-            entry_type = HistoryType.delete
-            need_real_snapshot = True
-        elif new_fobj and not old_fobj:
-            entry_type = HistoryType.create
-        elif new_fobj and old_fobj:
-            entry_type = HistoryType.change
-        else:
-            raise RuntimeError("Unexpected condition")
+        entry = _build_history_entry(obj, new_fobj, old_fobj, old_partials,
+                                     comment=comment, comment_html=mdrender(obj.project, comment),
+                                     user=user, delete=delete)
+        if entry is None:
+            return None
 
-        fdiff = make_diff(old_fobj, new_fobj)
+        entry.save(force_insert=True)
+        _update_last_snapshot_cache(entry, old_fobj, old_partials)
 
-        # If diff and comment are empty, do
-        # not create empty history entry
-        if (not fdiff.diff and not comment and old_fobj is not None and entry_type != HistoryType.delete):
-            return None
+        return entry
 
-        fvals = make_diff_values(typename, fdiff)
 
-        if len(comment) > 0:
-            is_hidden = False
-        else:
-            is_hidden = is_hidden_snapshot(fdiff)
+@tx.atomic
+def take_snapshots_in_bulk(objs, *, comment: str="", user=None) -> list:
+    """
+    Bulk version of `take_snapshot` for lists of model instances (of one
+    or more models) changed by the same user.
+
+    The instances are freezed with a fixed number of queries per model and
+    all the history entries are inserted at once. Returns the list of
+    created entries; removed instances or instances without changes don't
+    create any entry.
+    """
+
+    objs_by_key = {}
+    for obj in objs:
+        objs_by_key.setdefault(make_key_from_model_object(obj), obj)
+
+    if not objs_by_key:
+        return []
+
+    keys = sorted(objs_by_key.keys())
+    with values_memo():
+        # The same locks of take_snapshot, released on commit
+        advisory_xact_locks(["history-"+key for key in keys])
+
+        new_fobjs = freeze_model_instances(objs_by_key.values())
+        old_fobjs = _get_last_snapshots_and_partials_for_keys(keys)
+
+        comments_html = {}
+        entries = []
+        for key in keys:
+            obj = objs_by_key[key]
+            new_fobj = new_fobjs[key]
+            if new_fobj is None:
+                # Removed while it was processed
+                continue
+
+            project_id = getattr(obj, 'project_id', getattr(obj, 'id', None))
+            if project_id not in comments_html:
+                comments_html[project_id] = mdrender(obj.project, comment)
+
+            old_fobj, old_partials = old_fobjs[key]
+            entry = _build_history_entry(obj, new_fobj, old_fobj, old_partials,
+                                         comment=comment, comment_html=comments_html[project_id],
+                                         user=user, delete=False)
+            if entry is not None:
+                entries.append(entry)
+
+        entry_model = apps.get_model("history", "HistoryEntry")
+        entry_model.objects.bulk_create(entries)
+
+        for entry in entries:
+            old_fobj, old_partials = old_fobjs[entry.key]
+            _update_last_snapshot_cache(entry, old_fobj, old_partials)
 
-        kwargs = {
-            "user": {"pk": user_id, "name": user_name},
-            "project_id": getattr(obj, 'project_id', getattr(obj, 'id', None)),
-            "key": key,
-            "type": entry_type,
-            "snapshot": fdiff.snapshot if need_real_snapshot else None,
-            "diff": fdiff.diff,
-            "values": fvals,
-            "comment": comment,
-            "comment_html": mdrender(obj.project, comment),
-            "is_hidden": is_hidden,
-            "is_snapshot": need_real_snapshot,
-        }
+            # bulk_create doesn't send post_save, the timeline and the
+            # webhooks are subscribed to it.
+            signals.post_save.send(sender=entry_model, instance=entry, created=True,
+                                   update_fields=None, raw=False, using=entry._state.db)
 
-        return entry_model.objects.create(**kwargs)
+        return entries
 
 
 # High level query api
@@ -399,12 +614,24 @@ def prefetch_owners_in_history_queryset(qs):
 # Freeze & value register
 register_freeze_implementation("projects.project", project_freezer)
 register_freeze_implementation("milestones.milestone", milestone_freezer,)
-register_freeze_implementation("epics.epic", epic_freezer)
-register_freeze_implementation("epics.relateduserstory", epic_related_userstory_freezer)
-register_freeze_implementation("userstories.userstory", userstory_freezer)
-register_freeze_implementation("issues.issue", issue_freezer)
-register_freeze_implementation("tasks.task", task_freezer)
-register_freeze_implementation("wiki.wikipage", wikipage_freezer)
+register_freeze_implementation("epics.epic", epic_freezer,
+                               select_related=("project", "status", "custom_attributes_values"),
+                               prefetch_related=("attachments", "project__epiccustomattributes"))
+register_freeze_implementation("epics.relateduserstory", epic_related_userstory_freezer,
+                               select_related=("user_story", "epic"))
+register_freeze_implementation("userstories.userstory", userstory_freezer,
+                               select_related=("project", "status", "custom_attributes_values"),
+                               prefetch_related=("attachments", "role_points",
+                                                 "project__userstorycustomattributes"))
+register_freeze_implementation("issues.issue", issue_freezer,
+                               select_related=("project", "status", "custom_attributes_values"),
+                               prefetch_related=("attachments", "project__issuecustomattributes"))
+register_freeze_implementation("tasks.task", task_freezer,
+                               select_related=("project", "status", "custom_attributes_values"),
+                               prefetch_related=("attachments", "project__taskcustomattributes"))
+register_freeze_implementation("wiki.wikipage", wikipage_freezer,
+                               select_related=("project",),
+                               prefetch_related=("attachments",))
 
 register_values_implementation("projects.project", project_values)
 register_values_implementation("milestones.milestone", milestone_values)
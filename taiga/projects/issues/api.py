@@ -231,9 +231,11 @@ class IssueViewSet(OCCResourceMixin, VotedResourceMixin, HistoryResourceMixin, W
                 data["bulk_issues"], project=project, owner=request.user,
                 status=project.default_issue_status, severity=project.default_severity,
                 priority=project.default_priority, type=project.default_issue_type,
-                callback=self.post_save, precall=self.pre_save)
+                callback=self.post_save_without_snapshot, precall=self.pre_save)
 
             issues = self.get_queryset().filter(id__in=[i.id for i in issues])
+            self.persist_history_snapshots(issues, notify=True)
+
             issues_serialized = self.get_serializer_class()(issues, many=True)
 
             return response.Ok(data=issues_serialized.data)
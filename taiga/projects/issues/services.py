@@ -26,6 +26,7 @@ from django.db import connection
 from django.utils.translation import ugettext as _
 
 from taiga.base.utils import db, text
+from taiga.projects.references import models as refs
 from taiga.projects.issues.apps import (
     connect_issues_signals,
     disconnect_issues_signals)
@@ -61,11 +62,16 @@ def create_issues_in_bulk(bulk_data, callback=None, precall=None, **additional_f
     :return: List of created `Issue` instances.
     """
     issues = get_issues_from_bulk(bulk_data, **additional_fields)
+    project = additional_fields.get("project")
+    if project is not None:
+        refs.reserve_references_in_bulk(issues, project)
 
     disconnect_issues_signals()
 
     try:
         db.save_in_bulk(issues, callback, precall)
+        if project is not None:
+            refs.make_references_in_bulk(issues, project)
     finally:
         connect_issues_signals()
 
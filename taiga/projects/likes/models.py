@@ -36,6 +36,7 @@ class Like(models.Model):
         verbose_name = _("Like")
         verbose_name_plural = _("Likes")
         unique_together = ("content_type", "object_id", "user")
+        index_together = [("user", "content_type", "created_date", "object_id")]
 
     @property
     def project(self):
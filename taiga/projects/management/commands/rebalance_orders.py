@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+
+from taiga.projects.epics.models import Epic, RelatedUserStory
+from taiga.projects.models import Project
+from taiga.projects.services import rebalance_orders
+from taiga.projects.tasks.models import Task
+from taiga.projects.userstories.models import UserStory
+
+
+ORDER_FIELDS = (
+    (UserStory, "project", ("backlog_order", "kanban_order", "sprint_order")),
+    (Task, "project", ("us_order", "taskboard_order")),
+    (Epic, "project", ("epics_order",)),
+    (RelatedUserStory, "epic__project", ("order",)),
+)
+
+
+class Command(BaseCommand):
+    help = ("Spread the orders of the user stories, tasks and epics of the projects so the "
+            "moves find free positions (it can be run periodically)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", dest="project_slug", default=None,
+                            help="Rebalance only the project with this slug")
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all().order_by("id")
+        if options["project_slug"]:
+            projects = projects.filter(slug=options["project_slug"])
+            if not projects.exists():
+                raise CommandError("There is no project with the slug '{}'".format(options["project_slug"]))
+
+        for project in projects:
+            updated = 0
+            with transaction.atomic():
+                for model, project_field, fields in ORDER_FIELDS:
+                    queryset = model.objects.filter(**{project_field: project})
+                    for field in fields:
+                        updated += len(rebalance_orders(queryset, field))
+
+            self.stdout.write("{}: {} orders updated".format(project.slug, updated))
@@ -304,35 +304,38 @@ class Project(ProjectDefaults, TaggedMixin, TagsColorsMixin, models.Model):
         now = timezone.now()
         self.totals_updated_datetime = now
 
-        Like = apps.get_model("likes", "Like")
-        content_type = apps.get_model("contenttypes", "ContentType").objects.get_for_model(Project)
-        qs = Like.objects.filter(content_type=content_type, object_id=self.id)
-
-        self.total_fans = qs.count()
+        windows = {
+            "last_week": now - relativedelta(weeks=1),
+            "last_month": now - relativedelta(months=1),
+            "last_year": now - relativedelta(years=1),
+        }
 
-        qs_week = qs.filter(created_date__gte=now - relativedelta(weeks=1))
-        self.total_fans_last_week = qs_week.count()
+        def _totals(qs, date_field):
+            # Compute the total and every window in a single aggregate query
+            aggregates = {"total": models.Count("id")}
+            for name, since in windows.items():
+                condition = models.When(then=models.Value(1), **{"{}__gte".format(date_field): since})
+                aggregates[name] = models.Sum(models.Case(condition, default=models.Value(0),
+                                                          output_field=models.IntegerField()))
+            return {k: v or 0 for k, v in qs.aggregate(**aggregates).items()}
 
-        qs_month = qs.filter(created_date__gte=now - relativedelta(months=1))
-        self.total_fans_last_month = qs_month.count()
+        Like = apps.get_model("likes", "Like")
+        content_type = apps.get_model("contenttypes", "ContentType").objects.get_for_model(Project)
+        fans = _totals(Like.objects.filter(content_type=content_type, object_id=self.id), "created_date")
 
-        qs_year = qs.filter(created_date__gte=now - relativedelta(years=1))
-        self.total_fans_last_year = qs_year.count()
+        self.total_fans = fans["total"]
+        self.total_fans_last_week = fans["last_week"]
+        self.total_fans_last_month = fans["last_month"]
+        self.total_fans_last_year = fans["last_year"]
 
         tl_model = apps.get_model("timeline", "Timeline")
         namespace = build_project_namespace(self)
+        activity = _totals(tl_model.objects.filter(namespace=namespace), "created")
 
-        qs = tl_model.objects.filter(namespace=namespace)
-        self.total_activity = qs.count()
-
-        qs_week = qs.filter(created__gte=now - relativedelta(weeks=1))
-        self.total_activity_last_week = qs_week.count()
-
-        qs_month = qs.filter(created__gte=now - relativedelta(months=1))
-        self.total_activity_last_month = qs_month.count()
-
-        qs_year = qs.filter(created__gte=now - relativedelta(years=1))
-        self.total_activity_last_year = qs_year.count()
+        self.total_activity = activity["total"]
+        self.total_activity_last_week = activity["last_week"]
+        self.total_activity_last_month = activity["last_month"]
+        self.total_activity_last_year = activity["last_year"]
 
         if save:
             self.save(update_fields=[
@@ -390,6 +393,20 @@ class Project(ProjectDefaults, TaggedMixin, TagsColorsMixin, models.Model):
         members = members.values_list("user", flat=True)
         return user_model.objects.filter(id__in=list(members))
 
+    def get_null_points(self):
+        # Get point instance that represent a null/undefined
+        # The current model allows duplicate values. Because
+        # of it, we should get all poins with None as value
+        # and use the first one.
+        # In case of that not exists, creates one for avoid
+        # unexpected errors.
+        none_points = list(self.points.filter(value=None))
+        if none_points:
+            return none_points[0]
+
+        name = slugify_uniquely_for_queryset("?", self.points.all(), slugfield="name")
+        return Points.objects.create(name=name, value=None, project=self)
+
     def update_role_points(self, user_stories=None):
         RolePoints = apps.get_model("userstories", "RolePoints")
         Role = apps.get_model("users", "Role")
@@ -404,18 +421,7 @@ class Project(ProjectDefaults, TaggedMixin, TagsColorsMixin, models.Model):
         if user_stories is None:
             user_stories = self.user_stories.all()
 
-        # Get point instance that represent a null/undefined
-        # The current model allows duplicate values. Because
-        # of it, we should get all poins with None as value
-        # and use the first one.
-        # In case of that not exists, creates one for avoid
-        # unexpected errors.
-        none_points = list(self.points.filter(value=None))
-        if none_points:
-            null_points_value = none_points[0]
-        else:
-            name = slugify_uniquely_for_queryset("?", self.points.all(), slugfield="name")
-            null_points_value = Points.objects.create(name=name, value=None, project=self)
+        null_points_value = self.get_null_points()
 
         for us in user_stories:
             usroles = Role.objects.filter(role_points__in=us.role_points.all()).distinct()
@@ -19,9 +19,7 @@
 
 from django.core.management.base import BaseCommand
 
-from taiga.base.utils.iterators import iter_queryset
-from taiga.projects.notifications.models import HistoryChangeNotification
-from taiga.projects.notifications.services import send_sync_notifications
+from taiga.projects.notifications.services import process_sync_notifications
 
 from django_pglocks import advisory_lock
 
@@ -30,11 +28,8 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         with advisory_lock("send-notifications-command", wait=False) as acquired:
             if acquired:
-                qs = HistoryChangeNotification.objects.all()
-                for change_notification in iter_queryset(qs, itersize=100):
-                    try:
-                        send_sync_notifications(change_notification.pk)
-                    except HistoryChangeNotification.DoesNotExist:
-                        pass
+                stats = process_sync_notifications()
+                print("Sent {emails} emails of {notifications} notifications in {batches} batches "
+                      "({errors} errors, {emails_per_second:.2f} emails/s)".format(**stats))
             else:
                 print("Other process already running")
@@ -93,3 +93,4 @@ class Watched(models.Model):
         verbose_name = _("Watched")
         verbose_name_plural = _("Watched")
         unique_together = ("content_type", "object_id", "user", "project")
+        index_together = [("user", "content_type", "created_date", "object_id")]
@@ -17,17 +17,23 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
+import logging
+import time
+import uuid
 
-from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 from django.apps import apps
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.db import IntegrityError, transaction
+from django.db import connection as db_connection
 from django.db.models import Q
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.conf import settings
 from django.utils.translation import ugettext as _
+from markupsafe import escape
 
 from taiga.base import exceptions as exc
 from taiga.base.mails import InlineCSSTemplateMail
@@ -37,11 +43,12 @@ from taiga.projects.history.choices import HistoryType
 from taiga.projects.history.services import (make_key_from_model_object,
                                              get_last_snapshot_for_key,
                                              get_model_from_key)
-from taiga.permissions.services import user_has_perm
 
 from .models import HistoryChangeNotification, Watched
 from .squashing import squash_history_entries
 
+log = logging.getLogger("taiga.notifications")
+
 
 def notify_policy_exists(project, user) -> bool:
     """
@@ -109,7 +116,7 @@ def analize_object_for_watchers(obj: object, comment: str, user: object):
         obj.add_watcher(user)
 
 
-def _filter_by_permissions(obj, user):
+def _get_view_permission(obj):
     UserStory = apps.get_model("userstories", "UserStory")
     Issue = apps.get_model("issues", "Issue")
     Task = apps.get_model("tasks", "Task")
@@ -117,20 +124,41 @@ def _filter_by_permissions(obj, user):
     WikiPage = apps.get_model("wiki", "WikiPage")
 
     if isinstance(obj, UserStory):
-        return user_has_perm(user, "view_us", obj, cache="project")
+        return "view_us"
     elif isinstance(obj, Issue):
-        return user_has_perm(user, "view_issues", obj, cache="project")
+        return "view_issues"
     elif isinstance(obj, Task):
-        return user_has_perm(user, "view_tasks", obj, cache="project")
+        return "view_tasks"
     elif isinstance(obj, Epic):
-        return user_has_perm(user, "view_epics", obj, cache="project")
+        return "view_epics"
     elif isinstance(obj, WikiPage):
-        return user_has_perm(user, "view_wiki_pages", obj, cache="project")
-    return False
+        return "view_wiki_pages"
+    return None
 
 
-def _filter_notificable(user):
-    return user.is_active and not user.is_system
+def _create_missing_notify_policies(project, user_ids, level=NotifyLevel.involved):
+    """
+    Create in bulk the notify policies of the users in `user_ids`
+    that don't have one for the project yet.
+    """
+    model_cls = apps.get_model("notifications", "NotifyPolicy")
+    existing_ids = set(model_cls.objects.filter(project=project, user_id__in=user_ids)
+                                        .values_list("user_id", flat=True))
+    missing_ids = set(user_ids) - existing_ids
+    if not missing_ids:
+        return
+
+    try:
+        with transaction.atomic():
+            model_cls.objects.bulk_create([model_cls(project=project, user_id=user_id, notify_level=level)
+                                           for user_id in missing_ids])
+    except IntegrityError:
+        # Some of them have been created in the meantime
+        for user_id in missing_ids:
+            model_cls.objects.get_or_create(project=project, user_id=user_id,
+                                            defaults={"notify_level": level})
+
+    project.__dict__.pop("cached_notify_policies", None)
 
 
 def get_users_to_notify(obj, *, history=None, discard_users=None) -> list:
@@ -138,42 +166,54 @@ def get_users_to_notify(obj, *, history=None, discard_users=None) -> list:
     Get filtered set of users to notify for specified
     model instance and changer.
 
+    The recipients are:
+      - the users with the "all" notify level in the project.
+      - the users with the "all" or "involved" notify level in the project
+        that are involved in the object (watchers, participants and the
+        users unassigned in `history`).
+    Only the active, not system users that can view the object are returned.
+
     NOTE: changer at this momment is not used.
     NOTE: analogouts to obj.get_watchers_to_notify(changer)
     """
     project = obj.get_project()
 
-    def _check_level(project: object, user: object, levels: tuple) -> bool:
-        policy = project.cached_notify_policy_for_user(user)
-        return policy.notify_level in levels
+    permission = _get_view_permission(obj)
+    if permission is None:
+        return frozenset()
 
-    _can_notify_hard = partial(_check_level, project,
-                               levels=[NotifyLevel.all])
-    _can_notify_light = partial(_check_level, project,
-                                levels=[NotifyLevel.all, NotifyLevel.involved])
-
-    candidates = set()
-    candidates.update(filter(_can_notify_hard, project.members.all()))
-    candidates.update(filter(_can_notify_hard, obj.project.get_watchers()))
-    candidates.update(filter(_can_notify_light, obj.get_watchers()))
-    candidates.update(filter(_can_notify_light, obj.get_participants()))
+    involved_ids = set(obj.get_watchers().values_list("id", flat=True))
+    involved_ids.update(user.id for user in obj.get_participants())
 
     # If the history is an unassignment change we should notify that user too
     if history and history.type == HistoryType.change and "assigned_to" in history.diff:
-        assigned_to_users = get_user_model().objects.filter(id__in=history.diff["assigned_to"])
-        candidates.update(filter(_can_notify_light, assigned_to_users))
+        involved_ids.update(user_id for user_id in history.diff["assigned_to"] if user_id is not None)
 
-    # Remove the changer from candidates
-    if discard_users:
-        candidates = candidates - set(discard_users)
+    # The users without notify policy (members and involved users) get the default one
+    member_ids = set(project.memberships.filter(user__isnull=False).values_list("user_id", flat=True))
+    _create_missing_notify_policies(project, member_ids | involved_ids)
 
-    # Filter by object permissions
-    candidates = set(filter(partial(_filter_by_permissions, obj), candidates))
+    users = get_user_model().objects.filter(
+        Q(notify_policies__project_id=project.id),
+        Q(notify_policies__notify_level=NotifyLevel.all) |
+        Q(notify_policies__notify_level=NotifyLevel.involved, id__in=involved_ids))
 
     # Filter disabled and system users
-    candidates = set(filter(partial(_filter_notificable), candidates))
+    users = users.filter(is_active=True, is_system=False)
+
+    # Remove the changer from candidates
+    if discard_users:
+        users = users.exclude(id__in=[user.id for user in discard_users])
+
+    # Filter by object permissions (see taiga.permissions.services.calculate_permissions)
+    if permission not in (project.anon_permissions or []) + (project.public_permissions or []):
+        membership_model = apps.get_model("projects", "Membership")
+        allowed_memberships = (membership_model.objects
+                               .filter(project_id=project.id)
+                               .filter(Q(is_admin=True) | Q(role__permissions__contains=[permission])))
+        users = users.filter(Q(is_superuser=True) | Q(id__in=allowed_memberships.values("user_id")))
 
-    return frozenset(candidates)
+    return frozenset(users)
 
 
 def _resolve_template_name(model: object, *, change_type: int) -> str:
@@ -236,30 +276,138 @@ def send_notifications(obj, *, history):
         send_sync_notifications(notification.id)
 
 
-@transaction.atomic
-def send_sync_notifications(notification_id):
+class NotificationsStats(object):
     """
-    Given changed instance, calculate the history entry and
-    a complete list for users to notify, send
-    email to all users.
+    Throughput counters of the change notifications sending.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.notifications = 0
+        self.emails = 0
+        self.batches = 0
+        self.errors = 0
+        self.claim_time = 0.0
+        self.render_time = 0.0
+        self.send_time = 0.0
+
+    def as_dict(self):
+        return {
+            "notifications": self.notifications,
+            "emails": self.emails,
+            "batches": self.batches,
+            "errors": self.errors,
+            "claim_time": self.claim_time,
+            "render_time": self.render_time,
+            "send_time": self.send_time,
+            "emails_per_second": self.emails / self.send_time if self.send_time else 0.0,
+        }
+
+
+_stats = NotificationsStats()
+
+
+def get_notifications_stats():
     """
+    Return the counters of the change notifications sent by the current process.
+    """
+    return _stats.as_dict()
 
-    notification = HistoryChangeNotification.objects.select_for_update().get(pk=notification_id)
-    # If the last modification is too recent we ignore it for the time being
-    now = timezone.now()
-    time_diff = now - notification.updated_datetime
-    if time_diff.seconds < settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL:
-        return
 
-    history_entries = tuple(notification.history_entries.all().order_by("created_at"))
-    history_entries = list(squash_history_entries(history_entries))
+def _claim_notification(notification_id):
+    """
+    Lock a change notification, collect all the data needed to send it and
+    delete it, so the lock is released before the emails are rendered and
+    sent (if some of them can't be sent it is restored with
+    _restore_notification). Notifications locked by other process are skipped.
+
+    Return None if the notification is not ready to be sent.
+    """
+    with transaction.atomic():
+        notification = (HistoryChangeNotification.objects
+                        .select_for_update(skip_locked=True)
+                        .select_related("owner", "project")
+                        .filter(pk=notification_id)
+                        .first())
+        if notification is None:
+            return None
+
+        # If the last modification is too recent we ignore it for the time being
+        now = timezone.now()
+        time_diff = now - notification.updated_datetime
+        if time_diff.seconds < settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL:
+            return None
+
+        history_entries = tuple(notification.history_entries.all().order_by("created_at"))
+        notification._history_entry_ids = [entry.id for entry in history_entries]
+        history_entries = list(squash_history_entries(history_entries))
+        notify_users = list(notification.notify_users.distinct())
 
-    # If there are no effective modifications we can delete this notification
-    # without further processing
-    if notification.history_type == HistoryType.change and not history_entries:
         notification.delete()
-        return
 
+    # If there are no effective modifications there is nothing to send
+    if notification.history_type == HistoryType.change and not history_entries:
+        return None
+
+    return notification, history_entries, notify_users
+
+
+def _restore_notification(notification, notify_users):
+    """
+    Insert again a claimed change notification for the users whose emails
+    couldn't be sent, so they are retried the next time the notifications
+    are processed. If the object has changed meanwhile it is merged with the
+    new notification.
+    """
+    with transaction.atomic():
+        restored, created = (HistoryChangeNotification.objects.select_for_update()
+                             .get_or_create(key=notification.key,
+                                            owner=notification.owner,
+                                            project=notification.project,
+                                            history_type=notification.history_type))
+        restored.history_entries.add(*notification._history_entry_ids)
+        restored.notify_users.add(*notify_users)
+
+
+class _RecipientPlaceholder(object):
+    """
+    Stand-in for the recipient user while the email templates are rendered
+    once per language. Its name is replaced by the real one for each user.
+    """
+    token = "TAIGA-RECIPIENT-{}".format(uuid.uuid4().hex)
+
+    def get_full_name(self):
+        return self.token
+
+    def __str__(self):
+        return self.token
+
+
+def _personalize_email(email, user):
+    name = user.get_full_name()
+
+    def _replace(content, mimetype):
+        if mimetype == "text/html" or mimetype == "html":
+            return content.replace(_RecipientPlaceholder.token, escape(name))
+        return content.replace(_RecipientPlaceholder.token, name)
+
+    message = EmailMultiAlternatives(subject=email.subject.replace(_RecipientPlaceholder.token, name),
+                                     body=_replace(email.body, email.content_subtype),
+                                     from_email=email.from_email,
+                                     to=[user.email],
+                                     headers=email.extra_headers)
+    message.content_subtype = email.content_subtype
+    for content, mimetype in email.alternatives:
+        message.attach_alternative(_replace(content, mimetype), mimetype)
+    return message
+
+
+def _render_notification_emails(notification, history_entries, notify_users) -> list:
+    """
+    Render the emails of a claimed change notification. The templates are
+    rendered once per language and personalized for every user.
+    """
     obj, _ = get_last_snapshot_for_key(notification.key)
     obj_class = get_model_from_key(obj.key)
 
@@ -300,17 +448,142 @@ def send_sync_notifications(notification_id):
         "List-Unsubscribe": "<{unsubscribe_url}>".format(**format_args),
     }
 
-    for user in notification.notify_users.distinct():
-        context["user"] = user
-        context["lang"] = user.lang or settings.LANGUAGE_CODE
-        email.send(user.email, context, headers=headers)
+    emails = []
+    templates_by_lang = {}
+    for user in notify_users:
+        lang = user.lang or settings.LANGUAGE_CODE
+        if lang not in templates_by_lang:
+            context["user"] = _RecipientPlaceholder()
+            context["lang"] = lang
+            templates_by_lang[lang] = email.make_email_object(user.email, context, headers=headers)
+
+        emails.append(_personalize_email(templates_by_lang[lang], user))
+
+    return emails
+
+
+def _send_emails_batch(emails) -> int:
+    """
+    Send a batch of emails through one connection of the email backend.
+    """
+    connection = get_connection()
+    return connection.send_messages(emails) or 0
+
+
+def _send_emails_batch_in_thread(emails) -> int:
+    try:
+        return _send_emails_batch(emails)
+    finally:
+        # Some email backends store the messages in the database
+        db_connection.close()
+
+
+def _send_emails(emails) -> list:
+    """
+    Send the emails in batches of CHANGE_NOTIFICATIONS_SEND_BATCH_SIZE, using
+    a pool of CHANGE_NOTIFICATIONS_SEND_WORKERS threads if it is greater than 1.
+
+    Return the emails of the batches that couldn't be sent.
+    """
+    batch_size = max(getattr(settings, "CHANGE_NOTIFICATIONS_SEND_BATCH_SIZE", 50), 1)
+    workers = getattr(settings, "CHANGE_NOTIFICATIONS_SEND_WORKERS", 1)
+    batches = [emails[i:i + batch_size] for i in range(0, len(emails), batch_size)]
+    if not batches:
+        return []
+
+    start = time.time()
+    if workers > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_send_emails_batch_in_thread, batch) for batch in batches]
+        results = [future.exception() or future.result() for future in futures]
+    else:
+        results = []
+        for batch in batches:
+            try:
+                results.append(_send_emails_batch(batch))
+            except Exception as e:
+                results.append(e)
+
+    failed_emails = []
+    for batch, result in zip(batches, results):
+        _stats.batches += 1
+        if isinstance(result, Exception):
+            _stats.errors += 1
+            log.error("Error sending change notifications emails", exc_info=result)
+            failed_emails += batch
+        else:
+            _stats.emails += result
+    _stats.send_time += time.time() - start
+    return failed_emails
+
+
+def _claim_and_render(notification_ids) -> list:
+    """
+    Claim and render the change notifications, return a list of tuples
+    (claimed notification, emails) with one email for every notified user.
+    """
+    rendered = []
+    for notification_id in notification_ids:
+        start = time.time()
+        claimed = _claim_notification(notification_id)
+        _stats.claim_time += time.time() - start
+        if claimed is None:
+            continue
+
+        start = time.time()
+        try:
+            rendered.append((claimed, _render_notification_emails(*claimed)))
+        except Exception:
+            # The notification is already claimed, so it's restored to be
+            # retried instead of losing it with the rest of the chunk
+            _stats.errors += 1
+            log.error("Error rendering change notification", exc_info=True)
+            notification, history_entries, notify_users = claimed
+            _restore_notification(notification, notify_users)
+            continue
+        finally:
+            _stats.render_time += time.time() - start
+        _stats.notifications += 1
+    return rendered
+
+
+def _send_rendered(rendered):
+    """
+    Send the emails of the claimed notifications and restore the
+    notifications for the users whose emails failed.
+    """
+    failed_emails = _send_emails([email for claimed, emails in rendered for email in emails])
+    if not failed_emails:
+        return
+
+    failed_emails = set(id(email) for email in failed_emails)
+    for (notification, history_entries, notify_users), emails in rendered:
+        failed_users = [user for user, email in zip(notify_users, emails) if id(email) in failed_emails]
+        if failed_users:
+            _restore_notification(notification, failed_users)
+
 
-    notification.delete()
+def send_sync_notifications(notification_id):
+    """
+    Given changed instance, calculate the history entry and
+    a complete list for users to notify, send
+    email to all users.
+    """
+    _send_rendered(_claim_and_render([notification_id]))
 
 
 def process_sync_notifications():
-    for notification in HistoryChangeNotification.objects.all():
-        send_sync_notifications(notification.pk)
+    """
+    Send all the pending change notifications. They are claimed and
+    rendered in chunks and the emails of every chunk are sent together.
+    """
+    batch_size = max(getattr(settings, "CHANGE_NOTIFICATIONS_SEND_BATCH_SIZE", 50), 1)
+    notification_ids = list(HistoryChangeNotification.objects.order_by("updated_datetime")
+                                                             .values_list("id", flat=True))
+    for i in range(0, len(notification_ids), batch_size):
+        _send_rendered(_claim_and_render(notification_ids[i:i + batch_size]))
+
+    return get_notifications_stats()
 
 
 def _get_q_watchers(obj):
@@ -421,6 +694,37 @@ def add_watcher(obj, user):
     return watched
 
 
+def add_watchers_in_bulk(watchers):
+    """Bulk version of `add_watcher` for a list of (obj, user) pairs.
+
+    Only for objects that are not watched yet by the users (i.e. just
+    created ones), the Watched objects are inserted without checking it.
+
+    :param watchers: List of (obj, user) tuples.
+    """
+    if not watchers:
+        return []
+
+    content_type_model = apps.get_model("contenttypes", "ContentType")
+    watched = Watched.objects.bulk_create([
+        Watched(content_type=content_type_model.objects.get_for_model(obj),
+                object_id=obj.id,
+                user=user,
+                project=obj.project)
+        for obj, user in watchers
+    ])
+
+    user_ids_by_project = {}
+    for obj, user in watchers:
+        project_users = user_ids_by_project.setdefault(obj.project_id, (obj.project, set()))
+        project_users[1].add(user.id)
+
+    for project, user_ids in user_ids_by_project.values():
+        _create_missing_notify_policies(project, user_ids, NotifyLevel.involved)
+
+    return watched
+
+
 def remove_watcher(obj, user):
     """Remove an watching user from an object.
 
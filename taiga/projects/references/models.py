@@ -21,6 +21,7 @@ from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 
+from taiga.mdrender.service import invalidate_project_render_cache
 from taiga.projects.models import Project
 from taiga.projects.epics.models import Epic
 from taiga.projects.userstories.models import UserStory
@@ -58,6 +59,13 @@ def make_unique_reference_id(project, *, create=False):
     return seq.next_value(seqname)
 
 
+def make_unique_reference_ids(project, count, *, create=False):
+    seqname = make_sequence_name(project)
+    if create and not seq.exists(seqname):
+        seq.create(seqname)
+    return seq.next_values(seqname, count)
+
+
 def make_reference(instance, project, create=False):
     refval = make_unique_reference_id(project, create=create)
     ct = ContentType.objects.get_for_model(instance.__class__)
@@ -68,6 +76,58 @@ def make_reference(instance, project, create=False):
     return refval, refinstance
 
 
+def reserve_references_in_bulk(instances, project, *, create=False):
+    """
+    Assign the refs of not saved `instances` before their INSERT.
+
+    The instances without ref get one of a block reserved from the project
+    sequence in one query, the ones with a ref keep it (and the sequence is
+    moved after the biggest one). The signals don't touch the refs of these
+    instances, their `Reference` rows must be created with
+    `make_references_in_bulk` once they are saved.
+    """
+    seqname = make_sequence_name(project)
+    if create and not seq.exists(seqname):
+        seq.create(seqname)
+
+    max_ref = max((instance.ref for instance in instances if instance.ref), default=None)
+    if max_ref:
+        seq.set_max(seqname, max_ref)
+
+    instances_without_ref = [instance for instance in instances if not instance.ref]
+    if instances_without_ref:
+        refvals = seq.next_values(seqname, len(instances_without_ref))
+        for instance, refval in zip(instances_without_ref, refvals):
+            instance.ref = refval
+
+    for instance in instances:
+        instance._reserved_ref = True
+
+    return instances_without_ref
+
+
+def make_references_in_bulk(instances, project):
+    """
+    Create with one INSERT the `Reference` rows of saved `instances` that already
+    have their refs (see `reserve_references_in_bulk`).
+    """
+    references = [Reference(content_type=ContentType.objects.get_for_model(instance.__class__),
+                            object_id=instance.pk,
+                            ref=instance.ref,
+                            project=project)
+                  for instance in instances if instance.pk is not None]
+    for instance in instances:
+        instance._reserved_ref = False
+
+    if not references:
+        return []
+
+    references = Reference.objects.bulk_create(references)
+    # bulk_create doesn't send the post_save signals that invalidate the renders
+    invalidate_project_render_cache(project.id)
+    return references
+
+
 def recalc_reference_counter(project):
     seqname = make_sequence_name(project)
     max_ref_us = project.user_stories.all().aggregate(max=models.Max('ref'))
@@ -97,24 +157,39 @@ def delete_sequence(sender, instance, **kwargs):
 
 
 def store_previous_project(sender, instance, **kwargs):
-    try:
-        prev_instance = sender.objects.get(pk=instance.pk)
-        instance.prev_project = prev_instance.project
-    except sender.DoesNotExist:
-        instance.prev_project = None
+    instance.prev_project = None
+    if instance.pk is not None:
+        try:
+            prev_instance = sender.objects.get(pk=instance.pk)
+            instance.prev_project = prev_instance.project
+        except sender.DoesNotExist:
+            pass
+
+    # Attach the sequence number to the instance as ref before saving it so the
+    # INSERT (or UPDATE) already includes it
+    instance._new_reference = False
+    if not instance._importing and not getattr(instance, "_reserved_ref", False):
+        if instance.prev_project is None or instance.prev_project != instance.project:
+            instance.ref = make_unique_reference_id(instance.project)
+            instance._new_reference = True
 
 
 def attach_sequence(sender, instance, created, **kwargs):
-    if not instance._importing:
-        if created or instance.prev_project != instance.project:
-            # Create a reference object. This operation should be
-            # used in transaction context, otherwise it can
-            # create a lot of phantom reference objects.
-            refval, _ = make_reference(instance, instance.project)
-
-            # Additionally, attach sequence number to instance as ref
-            instance.ref = refval
-            instance.save(update_fields=['ref'])
+    if getattr(instance, "_new_reference", False):
+        # Create a reference object. This operation should be
+        # used in transaction context, otherwise it can
+        # create a lot of phantom reference objects.
+        instance._new_reference = False
+        ct = ContentType.objects.get_for_model(instance.__class__)
+        Reference.objects.create(content_type=ct,
+                                 object_id=instance.pk,
+                                 ref=instance.ref,
+                                 project=instance.project)
+
+        # The ref is saved with the instance except on partial saves without it
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "ref" not in update_fields:
+            sender.objects.filter(pk=instance.pk).update(ref=instance.ref)
 
 
 # Project
@@ -20,6 +20,8 @@
 # is not the baddest practice ;)
 
 from .bulk_update_order import apply_order_updates
+from .bulk_update_order import get_orders_to_update
+from .bulk_update_order import rebalance_orders
 from .bulk_update_order import bulk_update_severity_order
 from .bulk_update_order import bulk_update_priority_order
 from .bulk_update_order import bulk_update_issue_type_order
@@ -58,5 +60,8 @@ from .stats import get_stats_for_project_issues
 from .stats import get_stats_for_project
 from .stats import get_member_stats_for_project
 
+from .totals import refresh_project_totals
+from .totals import schedule_project_totals_refresh
+
 from .transfer import request_project_transfer, start_project_transfer
 from .transfer import accept_project_transfer, reject_project_transfer
@@ -16,12 +16,14 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from django.conf import settings
 from django.db import transaction, connection
-from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
 
+from taiga.base.utils import db
 from taiga.projects import models
 
-from contextlib import suppress
+from bisect import bisect_left
 
 
 def apply_order_updates(base_orders: dict, new_orders: dict):
@@ -34,39 +36,69 @@ def apply_order_updates(base_orders: dict, new_orders: dict):
     and the extra calculated ones applied.
     Extra order updates can be needed when moving elements to intermediate positions.
     The elements where no order update is needed will be removed.
-    """
-    updated_order_ids = set()
 
+    The not moved elements are kept sorted by order and every moved element only
+    shifts (by one) the run of consecutive orders starting at its new position,
+    so the moves to a gap between two orders don't update any other element.
+    """
     # Remove the elements from new_orders non existint in base_orders
     invalid_keys = new_orders.keys() - base_orders.keys()
     [new_orders.pop(id, None) for id in invalid_keys]
 
+    fixed = sorted((order, id) for id, order in base_orders.items() if id not in new_orders)
+    orders = [order for order, id in fixed]
+    ids = [id for order, id in fixed]
+    updated_order_ids = set()
+
     # We will apply the multiple order changes by the new position order
-    sorted_new_orders = [(k, v) for k, v in new_orders.items()]
-    sorted_new_orders = sorted(sorted_new_orders, key=lambda e: e[1])
-
-    for new_order in sorted_new_orders:
-        old_order = base_orders[new_order[0]]
-        new_order = new_order[1]
-        for id, order in base_orders.items():
-            # When moving forward only the elements contained in the range new_order - old_order
-            # positions need to be updated
-            moving_backward = new_order <= old_order and order >= new_order and order < old_order
-            # When moving backward all the elements from the new_order position need to bee updated
-            moving_forward = new_order >= old_order and order >= new_order
-            if moving_backward or moving_forward:
-                base_orders[id] += 1
-                updated_order_ids.add(id)
-
-    # Overwritting the orders specified
-    for id, order in new_orders.items():
-        if base_orders[id] != order:
+    for new_order in sorted(new_orders.values()):
+        index = bisect_left(orders, new_order)
+        last_order = new_order
+        while index < len(orders) and orders[index] <= last_order:
+            orders[index] += 1
+            last_order = orders[index]
+            updated_order_ids.add(ids[index])
+            index += 1
+
+    base_orders.clear()
+    for id, order in zip(ids, orders):
+        if id in updated_order_ids:
             base_orders[id] = order
-            updated_order_ids.add(id)
+    base_orders.update(new_orders)
+
+
+def get_orders_to_update(queryset, field: str, new_orders: dict):
+    """
+    Return the `base_orders` dict for `apply_order_updates` with only the elements
+    of `queryset` that can be affected by `new_orders`: the moved ones and the
+    ones positioned after the lowest new order.
+    """
+    if not new_orders:
+        return {}
 
-    # Remove not modified elements
-    removing_keys = [id for id in base_orders if id not in updated_order_ids]
-    [base_orders.pop(id, None) for id in removing_keys]
+    queryset = queryset.filter(Q(id__in=new_orders.keys()) | Q(**{"{}__gte".format(field): min(new_orders.values())}))
+    return dict(queryset.values_list("id", field))
+
+
+def rebalance_orders(queryset, field: str, step: int=None):
+    """
+    Spread the orders of the elements of `queryset` `step` positions apart keeping
+    their current sorting, so the following moves have free positions to use and
+    don't need to shift other elements.
+
+    Return the dict of updated orders.
+    """
+    if step is None:
+        step = settings.ORDER_REBALANCE_STEP
+
+    current_orders = queryset.order_by(field, "id").values_list("id", field)
+    new_orders = {}
+    for position, (id, order) in enumerate(current_orders, 1):
+        if order != position * step:
+            new_orders[id] = position * step
+
+    db.update_attr_in_bulk_for_ids(new_orders, field, model=queryset.model)
+    return new_orders
 
 
 def update_projects_order_in_bulk(bulk_data: list, field: str, user):
@@ -76,18 +108,14 @@ def update_projects_order_in_bulk(bulk_data: list, field: str, user):
 
     [{'project_id': <value>, 'order': <value>}, ...]
     """
-    memberships_orders = {m.id: getattr(m, field) for m in user.memberships.all()}
-    new_memberships_orders = {}
-
-    for membership_data in bulk_data:
-        project_id = membership_data["project_id"]
-        with suppress(ObjectDoesNotExist):
-            membership = user.memberships.get(project_id=project_id)
-            new_memberships_orders[membership.id] = membership_data["order"]
+    memberships_ids = dict(user.memberships.filter(project_id__in=[e["project_id"] for e in bulk_data])
+                                           .values_list("project_id", "id"))
+    new_memberships_orders = {memberships_ids[e["project_id"]]: e["order"] for e in bulk_data
+                              if e["project_id"] in memberships_ids}
+    memberships_orders = get_orders_to_update(user.memberships.all(), field, new_memberships_orders)
 
     apply_order_updates(memberships_orders, new_memberships_orders)
 
-    from taiga.base.utils import db
     db.update_attr_in_bulk_for_ids(memberships_orders, field, model=models.Membership)
 
 
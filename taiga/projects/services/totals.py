@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from taiga.celery import app
+
+import threading
+
+
+def _get_refresh_key(project_id):
+    return "project-totals-refresh:{}".format(project_id)
+
+
+@app.task
+def refresh_project_totals(project_id):
+    Project = apps.get_model("projects", "Project")
+
+    # Release the key before refreshing so new activity schedules a new refresh
+    cache.delete(_get_refresh_key(project_id))
+
+    try:
+        project = Project.objects.get(id=project_id)
+    except Project.DoesNotExist:
+        return
+
+    project.refresh_totals()
+
+
+# Trailing refreshes of the projects pending in this process (without celery)
+_local_refreshes = set()
+_local_refreshes_lock = threading.Lock()
+
+
+def _run_local_refresh(project_id):
+    with _local_refreshes_lock:
+        _local_refreshes.discard(project_id)
+
+    try:
+        refresh_project_totals(project_id)
+    finally:
+        connection.close()
+
+
+def _schedule_local_refresh(project_id, countdown):
+    with _local_refreshes_lock:
+        if project_id in _local_refreshes:
+            return
+        _local_refreshes.add(project_id)
+
+    timer = threading.Timer(countdown, _run_local_refresh, (project_id,))
+    timer.daemon = True
+    timer.start()
+
+
+def schedule_project_totals_refresh(project):
+    """
+    Refresh the project totals coalescing the bursts of activity.
+
+    With PROJECT_TOTALS_REFRESH_INTERVAL set to 0 the totals are refreshed
+    inmediately. Otherwise only one refresh per project is done every interval
+    and the activity inside the interval is picked up by a trailing refresh:
+    with celery a delayed task is scheduled for the first call of the interval
+    (the following ones are ignored until it runs), without celery the totals
+    are refreshed if the last refresh is older than the interval and a timer
+    in this process refreshes them at the end of the interval otherwise.
+    """
+    interval = getattr(settings, "PROJECT_TOTALS_REFRESH_INTERVAL", 0)
+    if not interval:
+        project.refresh_totals()
+        return
+
+    if settings.CELERY_ENABLED:
+        # The key expires when the task runs, so the calls after it schedule a
+        # new refresh even if the worker doesn't share the cache of this process
+        if cache.add(_get_refresh_key(project.id), True, interval):
+            refresh_project_totals.apply_async((project.id,), countdown=interval)
+        return
+
+    last_refresh = project.totals_updated_datetime
+    elapsed = None
+    if last_refresh is not None:
+        elapsed = (timezone.now() - last_refresh).total_seconds()
+
+    if elapsed is None or elapsed >= interval:
+        project.refresh_totals()
+    else:
+        _schedule_local_refresh(project.id, interval - elapsed)
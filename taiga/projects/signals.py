@@ -19,6 +19,7 @@
 from django.apps import apps
 from django.conf import settings
 
+from taiga.permissions.services import invalidate_project_permissions_cache
 from taiga.projects.notifications.services import create_notify_policy_if_not_exists
 
 
@@ -32,6 +33,14 @@ def membership_post_delete(sender, instance, using, **kwargs):
     instance.project.update_role_points()
 
 
+## Permissions cache
+
+def invalidate_permissions_cache(sender, instance, using, **kwargs):
+    # Memberships and roles changes modify the permissions of the project users
+    if instance.project_id:
+        invalidate_project_permissions_cache(instance.project_id)
+
+
 ## Notify policy
 
 def create_notify_policy(sender, instance, using, **kwargs):
@@ -260,11 +260,11 @@ class TaskViewSet(OCCResourceMixin, VotedResourceMixin, HistoryResourceMixin, Wa
         tasks = services.create_tasks_in_bulk(
             data["bulk_tasks"], milestone_id=data["milestone_id"], user_story_id=data["us_id"],
             status_id=data.get("status_id") or project.default_task_status_id,
-            project=project, owner=request.user, callback=self.post_save, precall=self.pre_save)
+            project=project, owner=request.user, callback=self.post_save_without_snapshot,
+            precall=self.pre_save)
 
         tasks = self.get_queryset().filter(id__in=[i.id for i in tasks])
-        for task in tasks:
-            self.persist_history_snapshot(obj=task)
+        self.persist_history_snapshots(tasks, notify=True)
 
         tasks_serialized = self.get_serializer_class()(tasks, many=True)
 
@@ -26,8 +26,10 @@ from django.db import connection
 from django.utils.translation import ugettext as _
 
 from taiga.base.utils import db, text
-from taiga.projects.history.services import take_snapshot
+from taiga.projects.history.services import take_snapshots_in_bulk
+from taiga.projects.references import models as refs
 from taiga.projects.services import apply_order_updates
+from taiga.projects.services import get_orders_to_update
 from taiga.projects.tasks.apps import connect_tasks_signals
 from taiga.projects.tasks.apps import disconnect_tasks_signals
 from taiga.events import events
@@ -63,11 +65,16 @@ def create_tasks_in_bulk(bulk_data, callback=None, precall=None, **additional_fi
     :return: List of created `Task` instances.
     """
     tasks = get_tasks_from_bulk(bulk_data, **additional_fields)
+    project = additional_fields.get("project")
+    if project is not None:
+        refs.reserve_references_in_bulk(tasks, project)
 
     disconnect_tasks_signals()
 
     try:
         db.save_in_bulk(tasks, callback, precall)
+        if project is not None:
+            refs.make_references_in_bulk(tasks, project)
     finally:
         connect_tasks_signals()
 
@@ -90,8 +97,8 @@ def update_tasks_order_in_bulk(bulk_data: list, field: str, project: object,
     if milestone is not None:
         tasks = tasks.filter(milestone=milestone)
 
-    task_orders = {task.id: getattr(task, field) for task in tasks}
     new_task_orders = {e["task_id"]: e["order"] for e in bulk_data}
+    task_orders = get_orders_to_update(tasks, field, new_task_orders)
     apply_order_updates(task_orders, new_task_orders)
 
     task_ids = task_orders.keys()
@@ -104,12 +111,8 @@ def update_tasks_order_in_bulk(bulk_data: list, field: str, project: object,
 
 
 def snapshot_tasks_in_bulk(bulk_data, user):
-    for task_data in bulk_data:
-        try:
-            task = models.Task.objects.get(pk=task_data['task_id'])
-            take_snapshot(task, user=user)
-        except models.Task.DoesNotExist:
-            pass
+    tasks = models.Task.objects.filter(pk__in=[task_data['task_id'] for task_data in bulk_data])
+    take_snapshots_in_bulk(tasks, user=user)
 
 
 #####################################################
@@ -346,11 +346,10 @@ class UserStoryViewSet(OCCResourceMixin, VotedResourceMixin, HistoryResourceMixi
             user_stories = services.create_userstories_in_bulk(
                 data["bulk_stories"], project=project, owner=request.user,
                 status_id=data.get("status_id") or project.default_us_status_id,
-                callback=self.post_save, precall=self.pre_save)
+                callback=self.post_save_without_snapshot, precall=self.pre_save)
 
             user_stories = self.get_queryset().filter(id__in=[i.id for i in user_stories])
-            for user_story in user_stories:
-                self.persist_history_snapshot(obj=user_story)
+            self.persist_history_snapshots(user_stories, notify=True)
 
             user_stories_serialized = self.get_serializer_class()(user_stories, many=True)
 
@@ -27,8 +27,10 @@ from django.utils import timezone
 from django.utils.translation import ugettext as _
 
 from taiga.base.utils import db, text
-from taiga.projects.history.services import take_snapshot
+from taiga.projects.history.services import take_snapshots_in_bulk
+from taiga.projects.references import models as refs
 from taiga.projects.services import apply_order_updates
+from taiga.projects.services import get_orders_to_update
 from taiga.projects.userstories.apps import connect_userstories_signals
 from taiga.projects.userstories.apps import disconnect_userstories_signals
 from taiga.events import events
@@ -65,10 +67,12 @@ def create_userstories_in_bulk(bulk_data, callback=None, precall=None, **additio
     """
     userstories = get_userstories_from_bulk(bulk_data, **additional_fields)
     project = additional_fields.get("project")
+    refs.reserve_references_in_bulk(userstories, project)
     disconnect_userstories_signals()
 
     try:
         db.save_in_bulk(userstories, callback, precall)
+        refs.make_references_in_bulk(userstories, project)
         project.update_role_points(user_stories=userstories)
     finally:
         connect_userstories_signals()
@@ -92,8 +96,8 @@ def update_userstories_order_in_bulk(bulk_data: list, field: str, project: objec
     if milestone is not None:
         user_stories = user_stories.filter(milestone=milestone)
 
-    us_orders = {us.id: getattr(us, field) for us in user_stories}
     new_us_orders = {e["us_id"]: e["order"] for e in bulk_data}
+    us_orders = get_orders_to_update(user_stories, field, new_us_orders)
     apply_order_updates(us_orders, new_us_orders)
 
     user_story_ids = us_orders.keys()
@@ -111,13 +115,10 @@ def update_userstories_milestone_in_bulk(bulk_data: list, milestone: object):
     `bulk_data` should be a list of dicts with the following format:
     [{'us_id': <value>, 'order': <value>}, ...]
     """
-    user_stories = milestone.user_stories.all()
-    us_orders = {us.id: getattr(us, "sprint_order") for us in user_stories}
-    new_us_orders = {}
-    for e in bulk_data:
-        new_us_orders[e["us_id"]] = e["order"]
-        # The base orders where we apply the new orders must containg all the values
-        us_orders[e["us_id"]] = e["order"]
+    new_us_orders = {e["us_id"]: e["order"] for e in bulk_data}
+    us_orders = get_orders_to_update(milestone.user_stories.all(), "sprint_order", new_us_orders)
+    # The base orders where we apply the new orders must containg all the values
+    us_orders.update(new_us_orders)
 
     apply_order_updates(us_orders, new_us_orders)
 
@@ -138,12 +139,8 @@ def update_userstories_milestone_in_bulk(bulk_data: list, milestone: object):
 
 
 def snapshot_userstories_in_bulk(bulk_data, user):
-    for us_data in bulk_data:
-        try:
-            us = models.UserStory.objects.get(pk=us_data['us_id'])
-            take_snapshot(us, user=user)
-        except models.UserStory.DoesNotExist:
-            pass
+    user_stories = models.UserStory.objects.filter(pk__in=[us_data['us_id'] for us_data in bulk_data])
+    take_snapshots_in_bulk(user_stories, user=user)
 
 
 #####################################################
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('votes', '0002_auto_20150805_1600'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='vote',
+            index_together=set([('user', 'content_type', 'created_date', 'object_id')]),
+        ),
+    ]
@@ -57,6 +57,7 @@ class Vote(models.Model):
         verbose_name = _("Vote")
         verbose_name_plural = _("Votes")
         unique_together = ("content_type", "object_id", "user")
+        index_together = [("user", "content_type", "created_date", "object_id")]
 
     @property
     def project(self):
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Examples:
+# python manage.py rebuild_search_index
+# python manage.py rebuild_search_index --missing
+# python manage.py rebuild_search_index --project 42 --table userstories_userstory
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from taiga.searches.services import SEARCH_VECTORS
+from taiga.searches.services import rebuild_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Backfill the stored full text search vectors of epics, user stories, tasks, issues and wiki pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table',
+                            action='append',
+                            dest='tables',
+                            choices=sorted(SEARCH_VECTORS.keys()),
+                            default=None,
+                            help='Rebuild only this table (can be used multiple times)')
+        parser.add_argument('--project',
+                            action='store',
+                            dest='project',
+                            type=int,
+                            default=None,
+                            help='Selected project id for search index generation')
+        parser.add_argument('--missing',
+                            action='store_true',
+                            dest='missing',
+                            default=False,
+                            help='Only fill the rows without a search vector')
+        parser.add_argument('--batch-size',
+                            action='store',
+                            dest='batch_size',
+                            type=int,
+                            default=1000,
+                            help='Number of rows updated per query')
+
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        tables = options["tables"] or sorted(SEARCH_VECTORS.keys())
+
+        for table in tables:
+            total = rebuild_search_vectors(table,
+                                           project_id=options["project"],
+                                           only_missing=options["missing"],
+                                           batch_size=options["batch_size"])
+            self.stdout.write("{}: {} rows updated".format(table, total))
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+ITEMS_TABLES = ["epics_epic", "userstories_userstory", "tasks_task", "issues_issue"]
+WIKI_PAGES_TABLE = "wiki_wikipage"
+
+
+CREATE_ITEMS_TSVECTOR_FUNCTION = """
+    CREATE OR REPLACE FUNCTION searches_items_tsvector(text, bigint, text[], text)
+                       RETURNS tsvector
+                      LANGUAGE sql
+                     IMMUTABLE AS $$
+        SELECT setweight(to_tsvector('simple', coalesce($1, '') || ' ' || coalesce($2::text, '')), 'A') ||
+               setweight(to_tsvector('simple', coalesce(inmutable_array_to_string($3), '')), 'B') ||
+               setweight(to_tsvector('simple', coalesce($4, '')), 'C')
+    $$;
+
+    CREATE OR REPLACE FUNCTION searches_items_search_vector_trigger()
+                       RETURNS trigger
+                      LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector := searches_items_tsvector(NEW.subject, NEW.ref, NEW.tags, NEW.description);
+        RETURN NEW;
+    END
+    $$;
+"""
+
+DROP_ITEMS_TSVECTOR_FUNCTION = """
+    DROP FUNCTION IF EXISTS searches_items_search_vector_trigger() CASCADE;
+    DROP FUNCTION IF EXISTS searches_items_tsvector(text, bigint, text[], text) CASCADE;
+"""
+
+
+CREATE_WIKI_PAGES_TSVECTOR_FUNCTION = """
+    CREATE OR REPLACE FUNCTION searches_wikipages_tsvector(text, text)
+                       RETURNS tsvector
+                      LANGUAGE sql
+                     IMMUTABLE AS $$
+        SELECT setweight(to_tsvector('simple', coalesce($1, '')), 'A') ||
+               setweight(to_tsvector('simple', coalesce($2, '')), 'B')
+    $$;
+
+    CREATE OR REPLACE FUNCTION searches_wikipages_search_vector_trigger()
+                       RETURNS trigger
+                      LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector := searches_wikipages_tsvector(NEW.slug, NEW.content);
+        RETURN NEW;
+    END
+    $$;
+"""
+
+DROP_WIKI_PAGES_TSVECTOR_FUNCTION = """
+    DROP FUNCTION IF EXISTS searches_wikipages_search_vector_trigger() CASCADE;
+    DROP FUNCTION IF EXISTS searches_wikipages_tsvector(text, text) CASCADE;
+"""
+
+
+CREATE_SEARCH_VECTOR = """
+    ALTER TABLE {table} ADD COLUMN search_vector tsvector NULL;
+
+    CREATE TRIGGER {table}_search_vector_update
+            BEFORE INSERT OR UPDATE OF {columns}
+                ON {table}
+               FOR EACH ROW EXECUTE PROCEDURE {trigger}();
+
+    CREATE INDEX {table}_search_vector_idx
+              ON {table}
+           USING gin(search_vector);
+"""
+
+DROP_SEARCH_VECTOR = """
+    DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table};
+    DROP INDEX IF EXISTS {table}_search_vector_idx;
+    ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+def _create_search_vector(table, columns, trigger):
+    return CREATE_SEARCH_VECTOR.format(table=table, columns=", ".join(columns), trigger=trigger)
+
+
+def _drop_search_vector(table):
+    return DROP_SEARCH_VECTOR.format(table=table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0059_auto_20170116_1633'),
+        ('epics', '0005_epic_external_reference'),
+        ('userstories', '0014_auto_20160928_0540'),
+        ('tasks', '0011_auto_20160928_0755'),
+        ('issues', '0007_auto_20160614_1201'),
+        ('wiki', '0005_auto_20161201_1628'),
+    ]
+
+    operations = [
+        migrations.RunSQL([CREATE_ITEMS_TSVECTOR_FUNCTION],
+                          [DROP_ITEMS_TSVECTOR_FUNCTION]),
+        migrations.RunSQL([CREATE_WIKI_PAGES_TSVECTOR_FUNCTION],
+                          [DROP_WIKI_PAGES_TSVECTOR_FUNCTION]),
+    ] + [
+        migrations.RunSQL([_create_search_vector(table,
+                                                 ["subject", "ref", "tags", "description"],
+                                                 "searches_items_search_vector_trigger")],
+                          [_drop_search_vector(table)])
+        for table in ITEMS_TABLES
+    ] + [
+        migrations.RunSQL([_create_search_vector(WIKI_PAGES_TABLE,
+                                                 ["slug", "content"],
+                                                 "searches_wikipages_search_vector_trigger")],
+                          [_drop_search_vector(WIKI_PAGES_TABLE)]),
+    ]
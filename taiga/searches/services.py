@@ -18,11 +18,20 @@
 
 from django.apps import apps
 from django.conf import settings
+from django.db import connection
 from taiga.base.utils.db import to_tsquery
 from taiga.projects.userstories.utils import attach_total_points
 
 MAX_RESULTS = getattr(settings, "SEARCHES_MAX_RESULTS", 150)
 
+SEARCH_VECTORS = {
+    "epics_epic": "searches_items_tsvector(subject, ref, tags, description)",
+    "userstories_userstory": "searches_items_tsvector(subject, ref, tags, description)",
+    "tasks_task": "searches_items_tsvector(subject, ref, tags, description)",
+    "issues_issue": "searches_items_tsvector(subject, ref, tags, description)",
+    "wiki_wikipage": "searches_wikipages_tsvector(slug, content)",
+}
+
 
 def search_epics(project, text):
     model = apps.get_model("epics", "Epic")
@@ -55,24 +64,16 @@ def search_issues(project, text):
 def search_wiki_pages(project, text):
     model = apps.get_model("wiki", "WikiPage")
     queryset = model.objects.filter(project_id=project.pk)
-    tsquery = "to_tsquery('simple', %s)"
-    tsvector = """
-        setweight(to_tsvector('simple', coalesce(wiki_wikipage.slug)), 'A') ||
-        setweight(to_tsvector('simple', coalesce(wiki_wikipage.content)), 'B')
-    """
-
-    return _search_by_query(queryset, tsquery, tsvector, text)
+    table = "wiki_wikipage"
+    return _search_items(queryset, table, text)
 
 
 def _search_items(queryset, table, text):
+    # The weighted tsvector is stored in the `search_vector` column and kept
+    # up to date by a database trigger (see searches migrations), so it can be
+    # matched through its GIN index instead of being recomputed for every row.
     tsquery = "to_tsquery('simple', %s)"
-    tsvector = """
-        setweight(to_tsvector('simple',
-                              coalesce({table}.subject) || ' ' ||
-                              coalesce({table}.ref)), 'A') ||
-        setweight(to_tsvector('simple', coalesce(inmutable_array_to_string({table}.tags))), 'B') ||
-        setweight(to_tsvector('simple', coalesce({table}.description)), 'C')
-    """.format(table=table)
+    tsvector = "{table}.search_vector".format(table=table)
     return _search_by_query(queryset, tsquery, tsvector, text)
 
 
@@ -94,3 +95,46 @@ def _search_by_query(queryset, tsquery, tsvector, text):
 
     queryset = attach_total_points(queryset)
     return queryset[:MAX_RESULTS]
+
+
+def rebuild_search_vectors(table, project_id=None, only_missing=False, batch_size=1000):
+    """
+    Recompute the stored search vector of every row of `table` in batches of
+    `batch_size` rows, so big tables are not locked in a single long update.
+
+    Return the number of updated rows.
+    """
+    tsvector = SEARCH_VECTORS[table]
+
+    conditions = ["id > %s"]
+    params = []
+    if project_id is not None:
+        conditions.append("project_id = %s")
+        params.append(project_id)
+    if only_missing:
+        conditions.append("search_vector IS NULL")
+
+    sql = """
+        UPDATE {table}
+           SET search_vector = {tsvector}
+         WHERE id IN (SELECT id
+                        FROM {table}
+                       WHERE {conditions}
+                    ORDER BY id
+                       LIMIT %s)
+     RETURNING id
+    """.format(table=table, tsvector=tsvector, conditions=" AND ".join(conditions))
+
+    total = 0
+    last_id = 0
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(sql, [last_id] + params + [batch_size])
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+
+            total += len(ids)
+            last_id = max(ids)
+
+    return total
@@ -16,15 +16,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Model
 from django.test.utils import override_settings
 
 from taiga.projects.models import Project
 from taiga.projects.history.models import HistoryEntry
 from .models import Timeline
-from .service import _get_impl_key_from_model, _timeline_impl_map, extract_user_info
+from .service import extract_user_info
 from .signals import on_new_history_entry, _push_to_timelines
 
 from unittest.mock import patch
@@ -51,22 +49,10 @@ class BulkCreator(object):
 bulk_creator = BulkCreator()
 
 
-def custom_add_to_object_timeline(obj:object, instance:object, event_type:str, created_datetime:object,
-                                  namespace:str="default", extra_data:dict={}):
-    assert isinstance(obj, Model), "obj must be a instance of Model"
-    assert isinstance(instance, Model), "instance must be a instance of Model"
-    event_type_key = _get_impl_key_from_model(instance.__class__, event_type)
-    impl = _timeline_impl_map.get(event_type_key, None)
-
-    bulk_creator.create_element(Timeline(
-        content_object=obj,
-        namespace=namespace,
-        event_type=event_type_key,
-        project=instance.project,
-        data=impl(instance, extra_data=extra_data),
-        data_content_type=ContentType.objects.get_for_model(instance.__class__),
-        created=created_datetime,
-    ))
+def custom_save_timeline_entries(entries):
+    for entry in entries:
+        bulk_creator.create_element(entry)
+    return len(entries)
 
 
 @override_settings(CELERY_ENABLED=False)
@@ -82,7 +68,7 @@ def rebuild_timeline(initial_date, final_date, project_id):
 
         timelines.delete()
 
-    with patch('taiga.timeline.service._add_to_object_timeline', new=custom_add_to_object_timeline):
+    with patch('taiga.timeline.service._save_timeline_entries', new=custom_save_timeline_entries):
         # Projects api wasn't a HistoryResourceMixin so we can't interate on the HistoryEntries in this case
         projects = Project.objects.order_by("created_date")
         history_entries = HistoryEntry.objects.order_by("created_at")
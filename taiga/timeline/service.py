@@ -52,9 +52,13 @@ def build_project_namespace(project: object):
     return "{0}:{1}".format("project", project.id)
 
 
-def _add_to_object_timeline(obj: object, instance: object, event_type: str, created_datetime: object,
-                            namespace: str="default", extra_data: dict={}):
-    assert isinstance(obj, Model), "obj must be a instance of Model"
+def _build_timeline_entries(targets, instance: object, event_type: str, created_datetime: object,
+                            extra_data: dict={}):
+    """
+    Build (without saving) the timeline entries of an event for every
+    `(obj, namespace)` pair in `targets`. The event payload and the content
+    types are resolved only once and shared by all the entries.
+    """
     assert isinstance(instance, Model), "instance must be a instance of Model"
     from .models import Timeline
     event_type_key = _get_impl_key_from_model(instance.__class__, event_type)
@@ -64,29 +68,56 @@ def _add_to_object_timeline(obj: object, instance: object, event_type: str, crea
     if hasattr(instance, "project"):
         project = instance.project
 
-    Timeline.objects.create(
-        content_object=obj,
-        namespace=namespace,
-        event_type=event_type_key,
-        project=project,
-        data=impl(instance, extra_data=extra_data),
-        data_content_type=ContentType.objects.get_for_model(instance.__class__),
-        created=created_datetime,
-    )
+    data = impl(instance, extra_data=extra_data)
+    data_content_type = ContentType.objects.get_for_model(instance.__class__)
+
+    content_types = {}
+    entries = []
+    for obj, namespace in targets:
+        assert isinstance(obj, Model), "obj must be a instance of Model"
+        model = obj.__class__
+        if model not in content_types:
+            content_types[model] = ContentType.objects.get_for_model(model)
+
+        entries.append(Timeline(
+            content_type=content_types[model],
+            object_id=obj.pk,
+            namespace=namespace,
+            event_type=event_type_key,
+            project=project,
+            data=data,
+            data_content_type=data_content_type,
+            created=created_datetime,
+        ))
+
+    return entries
+
+
+def _save_timeline_entries(entries):
+    from .models import Timeline
+    Timeline.objects.bulk_create(entries)
+    return len(entries)
+
+
+def _add_to_object_timeline(obj: object, instance: object, event_type: str, created_datetime: object,
+                            namespace: str="default", extra_data: dict={}):
+    entries = _build_timeline_entries([(obj, namespace)], instance, event_type, created_datetime, extra_data)
+    return _save_timeline_entries(entries)
 
 
 def _add_to_objects_timeline(objects, instance: object, event_type: str, created_datetime: object,
                              namespace: str="default", extra_data: dict={}):
-    for obj in objects:
-        _add_to_object_timeline(obj, instance, event_type, created_datetime, namespace, extra_data)
+    targets = [(obj, namespace) for obj in objects]
+    entries = _build_timeline_entries(targets, instance, event_type, created_datetime, extra_data)
+    return _save_timeline_entries(entries)
 
 
 def _push_to_timeline(objects, instance: object, event_type: str, created_datetime: object,
                       namespace: str="default", extra_data: dict={}):
     if isinstance(objects, Model):
-        _add_to_object_timeline(objects, instance, event_type, created_datetime, namespace, extra_data)
+        return _add_to_object_timeline(objects, instance, event_type, created_datetime, namespace, extra_data)
     elif isinstance(objects, QuerySet) or isinstance(objects, list):
-        _add_to_objects_timeline(objects, instance, event_type, created_datetime, namespace, extra_data)
+        return _add_to_objects_timeline(objects, instance, event_type, created_datetime, namespace, extra_data)
     else:
         raise Exception("Invalid objects parameter")
 
@@ -94,17 +125,20 @@ def _push_to_timeline(objects, instance: object, event_type: str, created_dateti
 @app.task
 def push_to_timelines(project_id, user_id, obj_app_label, obj_model_name, obj_id, event_type,
                       created_datetime, extra_data={}, refresh_totals=True):
-
+    """
+    Write all the timeline entries of an event (project and related people
+    timelines) in a single bulk insert and return the number of written rows.
+    """
     ObjModel = apps.get_model(obj_app_label, obj_model_name)
     try:
         obj = ObjModel.objects.get(id=obj_id)
     except ObjModel.DoesNotExist:
-        return
+        return 0
 
     try:
         user = get_user_model().objects.get(id=user_id)
     except get_user_model().DoesNotExist:
-        return
+        return 0
 
     if project_id is not None:
         # Actions related with a project
@@ -113,28 +147,27 @@ def push_to_timelines(project_id, user_id, obj_app_label, obj_model_name, obj_id
         try:
             project = projectModel.objects.get(id=project_id)
         except projectModel.DoesNotExist:
-            return
+            return 0
 
         # Project timeline
-        _push_to_timeline(project, obj, event_type, created_datetime,
-                          namespace=build_project_namespace(project),
-                          extra_data=extra_data)
-
-        if refresh_totals:
-            project.refresh_totals()
+        targets = [(project, build_project_namespace(project))]
 
         if hasattr(obj, "get_related_people"):
-            related_people = obj.get_related_people()
-
-            _push_to_timeline(related_people, obj, event_type, created_datetime,
-                              namespace=build_user_namespace(user),
-                              extra_data=extra_data)
+            user_namespace = build_user_namespace(user)
+            targets += [(person, user_namespace) for person in obj.get_related_people()]
     else:
         # Actions not related with a project
         # - Me
-        _push_to_timeline(user, obj, event_type, created_datetime,
-                          namespace=build_user_namespace(user),
-                          extra_data=extra_data)
+        targets = [(user, build_user_namespace(user))]
+
+    entries = _build_timeline_entries(targets, obj, event_type, created_datetime, extra_data=extra_data)
+    written = _save_timeline_entries(entries)
+
+    if project_id is not None and refresh_totals:
+        from taiga.projects.services.totals import schedule_project_totals_refresh
+        schedule_project_totals_refresh(project)
+
+    return written
 
 
 def get_timeline(obj, namespace=None):
@@ -353,6 +353,12 @@ class UsersViewSet(ModelCrudViewSet):
         self.check_permissions(request, "stats", user)
         return response.Ok(services.get_stats_for_user(user, request.user))
 
+    def _set_keyset_header(self, page):
+        # Clients can ask for the next page with ?after=<keyset> instead of
+        # ?page=<number> to avoid the cost of the offset on deep pages
+        if page is not None and page.has_next() and page.object_list:
+            self.headers["x-pagination-next-after"] = services.get_entity_keyset(page.object_list[-1])
+
     @detail_route(methods=["GET"])
     def watched(self, request, *args, **kwargs):
         for_user = get_object_or_404(models.User, **kwargs)
@@ -361,11 +367,13 @@ class UsersViewSet(ModelCrudViewSet):
         filters = {
             "type": request.GET.get("type", None),
             "q": request.GET.get("q", None),
+            "after": request.GET.get("after", None),
         }
 
         self.object_list = services.get_watched_list(for_user, from_user, **filters)
         page = self.paginate_queryset(self.object_list)
         elements = page.object_list if page is not None else self.object_list
+        self._set_keyset_header(page)
 
         extra_args_liked = {
             "user_watching": services.get_watched_content_for_user(request.user),
@@ -395,11 +403,13 @@ class UsersViewSet(ModelCrudViewSet):
         self.check_permissions(request, 'liked', for_user)
         filters = {
             "q": request.GET.get("q", None),
+            "after": request.GET.get("after", None),
         }
 
         self.object_list = services.get_liked_list(for_user, from_user, **filters)
         page = self.paginate_queryset(self.object_list)
         elements = page.object_list if page is not None else self.object_list
+        self._set_keyset_header(page)
 
         extra_args = {
             "user_watching": services.get_watched_content_for_user(request.user),
@@ -418,11 +428,13 @@ class UsersViewSet(ModelCrudViewSet):
         filters = {
             "type": request.GET.get("type", None),
             "q": request.GET.get("q", None),
+            "after": request.GET.get("after", None),
         }
 
         self.object_list = services.get_voted_list(for_user, from_user, **filters)
         page = self.paginate_queryset(self.object_list)
         elements = page.object_list if page is not None else self.object_list
+        self._set_keyset_header(page)
 
         extra_args = {
             "user_watching": services.get_watched_content_for_user(request.user),
@@ -38,7 +38,7 @@ from django.utils.translation import ugettext_lazy as _
 from taiga.base.db.models.fields import JSONField
 from django_pglocks import advisory_lock
 
-from taiga.auth.tokens import get_token_for_user
+from taiga.auth.tokens import get_token_for_user, invalidate_user_tokens_cache
 from taiga.base.utils.colors import generate_random_hex_color
 from taiga.base.utils.slug import slugify_uniquely
 from taiga.base.utils.files import get_file_path
@@ -357,3 +357,13 @@ def role_post_save(sender, instance, created, **kwargs):
         return
 
     instance.project.update_role_points()
+
+
+# On User object is changed or deleted, discard its cached
+# authentication tokens.
+@receiver(models.signals.post_save, sender=User,
+          dispatch_uid="user_post_save_invalidate_tokens")
+@receiver(models.signals.post_delete, sender=User,
+          dispatch_uid="user_post_delete_invalidate_tokens")
+def user_invalidate_tokens_cache(sender, instance, **kwargs):
+    invalidate_user_tokens_cache(instance.id)
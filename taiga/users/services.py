@@ -20,18 +20,26 @@
 This model contains a domain logic for users application.
 """
 
+from datetime import datetime, timedelta
+from functools import partial
+
 from django.apps import apps
 from django.contrib.auth import get_user_model
 from django.db.models import Q
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
 from django.db import connection
 from django.conf import settings
+from django.core.cache import caches
 from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
 from django.utils.translation import ugettext as _
 
 from easy_thumbnails.files import get_thumbnailer
 from easy_thumbnails.exceptions import InvalidImageFormatError
 
 from taiga.base import exceptions as exc
+from taiga.celery import app
+from taiga.base.utils.cache import is_shared_cache
 from taiga.base.utils.db import to_tsquery
 from taiga.base.utils.urls import get_absolute_url
 from taiga.projects.notifications.choices import NotifyLevel
@@ -106,6 +114,98 @@ def get_user_big_photo_url(user):
     return get_big_photo_url(user.photo)
 
 
+######################################################################
+# Buffered last login of the users
+######################################################################
+
+def _get_last_login_cache():
+    return caches[getattr(settings, "LAST_LOGIN_CACHE", "default")]
+
+
+def _is_last_login_buffer_enabled():
+    # The buffer must be flushed by any process (also the celery workers)
+    return getattr(settings, "LAST_LOGIN_FLUSH_INTERVAL", 0) > 0 and is_shared_cache(_get_last_login_cache())
+
+
+# Every buffered last login has its own key ("users:last-logins:<n>"), numbered
+# by an atomic counter, so the concurrent requests don't overwrite each other.
+_LAST_LOGINS_COUNTER_KEY = "users:last-logins-counter"
+_LAST_LOGINS_FLUSHED_KEY = "users:last-logins-flushed"
+
+
+def _get_last_login_key(number):
+    return "users:last-logins:{}".format(number)
+
+
+def register_last_login(user):
+    """
+    Update the last login of a user at most once a minute. If
+    LAST_LOGIN_FLUSH_INTERVAL and the cache is shared it is buffered in the
+    cache and saved in batches with flush_last_logins, so the authenticated
+    requests don't write in the database. They are flushed by the first
+    request after the interval and by the periodic `flush_last_logins`
+    management command.
+    """
+    now = timezone.now()
+    if not _is_last_login_buffer_enabled():
+        if user.last_login is None or user.last_login < (now - timedelta(minutes=1)):
+            user.last_login = now
+            user.save(update_fields=["last_login"])
+        return
+
+    last_login_cache = _get_last_login_cache()
+    if not last_login_cache.add("users:last-login:{}".format(user.id), True, 60):
+        return
+
+    last_login_cache.add(_LAST_LOGINS_COUNTER_KEY, 0, None)
+    number = last_login_cache.incr(_LAST_LOGINS_COUNTER_KEY)
+    last_login_cache.set(_get_last_login_key(number), (user.id, now), None)
+
+    # The first request after the interval triggers the flush
+    if last_login_cache.add("users:last-logins-flush", True, settings.LAST_LOGIN_FLUSH_INTERVAL):
+        if settings.CELERY_ENABLED:
+            flush_last_logins.delay()
+        else:
+            flush_last_logins()
+
+
+@app.task
+def flush_last_logins():
+    """Save the buffered last logins of the users with one query."""
+    last_login_cache = _get_last_login_cache()
+    first = (last_login_cache.get(_LAST_LOGINS_FLUSHED_KEY) or 0) + 1
+    last = last_login_cache.get(_LAST_LOGINS_COUNTER_KEY) or 0
+    keys = [_get_last_login_key(number) for number in range(first, last + 1)]
+    if not keys:
+        return
+
+    # NOTE: a last login numbered but not stored yet is lost, it is
+    # buffered again by the next request of the user after a minute.
+    last_logins = {}
+    for user_id, last_login in last_login_cache.get_many(keys).values():
+        last_logins[user_id] = max(last_login, last_logins.get(user_id, last_login))
+    last_login_cache.set(_LAST_LOGINS_FLUSHED_KEY, last, None)
+    last_login_cache.delete_many(keys)
+
+    if not last_logins:
+        return
+
+    sql = """
+        UPDATE users_user
+           SET last_login = last_logins.last_login
+          FROM (VALUES {values}) AS last_logins(id, last_login)
+         WHERE users_user.id = last_logins.id
+               AND (users_user.last_login IS NULL OR users_user.last_login < last_logins.last_login)
+    """.format(values=", ".join(["(%s, %s::timestamptz)"] * len(last_logins)))
+
+    params = []
+    for user_id, last_login in last_logins.items():
+        params += [user_id, last_login]
+
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+
+
 def get_visible_project_ids(from_user, by_user):
     """Calculate the project_ids from one user visible by another"""
     required_permissions = ["view_project"]
@@ -218,368 +318,364 @@ def get_watched_content_for_user(user):
     return user_watches
 
 
-def _build_watched_sql_for_projects(for_user):
+class UserEntitiesList:
+    """
+    Lazy list of the entities watched, liked or voted by a user.
+
+    The entities are sorted by (created_date, type, id) in descending order.
+    Slicing the list pushes the LIMIT and OFFSET into every branch of the
+    UNION, so a page only walks the first rows of the action table indexes,
+    and iterating over the whole list streams the rows through a server
+    side cursor instead of loading all of them in memory.
+    """
+    def __init__(self, branches, params):
+        self.branches = branches
+        self.params = params
+
+    def _get_entities_sql(self, limit=None):
+        if limit is None:
+            branches = ["({})".format(sql) for sql, order_sql in self.branches]
+        else:
+            branches = ["({} {} LIMIT {})".format(sql, order_sql, limit) for sql, order_sql in self.branches]
+        return "\n UNION ALL \n".join(branches)
+
+    def _get_sql(self, limit=None, offset=0):
+        sql = """
+        -- BEGIN Basic info: we need to mix info from different tables and denormalize it
+        SELECT entities.*,
+               projects_project.name as project_name, projects_project.description as description, projects_project.slug as project_slug, projects_project.is_private as project_is_private,
+               projects_project.blocked_code as project_blocked_code, projects_project.tags_colors, projects_project.logo,
+               users_user.id as assigned_to_id,
+               row_to_json(users_user) as assigned_to_extra_info
+            FROM (
+                {entities_sql}
+            ) as entities
+        -- END Basic info
+
+        -- BEGIN Project info
+        LEFT JOIN projects_project
+            ON (entities.project = projects_project.id)
+        -- END Project info
+
+        -- BEGIN Assigned to user info
+        LEFT JOIN users_user
+            ON (assigned_to = users_user.id)
+        -- END Assigned to user info
+
+        ORDER BY entities.created_date DESC, entities.type DESC, entities.id DESC
+        {limit_sql}
+        """
+        limit_sql = ""
+        if limit is not None:
+            limit_sql = "LIMIT {} OFFSET {}".format(limit, offset)
+
+        return sql.format(entities_sql=self._get_entities_sql(None if limit is None else offset + limit),
+                          limit_sql=limit_sql)
+
+    def _fetch(self, limit, offset):
+        if not self.branches or limit <= 0:
+            return []
+
+        cursor = connection.cursor()
+        cursor.execute(self._get_sql(limit, offset), self.params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def count(self):
+        if not self.branches:
+            return 0
+
+        cursor = connection.cursor()
+        cursor.execute("SELECT count(*) FROM ({}) AS entities".format(self._get_entities_sql()),
+                       self.params)
+        return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        if not self.branches:
+            return
+
+        cursor = connection.chunked_cursor()
+        try:
+            cursor.execute(self._get_sql(), self.params)
+            columns = None
+            while True:
+                rows = cursor.fetchmany(GET_ITERATOR_CHUNK_SIZE)
+                if not rows:
+                    break
+
+                if columns is None:
+                    columns = [col[0] for col in cursor.description]
+
+                for row in rows:
+                    yield dict(zip(columns, row))
+        finally:
+            cursor.close()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.step is not None:
+                raise ValueError("Slicing with step is not supported.")
+
+            offset = key.start or 0
+            if offset < 0 or (key.stop is not None and key.stop < 0):
+                raise ValueError("Negative indexing is not supported.")
+
+            if key.stop is None:
+                return list(self)[offset:]
+
+            return self._fetch(key.stop - offset, offset)
+
+        if not isinstance(key, int):
+            raise TypeError("Indices must be integers or slices.")
+
+        if key < 0:
+            raise ValueError("Negative indexing is not supported.")
+
+        result = self._fetch(1, key)
+        if not result:
+            raise IndexError("Index out of range.")
+        return result[0]
+
+
+def get_entity_keyset(entity):
+    """Return the keyset token to get the entities after this one."""
+    created_date = (entity["created_date"] - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+    return "{},{},{}".format(created_date, entity["type"], entity["id"])
+
+
+def parse_entity_keyset(keyset):
+    try:
+        created_date, type, id = keyset.split(",")
+        created_date = datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=int(created_date))
+        return created_date, type, int(id)
+    except (ValueError, OverflowError):
+        raise exc.WrongArguments(_("Invalid 'after' parameter."))
+
+
+def _build_filters_sql(type, date_column, id_column, subject_column, name_column, ref_column,
+                       q=None, after=None):
+    filters_sql = ""
+
+    if q:
+        filters_sql += """ AND (
+            to_tsvector('simple', coalesce({subject_column},'') || ' ' ||coalesce({name_column},'') || ' ' ||coalesce(to_char({ref_column}, '999'),'')) @@ to_tsquery('simple', %(q)s)
+        )
+        """
+
+    if after:
+        # The entities are sorted by (created_date, type, id), the type is
+        # constant for every branch so we can resolve it here and let the
+        # condition use the (user, content_type, created_date, object_id) index.
+        after_type = after[1]
+        if type < after_type:
+            filters_sql += " AND {date_column} <= %(after_created_date)s "
+        elif type > after_type:
+            filters_sql += " AND {date_column} < %(after_created_date)s "
+        else:
+            filters_sql += """ AND ({date_column} < %(after_created_date)s
+                OR ({date_column} = %(after_created_date)s AND {id_column} < %(after_id)s))
+            """
+
+    return filters_sql.format(date_column=date_column, id_column=id_column, subject_column=subject_column,
+                              name_column=name_column, ref_column=ref_column)
+
+
+def _build_order_sql(date_column, id_column):
+    return "ORDER BY {date_column} DESC, {id_column} DESC".format(date_column=date_column, id_column=id_column)
+
+
+def _build_permissions_sql(from_user, permission):
+    # Here we check the memberbships from the user requesting the info, the
+    # entity is visible when the project is public or when the view_ permission
+    # is included in the user role for that project or in the anon permissions
+    join_sql = """
+        LEFT JOIN projects_membership
+            ON (projects_membership.user_id = {from_user_id} AND projects_membership.project_id = projects_project.id)
+        LEFT JOIN users_role
+            ON (users_role.id = projects_membership.role_id)
+    """
+    where_sql = """
+        AND (
+            projects_project.is_private = false
+            OR '{permission}' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions))
+        )
+    """
+
+    from_user_id = -1
+    if not from_user.is_anonymous():
+        from_user_id = from_user.id
+
+    return join_sql.format(from_user_id=from_user_id), where_sql.format(permission=permission)
+
+
+def _build_watched_sql_for_projects(for_user, from_user, q=None, after=None):
     sql = """
     SELECT projects_project.id AS id, null::integer AS ref, 'project'::text AS type,
-        tags, notifications_notifypolicy.project_id AS object_id, projects_project.id AS project,
-        slug, projects_project.name, null::text AS subject,
+        projects_project.tags, notifications_notifypolicy.project_id AS object_id, projects_project.id AS project,
+        projects_project.slug, projects_project.name, null::text AS subject,
         notifications_notifypolicy.created_at as created_date,
-        coalesce(watchers, 0) AS total_watchers, projects_project.total_fans AS total_fans, null::integer AS total_voters,
+        (SELECT count(*) FROM notifications_notifypolicy type_watchers
+         WHERE type_watchers.project_id = projects_project.id
+               AND type_watchers.notify_level != {none_notify_level}) AS total_watchers,
+        projects_project.total_fans AS total_fans, null::integer AS total_voters,
         null::integer AS assigned_to, null::text as status, null::text as status_color
         FROM notifications_notifypolicy
         INNER JOIN projects_project
             ON (projects_project.id = notifications_notifypolicy.project_id)
-        LEFT JOIN (SELECT project_id, count(*) watchers
-                   FROM notifications_notifypolicy
-                   WHERE notifications_notifypolicy.notify_level != {none_notify_level}
-                   GROUP BY project_id
-                ) type_watchers
-            ON projects_project.id = type_watchers.project_id
+        {permissions_join_sql}
         WHERE
               notifications_notifypolicy.user_id = {for_user_id}
               AND notifications_notifypolicy.notify_level != {none_notify_level}
+              {permissions_where_sql}
+              {filters_sql}
     """
+    date_column = "notifications_notifypolicy.created_at"
+    id_column = "notifications_notifypolicy.project_id"
+    permissions_join_sql, permissions_where_sql = _build_permissions_sql(from_user, "view_project")
+    filters_sql = _build_filters_sql("project", date_column, id_column, "null::text", "projects_project.name",
+                                     "null::integer", q=q, after=after)
     sql = sql.format(
         for_user_id=for_user.id,
         none_notify_level=NotifyLevel.none,
-        project_content_type_id=ContentType.objects.get(app_label="projects", model="project").id)
-    return sql
+        permissions_join_sql=permissions_join_sql,
+        permissions_where_sql=permissions_where_sql,
+        filters_sql=filters_sql)
+    return sql, _build_order_sql(date_column, id_column)
 
 
-def _build_liked_sql_for_projects(for_user):
+def _build_liked_sql_for_projects(for_user, from_user, q=None, after=None):
     sql = """
     SELECT projects_project.id AS id, null::integer AS ref, 'project'::text AS type,
-        tags, likes_like.object_id AS object_id, projects_project.id AS project,
-        slug, projects_project.name, null::text AS subject,
+        projects_project.tags, likes_like.object_id AS object_id, projects_project.id AS project,
+        projects_project.slug, projects_project.name, null::text AS subject,
         likes_like.created_date,
-        coalesce(watchers, 0) AS total_watchers, projects_project.total_fans AS total_fans,
+        (SELECT count(*) FROM notifications_notifypolicy type_watchers
+         WHERE type_watchers.project_id = projects_project.id
+               AND type_watchers.notify_level != {none_notify_level}) AS total_watchers,
+        projects_project.total_fans AS total_fans,
         null::integer AS assigned_to, null::text as status, null::text as status_color
         FROM likes_like
         INNER JOIN projects_project
               ON (projects_project.id = likes_like.object_id)
-        LEFT JOIN (SELECT project_id, count(*) watchers
-                   FROM notifications_notifypolicy
-                   WHERE notifications_notifypolicy.notify_level != {none_notify_level}
-                   GROUP BY project_id
-                ) type_watchers
-              ON projects_project.id = type_watchers.project_id
-        WHERE likes_like.user_id = {for_user_id} AND {project_content_type_id} = likes_like.content_type_id
+        {permissions_join_sql}
+        WHERE likes_like.user_id = {for_user_id} AND likes_like.content_type_id = {project_content_type_id}
+              {permissions_where_sql}
+              {filters_sql}
     """
+    date_column = "likes_like.created_date"
+    id_column = "likes_like.object_id"
+    permissions_join_sql, permissions_where_sql = _build_permissions_sql(from_user, "view_project")
+    filters_sql = _build_filters_sql("project", date_column, id_column, "null::text", "projects_project.name",
+                                     "null::integer", q=q, after=after)
     sql = sql.format(
         for_user_id=for_user.id,
         none_notify_level=NotifyLevel.none,
-        project_content_type_id=ContentType.objects.get(app_label="projects", model="project").id)
+        project_content_type_id=ContentType.objects.get(app_label="projects", model="project").id,
+        permissions_join_sql=permissions_join_sql,
+        permissions_where_sql=permissions_where_sql,
+        filters_sql=filters_sql)
 
-    return sql
+    return sql, _build_order_sql(date_column, id_column)
 
 
-def _build_sql_for_type(for_user, type, table_name, action_table, ref_column="ref",
-                        project_column="project_id", assigned_to_column="assigned_to_id",
-                        slug_column="slug", subject_column="subject"):
+def _build_sql_for_type(for_user, from_user, type, table_name, action_table, permission,
+                        ref_column="ref", project_column="project_id", assigned_to_column="assigned_to_id",
+                        slug_column="slug", subject_column="subject", q=None, after=None):
     sql = """
-    SELECT {table_name}.id AS id, {ref_column} AS ref, '{type}' AS type,
-        tags, {action_table}.object_id AS object_id, {table_name}.{project_column} AS project,
-        {slug_column} AS slug, null AS name, {subject_column} AS subject,
+    SELECT {table_name}.id AS id, {table_name}.{ref_column} AS ref, '{type}'::text AS type,
+        {table_name}.tags, {action_table}.object_id AS object_id, {table_name}.{project_column} AS project,
+        {slug_column} AS slug, null::text AS name, {table_name}.{subject_column} AS subject,
         {action_table}.created_date,
-        coalesce(watchers, 0) AS total_watchers, null::integer AS total_fans, coalesce(votes_votes.count, 0) AS total_voters,
-        {assigned_to_column}  AS assigned_to, projects_{type}status.name as status, projects_{type}status.color as status_color
+        (SELECT count(*) FROM notifications_watched type_watchers
+         WHERE type_watchers.content_type_id = {content_type_id}
+               AND type_watchers.object_id = {table_name}.id) AS total_watchers,
+        null::integer AS total_fans, coalesce(votes_votes.count, 0) AS total_voters,
+        {table_name}.{assigned_to_column} AS assigned_to, projects_{type}status.name as status, projects_{type}status.color as status_color
         FROM {action_table}
-        INNER JOIN django_content_type
-              ON ({action_table}.content_type_id = django_content_type.id AND django_content_type.model = '{type}')
         INNER JOIN {table_name}
               ON ({table_name}.id = {action_table}.object_id)
+        INNER JOIN projects_project
+              ON (projects_project.id = {table_name}.{project_column})
         INNER JOIN projects_{type}status
               ON (projects_{type}status.id = {table_name}.status_id)
-        LEFT JOIN (SELECT object_id, content_type_id, count(*) watchers FROM notifications_watched GROUP BY object_id, content_type_id) type_watchers
-              ON {table_name}.id = type_watchers.object_id AND django_content_type.id = type_watchers.content_type_id
         LEFT JOIN votes_votes
-              ON ({table_name}.id = votes_votes.object_id AND django_content_type.id = votes_votes.content_type_id)
-        WHERE {action_table}.user_id = {for_user_id}
+              ON ({table_name}.id = votes_votes.object_id AND votes_votes.content_type_id = {content_type_id})
+        {permissions_join_sql}
+        WHERE {action_table}.user_id = {for_user_id} AND {action_table}.content_type_id = {content_type_id}
+              {permissions_where_sql}
+              {filters_sql}
     """
+    date_column = "{}.created_date".format(action_table)
+    id_column = "{}.object_id".format(action_table)
+    permissions_join_sql, permissions_where_sql = _build_permissions_sql(from_user, permission)
+    filters_sql = _build_filters_sql(type, date_column, id_column,
+                                     "{}.{}".format(table_name, subject_column), "null::text",
+                                     "{}.{}".format(table_name, ref_column), q=q, after=after)
+    content_type = ContentType.objects.get_by_natural_key(*table_name.split("_", 1))
     sql = sql.format(for_user_id=for_user.id, type=type, table_name=table_name,
                      action_table=action_table, ref_column=ref_column,
                      project_column=project_column, assigned_to_column=assigned_to_column,
-                     slug_column=slug_column, subject_column=subject_column)
-
-    return sql
-
+                     slug_column=slug_column, subject_column=subject_column,
+                     content_type_id=content_type.id,
+                     permissions_join_sql=permissions_join_sql,
+                     permissions_where_sql=permissions_where_sql,
+                     filters_sql=filters_sql)
 
-def get_watched_list(for_user, from_user, type=None, q=None):
-    filters_sql = ""
-
-    if type:
-        filters_sql += " AND type = %(type)s "
-
-    if q:
-        filters_sql += """ AND (
-            to_tsvector('simple', coalesce(subject,'') || ' ' ||coalesce(entities.name,'') || ' ' ||coalesce(to_char(ref, '999'),'')) @@ to_tsquery('simple', %(q)s)
-        )
-        """
-
-    sql = """
-    -- BEGIN Basic info: we need to mix info from different tables and denormalize it
-    SELECT entities.*,
-           projects_project.name as project_name, projects_project.description as description, projects_project.slug as project_slug, projects_project.is_private as project_is_private,
-           projects_project.blocked_code as project_blocked_code, projects_project.tags_colors, projects_project.logo,
-           users_user.id as assigned_to_id,
-           row_to_json(users_user) as assigned_to_extra_info
-
-        FROM (
-            {epics_sql}
-            UNION
-            {userstories_sql}
-            UNION
-            {tasks_sql}
-            UNION
-            {issues_sql}
-            UNION
-            {projects_sql}
-        ) as entities
-    -- END Basic info
-
-    -- BEGIN Project info
-    LEFT JOIN projects_project
-        ON (entities.project = projects_project.id)
-    -- END Project info
-
-    -- BEGIN Assigned to user info
-    LEFT JOIN users_user
-        ON (assigned_to = users_user.id)
-    -- END Assigned to user info
-
-    -- BEGIN Permissions checking
-    LEFT JOIN projects_membership
-        -- Here we check the memberbships from the user requesting the info
-        ON (projects_membership.user_id = {from_user_id} AND projects_membership.project_id = entities.project)
-
-    LEFT JOIN users_role
-        ON (entities.project = users_role.project_id AND users_role.id =  projects_membership.role_id)
-
-    WHERE
-        -- public project
-        (
-            projects_project.is_private = false
-            OR(
-                -- private project where the view_ permission is included in the user role for that project or in the anon permissions
-                projects_project.is_private = true
-                AND(
-                    (entities.type = 'issue' AND 'view_issues' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions)))
-                    OR (entities.type = 'task' AND 'view_tasks' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions)))
-                    OR (entities.type = 'userstory' AND 'view_us' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions)))
-                    OR (entities.type = 'project' AND 'view_project' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions)))
-                    OR (entities.type = 'epic' AND 'view_epic' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions)))
-                )
-        ))
-    -- END Permissions checking
-        {filters_sql}
-
-    ORDER BY entities.created_date DESC;
-    """
+    return sql, _build_order_sql(date_column, id_column)
 
-    from_user_id = -1
-    if not from_user.is_anonymous():
-        from_user_id = from_user.id
 
-    sql = sql.format(
-        for_user_id=for_user.id,
-        from_user_id=from_user_id,
-        filters_sql=filters_sql,
-        userstories_sql=_build_sql_for_type(for_user, "userstory", "userstories_userstory", "notifications_watched", slug_column="null"),
-        tasks_sql=_build_sql_for_type(for_user, "task", "tasks_task", "notifications_watched", slug_column="null"),
-        issues_sql=_build_sql_for_type(for_user, "issue", "issues_issue", "notifications_watched", slug_column="null"),
-        epics_sql=_build_sql_for_type(for_user, "epic", "epics_epic", "notifications_watched", slug_column="null"),
-        projects_sql=_build_watched_sql_for_projects(for_user))
-
-    cursor = connection.cursor()
+def _build_entities_list(builders, type=None, q=None, after=None):
     params = {
-        "type": type,
-        "q": to_tsquery(q) if q is not None else ""
+        "q": to_tsquery(q) if q is not None else "",
     }
-    cursor.execute(sql, params)
 
-    desc = cursor.description
-    return [
-        dict(zip([col[0] for col in desc], row))
-        for row in cursor.fetchall()
+    if after:
+        after = parse_entity_keyset(after)
+        params["after_created_date"] = after[0]
+        params["after_id"] = after[2]
+
+    branches = [builder(q=q, after=after) for (builder_type, builder) in builders
+                if not type or builder_type == type]
+    return UserEntitiesList(branches, params)
+
+
+def get_watched_list(for_user, from_user, type=None, q=None, after=None):
+    builders = [
+        ("epic", partial(_build_sql_for_type, for_user, from_user, "epic", "epics_epic",
+                         "notifications_watched", "view_epic", slug_column="null")),
+        ("userstory", partial(_build_sql_for_type, for_user, from_user, "userstory", "userstories_userstory",
+                              "notifications_watched", "view_us", slug_column="null")),
+        ("task", partial(_build_sql_for_type, for_user, from_user, "task", "tasks_task",
+                         "notifications_watched", "view_tasks", slug_column="null")),
+        ("issue", partial(_build_sql_for_type, for_user, from_user, "issue", "issues_issue",
+                          "notifications_watched", "view_issues", slug_column="null")),
+        ("project", partial(_build_watched_sql_for_projects, for_user, from_user)),
     ]
+    return _build_entities_list(builders, type=type, q=q, after=after)
 
 
-def get_liked_list(for_user, from_user, type=None, q=None):
-    filters_sql = ""
-
-    if type:
-        filters_sql += " AND type = %(type)s "
-
-    if q:
-        filters_sql += """ AND (
-            to_tsvector('simple', coalesce(subject,'') || ' ' ||coalesce(entities.name,'') || ' ' ||coalesce(to_char(ref, '999'),'')) @@ to_tsquery('simple', %(q)s)
-        )
-        """
-
-    sql = """
-    -- BEGIN Basic info: we need to mix info from different tables and denormalize it
-    SELECT entities.*,
-           projects_project.name as project_name, projects_project.description as description, projects_project.slug as project_slug, projects_project.is_private as project_is_private,
-           projects_project.blocked_code as project_blocked_code, projects_project.tags_colors, projects_project.logo,
-           users_user.id as assigned_to_id,
-           row_to_json(users_user) as assigned_to_extra_info
-        FROM (
-            {projects_sql}
-        ) as entities
-    -- END Basic info
-
-    -- BEGIN Project info
-    LEFT JOIN projects_project
-        ON (entities.project = projects_project.id)
-    -- END Project info
-
-    -- BEGIN Assigned to user info
-    LEFT JOIN users_user
-        ON (assigned_to = users_user.id)
-    -- END Assigned to user info
-
-    -- BEGIN Permissions checking
-    LEFT JOIN projects_membership
-        -- Here we check the memberbships from the user requesting the info
-        ON (projects_membership.user_id = {from_user_id} AND projects_membership.project_id = entities.project)
-
-    LEFT JOIN users_role
-        ON (entities.project = users_role.project_id AND users_role.id =  projects_membership.role_id)
-
-    WHERE
-        -- public project
-        (
-            projects_project.is_private = false
-            OR(
-                -- private project where the view_ permission is included in the user role for that project or in the anon permissions
-                projects_project.is_private = true
-                AND(
-                    'view_project' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions))
-                )
-        ))
-    -- END Permissions checking
-        {filters_sql}
-
-    ORDER BY entities.created_date DESC;
-    """
-
-    from_user_id = -1
-    if not from_user.is_anonymous():
-        from_user_id = from_user.id
-
-    sql = sql.format(
-        for_user_id=for_user.id,
-        from_user_id=from_user_id,
-        filters_sql=filters_sql,
-        projects_sql=_build_liked_sql_for_projects(for_user))
-
-    cursor = connection.cursor()
-    params = {
-        "type": type,
-        "q": to_tsquery(q) if q is not None else ""
-    }
-    cursor.execute(sql, params)
-
-    desc = cursor.description
-    return [
-        dict(zip([col[0] for col in desc], row))
-        for row in cursor.fetchall()
+def get_liked_list(for_user, from_user, type=None, q=None, after=None):
+    builders = [
+        ("project", partial(_build_liked_sql_for_projects, for_user, from_user)),
     ]
-
-
-def get_voted_list(for_user, from_user, type=None, q=None):
-    filters_sql = ""
-
-    if type:
-        filters_sql += " AND type = %(type)s "
-
-    if q:
-        filters_sql += """ AND (
-            to_tsvector('simple', coalesce(subject,'') || ' ' ||coalesce(entities.name,'') || ' ' ||coalesce(to_char(ref, '999'),'')) @@ to_tsquery('simple', %(q)s)
-        )
-        """
-
-    sql = """
-    -- BEGIN Basic info: we need to mix info from different tables and denormalize it
-    SELECT entities.*,
-           projects_project.name as project_name, projects_project.description as description, projects_project.slug as project_slug, projects_project.is_private as project_is_private,
-           projects_project.blocked_code as project_blocked_code, projects_project.tags_colors, projects_project.logo,
-           users_user.id as assigned_to_id,
-           row_to_json(users_user) as assigned_to_extra_info
-        FROM (
-            {epics_sql}
-            UNION
-            {userstories_sql}
-            UNION
-            {tasks_sql}
-            UNION
-            {issues_sql}
-        ) as entities
-    -- END Basic info
-
-    -- BEGIN Project info
-    LEFT JOIN projects_project
-        ON (entities.project = projects_project.id)
-    -- END Project info
-
-    -- BEGIN Assigned to user info
-    LEFT JOIN users_user
-        ON (assigned_to = users_user.id)
-    -- END Assigned to user info
-
-    -- BEGIN Permissions checking
-    LEFT JOIN projects_membership
-        -- Here we check the memberbships from the user requesting the info
-        ON (projects_membership.user_id = {from_user_id} AND projects_membership.project_id = entities.project)
-
-    LEFT JOIN users_role
-        ON (entities.project = users_role.project_id AND users_role.id =  projects_membership.role_id)
-
-    WHERE
-        -- public project
-        (
-            projects_project.is_private = false
-            OR(
-                -- private project where the view_ permission is included in the user role for that project or in the anon permissions
-                projects_project.is_private = true
-                AND(
-                    (entities.type = 'issue' AND 'view_issues' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions)))
-                    OR (entities.type = 'task' AND 'view_tasks' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions)))
-                    OR (entities.type = 'userstory' AND 'view_us' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions)))
-                    OR (entities.type = 'epic' AND 'view_epic' = ANY (array_cat(users_role.permissions, projects_project.anon_permissions)))
-                )
-        ))
-    -- END Permissions checking
-        {filters_sql}
-
-    ORDER BY entities.created_date DESC;
-    """
-
-    from_user_id = -1
-    if not from_user.is_anonymous():
-        from_user_id = from_user.id
-
-    sql = sql.format(
-        for_user_id=for_user.id,
-        from_user_id=from_user_id,
-        filters_sql=filters_sql,
-        userstories_sql=_build_sql_for_type(for_user, "userstory", "userstories_userstory", "votes_vote", slug_column="null"),
-        tasks_sql=_build_sql_for_type(for_user, "task", "tasks_task", "votes_vote", slug_column="null"),
-        issues_sql=_build_sql_for_type(for_user, "issue", "issues_issue", "votes_vote", slug_column="null"),
-        epics_sql=_build_sql_for_type(for_user, "epic", "epics_epic", "votes_vote", slug_column="null"))
-
-    cursor = connection.cursor()
-    params = {
-        "type": type,
-        "q": to_tsquery(q) if q is not None else ""
-    }
-    cursor.execute(sql, params)
-
-    desc = cursor.description
-    return [
-        dict(zip([col[0] for col in desc], row))
-        for row in cursor.fetchall()
+    return _build_entities_list(builders, type=type, q=q, after=after)
+
+
+def get_voted_list(for_user, from_user, type=None, q=None, after=None):
+    builders = [
+        ("epic", partial(_build_sql_for_type, for_user, from_user, "epic", "epics_epic",
+                         "votes_vote", "view_epic", slug_column="null")),
+        ("userstory", partial(_build_sql_for_type, for_user, from_user, "userstory", "userstories_userstory",
+                              "votes_vote", "view_us", slug_column="null")),
+        ("task", partial(_build_sql_for_type, for_user, from_user, "task", "tasks_task",
+                         "votes_vote", "view_tasks", slug_column="null")),
+        ("issue", partial(_build_sql_for_type, for_user, from_user, "issue", "issues_issue",
+                          "votes_vote", "view_issues", slug_column="null")),
     ]
+    return _build_entities_list(builders, type=type, q=q, after=after)
 
 
 def has_available_slot_for_new_project(owner, is_private, total_memberships):
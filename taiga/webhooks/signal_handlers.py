@@ -53,32 +53,30 @@ def on_new_history_entry(sender, instance, created, **kwargs):
         return None
 
     webhooks = _get_project_webhooks(obj.project)
+    if not webhooks:
+        return None
 
     if instance.type == HistoryType.create:
-        task = tasks.create_webhook
-        extra_args = []
+        action, change = "create", None
     elif instance.type == HistoryType.change:
-        task = tasks.change_webhook
-        extra_args = [instance]
+        action, change = "change", instance
     elif instance.type == HistoryType.delete:
-        task = tasks.delete_webhook
-        extra_args = []
+        action, change = "delete", None
 
     by = instance.owner
     date = timezone.now()
 
-    webhooks_args = []
-    for webhook in webhooks:
-        args = [webhook["id"], webhook["url"], webhook["key"], by, date, obj] + extra_args
-        webhooks_args.append(args)
-
-    connection.on_commit(lambda: _execute_task(task, webhooks_args))
+    def _send_webhooks():
+        # The payload is serialized only once and the task receives it as
+        # bytes instead of the model instances
+        payload = tasks.build_event_payload(action, by, date, obj, change)
+        _execute_task(tasks.send_webhooks, [webhooks, payload])
 
+    connection.on_commit(_send_webhooks)
 
-def _execute_task(task, webhooks_args):
-    for webhook_args in webhooks_args:
 
-        if settings.CELERY_ENABLED:
-            task.delay(*webhook_args)
-        else:
-            task(*webhook_args)
+def _execute_task(task, args):
+    if settings.CELERY_ENABLED:
+        task.delay(*args)
+    else:
+        task(*args)
@@ -18,7 +18,17 @@
 
 import hmac
 import hashlib
+import os
+import threading
+import time
 import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
 from taiga.base.api.renderers import UnicodeJSONRenderer
@@ -63,8 +73,83 @@ def _generate_signature(data, key):
     return mac.hexdigest()
 
 
-def _send_request(webhook_id, url, key, data):
-    serialized_data = UnicodeJSONRenderer().render(data)
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """
+    Return the requests session of the current process. Its adapters keep a
+    pool of keep-alive connections per host, reused by all the deliveries.
+    """
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=getattr(settings, "WEBHOOKS_POOL_CONNECTIONS", 10),
+                                  pool_maxsize=getattr(settings, "WEBHOOKS_POOL_MAXSIZE", 10))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
+def _send_with_retries(prepared_request):
+    """
+    Send the request retrying, with exponential backoff, the connection
+    errors and the 502, 503 and 504 responses.
+    """
+    session = _get_session()
+    timeout = getattr(settings, "WEBHOOKS_REQUEST_TIMEOUT", 10)
+    retries = getattr(settings, "WEBHOOKS_MAX_RETRIES", 2)
+    backoff = getattr(settings, "WEBHOOKS_RETRY_BACKOFF", 0.5)
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.send(prepared_request, timeout=timeout)
+        except RequestException:
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in (502, 503, 504) or attempt == retries:
+                return response
+
+        time.sleep(backoff * (2 ** attempt))
+
+
+def _trim_webhook_logs(webhook_ids):
+    """
+    Only the last ten webhook logs traces are required
+    so remove the leftover of all the webhooks at once.
+    """
+    if not webhook_ids:
+        return
+
+    sql = """
+        DELETE FROM webhooks_webhooklog
+              WHERE id IN (SELECT id
+                             FROM (SELECT id,
+                                          row_number() OVER (PARTITION BY webhook_id ORDER BY id DESC) AS position
+                                     FROM webhooks_webhooklog
+                                    WHERE webhook_id = ANY(%s)) AS logs
+                            WHERE logs.position > 10)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [list(set(webhook_ids))])
+
+
+def _send_request(webhook_id, url, key, data, *, logs=None, payload=None):
+    """
+    Send `data` to a webhook and return its log.
+
+    `payload` is `data` already serialized, if it is shared by several
+    webhooks. If a `logs` list is given the log is appended to it instead of
+    being saved, so the deliveries can run in other threads (see
+    `_send_requests`).
+    """
+    serialized_data = payload if payload is not None else UnicodeJSONRenderer().render(data)
     signature = _generate_signature(serialized_data, key)
     headers = {
         "X-TAIGA-WEBHOOK-SIGNATURE": signature,        # For backward compatibility
@@ -74,75 +159,93 @@ def _send_request(webhook_id, url, key, data):
     request = requests.Request('POST', url, data=serialized_data, headers=headers)
     prepared_request = request.prepare()
 
-    with requests.Session() as session:
-        try:
-            response = session.send(prepared_request)
-        except RequestException as e:
-            # Error sending the webhook
-            webhook_log = WebhookLog.objects.create(webhook_id=webhook_id, url=url, status=0,
-                                                    request_data=data,
-                                                    request_headers=dict(prepared_request.headers),
-                                                    response_data="error-in-request: {}".format(str(e)),
-                                                    response_headers={},
-                                                    duration=0)
-        else:
-            # Webhook was sent successfully
-
-            # response.content can be a not valid json so we encapsulate it
-            response_data = json.dumps({"content": response.text})
-            webhook_log = WebhookLog.objects.create(webhook_id=webhook_id, url=url,
-                                                    status=response.status_code,
-                                                    request_data=data,
-                                                    request_headers=dict(prepared_request.headers),
-                                                    response_data=response_data,
-                                                    response_headers=dict(response.headers),
-                                                    duration=response.elapsed.total_seconds())
-        finally:
-            # Only the last ten webhook logs traces are required
-            # so remove the leftover
-            ids = (WebhookLog.objects.filter(webhook_id=webhook_id)
-                                     .order_by("-id")
-                                     .values_list('id', flat=True)[10:])
-            WebhookLog.objects.filter(id__in=ids).delete()
+    try:
+        response = _send_with_retries(prepared_request)
+    except RequestException as e:
+        # Error sending the webhook
+        webhook_log = WebhookLog(webhook_id=webhook_id, url=url, status=0,
+                                 request_data=data,
+                                 request_headers=dict(prepared_request.headers),
+                                 response_data="error-in-request: {}".format(str(e)),
+                                 response_headers={},
+                                 duration=0)
+    else:
+        # Webhook was sent successfully
+
+        # response.content can be a not valid json so we encapsulate it
+        response_data = json.dumps({"content": response.text})
+        webhook_log = WebhookLog(webhook_id=webhook_id, url=url,
+                                 status=response.status_code,
+                                 request_data=data,
+                                 request_headers=dict(prepared_request.headers),
+                                 response_data=response_data,
+                                 response_headers=dict(response.headers),
+                                 duration=response.elapsed.total_seconds())
+
+    if logs is not None:
+        logs.append(webhook_log)
+    else:
+        webhook_log.save()
+        _trim_webhook_logs([webhook_id])
 
     return webhook_log
 
 
-@app.task
-def create_webhook(webhook_id, url, key, by, date, obj):
-    data = {}
-    data['action'] = "create"
-    data['type'] = _get_type(obj)
-    data['by'] = UserSerializer(by).data
-    data['date'] = date
-    data['data'] = _serialize(obj)
+def _send_requests(webhooks, data, *, payload=None):
+    """
+    Send the same `data` to several webhooks at once, with up to
+    WEBHOOKS_DELIVERY_WORKERS concurrent requests and no more than
+    WEBHOOKS_MAX_CONCURRENCY_PER_HOST to the same host. The logs are
+    saved and trimmed in bulk at the end.
+    """
+    logs = []
+    workers = getattr(settings, "WEBHOOKS_DELIVERY_WORKERS", 4)
 
-    return _send_request(webhook_id, url, key, data)
+    if workers <= 1 or len(webhooks) <= 1:
+        for webhook in webhooks:
+            _send_request(webhook["id"], webhook["url"], webhook["key"], data, logs=logs, payload=payload)
+    else:
+        max_per_host = getattr(settings, "WEBHOOKS_MAX_CONCURRENCY_PER_HOST", 2)
+        hosts = {urlsplit(webhook["url"]).netloc for webhook in webhooks}
+        semaphores = {host: threading.BoundedSemaphore(max_per_host) for host in hosts}
 
+        def _deliver(webhook):
+            with semaphores[urlsplit(webhook["url"]).netloc]:
+                _send_request(webhook["id"], webhook["url"], webhook["key"], data, logs=logs, payload=payload)
 
-@app.task
-def delete_webhook(webhook_id, url, key, by, date, obj):
-    data = {}
-    data['action'] = "delete"
-    data['type'] = _get_type(obj)
-    data['by'] = UserSerializer(by).data
-    data['date'] = date
-    data['data'] = _serialize(obj)
+        with ThreadPoolExecutor(max_workers=min(workers, len(webhooks))) as executor:
+            for future in [executor.submit(_deliver, webhook) for webhook in webhooks]:
+                future.result()
 
-    return _send_request(webhook_id, url, key, data)
+    WebhookLog.objects.bulk_create(logs)
+    _trim_webhook_logs([log.webhook_id for log in logs])
+    return logs
 
 
-@app.task
-def change_webhook(webhook_id, url, key, by, date, obj, change):
+def build_event_payload(action, by, date, obj, change=None) -> bytes:
+    """
+    Serialize an event once for all the webhooks of a project.
+    """
     data = {}
-    data['action'] = "change"
+    data['action'] = action
     data['type'] = _get_type(obj)
     data['by'] = UserSerializer(by).data
     data['date'] = date
     data['data'] = _serialize(obj)
-    data['change'] = _serialize(change)
+    if change is not None:
+        data['change'] = _serialize(change)
 
-    return _send_request(webhook_id, url, key, data)
+    return UnicodeJSONRenderer().render(data)
+
+
+@app.task
+def send_webhooks(webhooks, payload):
+    """
+    Send the payload of an event (see `build_event_payload`) to all the
+    webhooks of a project. Only the signature is calculated for each one.
+    """
+    data = json.loads(payload)
+    return _send_requests(webhooks, data, payload=payload)
 
 
 @app.task
@@ -66,3 +66,17 @@ def outbox():
     from django.core import mail
 
     return mail.outbox
+
+
+@pytest.fixture
+def shared_cache(settings, tmpdir):
+    """
+    Alias of a cache shared between processes, for the caches that can't
+    work with the local memory one.
+    """
+    settings.CACHES = dict(settings.CACHES, shared={
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": str(tmpdir),
+    })
+    return "shared"
+
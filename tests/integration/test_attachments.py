@@ -18,11 +18,19 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import pytest
+from unittest import mock
 
 from django.core.urlresolvers import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from taiga.base.utils.thumbnails import get_thumbnail_generation_stats
+from taiga.base.utils.urls import get_absolute_url
+from taiga.projects.attachments import services
+from taiga.projects.history.models import HistoryEntry
+from taiga.projects.history.services import make_key_from_model_object, take_snapshot, get_last_snapshot_for_key
+
 from .. import factories as f
+from ..utils import DUMMY_BMP_DATA
 
 pytestmark = pytest.mark.django_db
 
@@ -80,3 +88,59 @@ def test_create_attachment_with_long_file_name(client):
     client.login(issue1.owner)
     response = client.post(url, data)
     assert response.data["attached_file"].endswith("/"+100*"x"+".txt")
+
+
+def test_upload_attachment_schedules_the_thumbnails():
+    with mock.patch("taiga.projects.attachments.signals.schedule_attachment_thumbnails") as schedule_mock:
+        attachment = f.UserStoryAttachmentFactory.create()
+        assert schedule_mock.call_count == 1
+        assert schedule_mock.call_args[0][0] == attachment
+
+        attachment.description = "new description"
+        attachment.save()
+        assert schedule_mock.call_count == 1
+
+
+def test_thumbnail_urls_are_the_image_url_until_the_thumbnails_are_generated():
+    attachment = f.UserStoryAttachmentFactory.create(
+        attached_file=SimpleUploadedFile("image.bmp", DUMMY_BMP_DATA))
+    image_url = get_absolute_url(attachment.attached_file.url)
+
+    assert services.get_card_image_thumbnail_url(attachment) == image_url
+    assert services.get_timeline_image_thumbnail_url(attachment) == image_url
+    assert services.get_attachment_image_preview_url(attachment) == image_url
+
+    services.generate_attachment_thumbnails(attachment.id)
+
+    assert services.get_card_image_thumbnail_url(attachment) not in (None, image_url)
+    assert services.get_timeline_image_thumbnail_url(attachment) not in (None, image_url)
+    assert services.get_attachment_image_preview_url(attachment) not in (None, image_url)
+    assert get_thumbnail_generation_stats()["card-image"]["generated"] >= 1
+
+
+def test_thumbnail_urls_of_files_that_are_not_images_are_none():
+    attachment = f.UserStoryAttachmentFactory.create(attached_file=SimpleUploadedFile("file.txt", b"test"))
+
+    assert services.get_card_image_thumbnail_url(attachment) is None
+
+    services.generate_attachment_thumbnails(attachment.id)
+
+    assert services.get_card_image_thumbnail_url(attachment) is None
+
+
+def test_history_thumbnail_urls_are_updated_when_the_thumbnails_are_generated():
+    attachment = f.UserStoryAttachmentFactory.create(
+        attached_file=SimpleUploadedFile("image.bmp", DUMMY_BMP_DATA))
+    user_story = attachment.content_object
+    key = make_key_from_model_object(user_story)
+    take_snapshot(user_story, user=user_story.owner)
+
+    entry = HistoryEntry.objects.get(key=key)
+    assert entry.snapshot["attachments"][0]["thumb_url"] == get_absolute_url(attachment.attached_file.url)
+
+    services.generate_attachment_thumbnails(attachment.id)
+
+    entry = HistoryEntry.objects.get(key=key)
+    thumb_url = services.get_timeline_image_thumbnail_url(attachment)
+    assert entry.snapshot["attachments"][0]["thumb_url"] == thumb_url
+    assert get_last_snapshot_for_key(key)[0].snapshot["attachments"][0]["thumb_url"] == thumb_url
@@ -22,12 +22,15 @@ import pytest
 from unittest.mock import patch
 
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from .. import factories as f
 
 from taiga.base.utils import json
 from taiga.projects.history import services
+from taiga.projects.history import freeze_impl
 from taiga.projects.history.models import HistoryEntry
 from taiga.projects.history.choices import HistoryType
 from taiga.projects.history.services import make_key_from_model_object
@@ -49,6 +52,113 @@ def test_take_snapshot_crete():
     assert qs_created.count() == 1
 
 
+def test_take_snapshots_in_bulk():
+    project = f.ProjectFactory.create()
+    issue1 = f.IssueFactory.create(project=project)
+    issue2 = f.IssueFactory.create(project=project)
+    services.take_snapshot(issue1, user=issue1.owner)
+
+    issue1.subject = "changed subject"
+    issue1.save()
+
+    entries = services.take_snapshots_in_bulk([issue1, issue2], user=issue1.owner)
+
+    assert len(entries) == 2
+    assert HistoryEntry.objects.filter(type=HistoryType.create).count() == 2
+    changed = HistoryEntry.objects.get(type=HistoryType.change)
+    assert changed.key == make_key_from_model_object(issue1)
+    assert changed.diff["subject"][1] == "changed subject"
+
+    # Without changes nothing is recorded
+    assert services.take_snapshots_in_bulk([issue1, issue2], user=issue1.owner) == []
+    assert HistoryEntry.objects.count() == 3
+
+
+def test_history_values_are_memoized_inside_values_memo():
+    status1 = f.IssueStatusFactory.create()
+    status2 = f.IssueStatusFactory.create()
+    diff = {"status": [status1.id, status2.id]}
+
+    with freeze_impl.values_memo():
+        values = freeze_impl.issue_values(diff)
+        with CaptureQueriesContext(connection) as captured:
+            assert freeze_impl.issue_values(diff) == values
+
+    assert values["status"] == {str(status1.id): status1.name, str(status2.id): status2.name}
+    assert len(captured.captured_queries) == 0
+
+    with CaptureQueriesContext(connection) as captured:
+        freeze_impl.issue_values(diff)
+    assert len(captured.captured_queries) == 1
+
+
+def test_history_values_memo_does_not_keep_missing_ids(settings):
+    status1 = f.IssueStatusFactory.create()
+    missing_id = status1.id + 1000
+
+    with freeze_impl.values_memo():
+        assert freeze_impl.issue_values({"status": [status1.id, missing_id]})["status"] == {
+            str(status1.id): status1.name
+        }
+
+        # The objects created later in the same task are resolved
+        status2 = f.IssueStatusFactory.create(id=missing_id, project=status1.project)
+        assert freeze_impl.issue_values({"status": [status1.id, missing_id]})["status"] == {
+            str(status1.id): status1.name,
+            str(status2.id): status2.name,
+        }
+
+
+def test_history_values_memo_is_reset_when_it_grows(settings):
+    settings.HISTORY_VALUES_MEMO_SIZE = 2
+    statuses = [f.IssueStatusFactory.create() for i in range(3)]
+
+    with freeze_impl.values_memo():
+        freeze_impl.issue_values({"status": [statuses[0].id, statuses[1].id]})
+        freeze_impl.issue_values({"status": [statuses[2].id]})
+
+        # The memo was reset before storing the last one
+        with CaptureQueriesContext(connection) as captured:
+            values = freeze_impl.issue_values({"status": [statuses[0].id, statuses[2].id]})
+        assert len(captured.captured_queries) == 1
+        assert values["status"] == {str(statuses[0].id): statuses[0].name,
+                                    str(statuses[2].id): statuses[2].name}
+
+
+def test_take_snapshots_in_bulk_takes_all_the_locks_at_once():
+    project = f.ProjectFactory.create()
+    issues = [f.IssueFactory.create(project=project) for i in range(3)]
+
+    with CaptureQueriesContext(connection) as captured:
+        services.take_snapshots_in_bulk(issues, user=issues[0].owner)
+
+    lock_queries = [q["sql"] for q in captured.captured_queries if "advisory" in q["sql"]]
+    assert len(lock_queries) == 1
+    assert "pg_advisory_xact_lock" in lock_queries[0]
+
+
+def test_bulk_create_takes_the_snapshots_in_bulk(client):
+    project = f.create_project()
+    f.MembershipFactory.create(project=project, user=project.owner, is_admin=True)
+    url = reverse("userstories-bulk-create")
+    data = {
+        "bulk_stories": "Story #1\nStory #2\nStory #3",
+        "project_id": project.id,
+    }
+
+    client.login(project.owner)
+    with patch("taiga.projects.history.mixins.take_snapshot") as mocked_take_snapshot, \
+            CaptureQueriesContext(connection) as captured:
+        response = client.json.post(url, json.dumps(data))
+
+    assert response.status_code == 200, response.data
+    assert mocked_take_snapshot.call_count == 0
+    history_inserts = [q for q in captured.captured_queries
+                       if q["sql"].startswith('INSERT INTO "history_historyentry"')]
+    assert len(history_inserts) == 1
+    assert HistoryEntry.objects.filter(type=HistoryType.create).count() == 3
+
+
 def test_take_two_snapshots_with_changes():
     issue = f.IssueFactory.create()
 
@@ -144,6 +254,41 @@ def test_real_snapshot_frequency(settings):
     assert qs_partials.count() == 2
 
 
+
+def test_last_snapshot_is_cached_when_taking_snapshots():
+    issue = f.IssueFactory.create()
+    key = make_key_from_model_object(issue)
+
+    services.take_snapshot(issue, user=issue.owner)
+    for i in range(3):
+        issue.description = "desc{}".format(i)
+        issue.save()
+        services.take_snapshot(issue, user=issue.owner)
+
+    cached_fobj, need_real_snapshot = services.get_last_snapshot_for_key(key)
+    assert need_real_snapshot is False
+
+    services.invalidate_last_snapshot_for_key(key)
+    rebuilt_fobj, need_real_snapshot = services.get_last_snapshot_for_key(key)
+    assert need_real_snapshot is False
+    assert cached_fobj == rebuilt_fobj
+    assert rebuilt_fobj.snapshot["description"] == "desc2"
+
+
+def test_cached_last_snapshot_is_discarded_with_new_entries():
+    issue = f.IssueFactory.create()
+    key = make_key_from_model_object(issue)
+
+    services.take_snapshot(issue, user=issue.owner)
+    services.get_last_snapshot_for_key(key)
+
+    # An entry not created by take_snapshot
+    f.HistoryEntryFactory.create(project=issue.project, key=key, type=HistoryType.change,
+                                 is_snapshot=False, is_hidden=True, diff={"description": ["", "external"]})
+
+    fobj, _ = services.get_last_snapshot_for_key(key)
+    assert fobj.snapshot["description"] == "external"
+
 def test_issue_resource_history_test(client):
     user = f.UserFactory.create()
     project = f.ProjectFactory.create(owner=user)
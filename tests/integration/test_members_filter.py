@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+
+from .. import factories as f
+
+from taiga.base.filters import MembersFilterBackend, get_member_projects_subquery
+
+pytestmark = pytest.mark.django_db
+
+
+def _filter_members(user, **params):
+    request = mock.Mock(user=user, QUERY_PARAMS=params)
+    queryset = get_user_model().objects.all()
+    return set(MembersFilterBackend().filter_queryset(request, queryset, None))
+
+
+def test_get_member_projects_subquery():
+    user = f.UserFactory.create()
+    project1 = f.ProjectFactory.create()
+    project2 = f.ProjectFactory.create()
+    project3 = f.ProjectFactory.create()
+    f.MembershipFactory.create(user=user, project=project1,
+                               role=f.RoleFactory.create(project=project1, permissions=["view_project"]))
+    f.MembershipFactory.create(user=user, project=project2, is_admin=True,
+                               role=f.RoleFactory.create(project=project2, permissions=[]))
+    f.MembershipFactory.create(user=user, project=project3,
+                               role=f.RoleFactory.create(project=project3, permissions=["view_us"]))
+
+    project_ids = set(get_member_projects_subquery(user, "view_project").values_list("project_id", flat=True))
+    assert project_ids == {project1.id, project2.id}
+
+    project_ids = get_member_projects_subquery(user, "view_project", project_id=project2.id)
+    assert set(project_ids.values_list("project_id", flat=True)) == {project2.id}
+
+
+def test_members_filter_by_role_permission_and_admin():
+    project = f.ProjectFactory.create(is_private=True, anon_permissions=[], public_permissions=[])
+    viewer_role = f.RoleFactory.create(project=project, permissions=["view_project"])
+    blind_role = f.RoleFactory.create(project=project, permissions=[])
+
+    member = f.UserFactory.create()
+    f.MembershipFactory.create(user=member, project=project, role=viewer_role)
+    admin = f.UserFactory.create()
+    f.MembershipFactory.create(user=admin, project=project, role=blind_role, is_admin=True)
+    blind = f.UserFactory.create()
+    f.MembershipFactory.create(user=blind, project=project, role=blind_role)
+
+    # The role with the permission
+    users = _filter_members(member)
+    assert {member, admin, blind} <= users
+    assert {member, admin, blind} <= _filter_members(member, project=str(project.id))
+
+    # The admins don't need the permission in their role
+    assert {member, admin, blind} <= _filter_members(admin)
+    assert {member, admin, blind} <= _filter_members(admin, project=str(project.id))
+
+    # Without the permission only the user itself is visible
+    assert _filter_members(blind) == {blind}
+    assert _filter_members(blind, project=str(project.id)) == set()
+
+    # Non members and anonymous users
+    other = f.UserFactory.create()
+    assert _filter_members(other) == {other}
+    assert _filter_members(AnonymousUser()) == set()
+
+
+def test_members_filter_public_projects():
+    project = f.ProjectFactory.create(is_private=False, anon_permissions=["view_project"],
+                                      public_permissions=["view_project"])
+    member = f.UserFactory.create()
+    f.MembershipFactory.create(user=member, project=project,
+                               role=f.RoleFactory.create(project=project, permissions=[]))
+
+    other = f.UserFactory.create()
+    assert member in _filter_members(other)
+    assert member in _filter_members(other, project=str(project.id))
+    assert member in _filter_members(AnonymousUser(), project=str(project.id))
@@ -328,3 +328,50 @@ class TestIssues:
         assert issue1_neighbors.right == issue2
         assert issue2_neighbors.left == issue1
         assert issue2_neighbors.right is None
+
+    def test_ordering_by_subject(self):
+        project = f.ProjectFactory.create()
+        issue1 = f.IssueFactory.create(project=project, subject="b")
+        issue2 = f.IssueFactory.create(project=project, subject="a")
+        issue3 = f.IssueFactory.create(project=project, subject="a")
+
+        issues = Issue.objects.filter(project=project).order_by("subject", "-id")
+        assert n._get_keyset_ordering(issues) == [("subject", False, False), ("id", True, False)]
+
+        issue1_neighbors = n.get_neighbors(issue1, results_set=issues)
+        issue2_neighbors = n.get_neighbors(issue2, results_set=issues)
+        issue3_neighbors = n.get_neighbors(issue3, results_set=issues)
+
+        assert issue3_neighbors.left is None
+        assert issue3_neighbors.right == issue2
+        assert issue2_neighbors.left == issue3
+        assert issue2_neighbors.right == issue1
+        assert issue1_neighbors.left == issue2
+        assert issue1_neighbors.right is None
+
+    def test_ordering_by_nullable_field(self):
+        project = f.ProjectFactory.create()
+        issue1 = f.IssueFactory.create(project=project, ref=None)
+        issue2 = f.IssueFactory.create(project=project, ref=2)
+        issue3 = f.IssueFactory.create(project=project, ref=1)
+
+        issues = Issue.objects.filter(project=project).order_by("ref")
+        assert n._get_keyset_ordering(issues) == [("ref", False, True), ("id", False, False)]
+
+        # NULL values go last in ascending order
+        assert n.get_neighbors(issue3, results_set=issues) == (None, issue2)
+        assert n.get_neighbors(issue2, results_set=issues) == (issue3, issue1)
+        assert n.get_neighbors(issue1, results_set=issues) == (issue2, None)
+
+        # and first in descending order
+        issues = Issue.objects.filter(project=project).order_by("-ref")
+        assert n.get_neighbors(issue1, results_set=issues) == (None, issue2)
+        assert n.get_neighbors(issue2, results_set=issues) == (issue1, issue3)
+        assert n.get_neighbors(issue3, results_set=issues) == (issue2, None)
+
+    def test_ordering_by_related_field_uses_the_window_query(self):
+        issues = Issue.objects.order_by("severity", "-id")
+        assert n._get_keyset_ordering(issues) is None
+
+        issues = Issue.objects.order_by("-assigned_to__full_name", "-id")
+        assert n._get_keyset_ordering(issues) is None
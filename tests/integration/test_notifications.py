@@ -35,6 +35,7 @@ from django.utils import timezone
 from django.apps import apps
 from .. import factories as f
 
+from taiga.base.mails import InlineCSSTemplateMail
 from taiga.base.utils import json
 from taiga.projects.notifications import services
 from taiga.projects.notifications import utils
@@ -347,6 +348,169 @@ def test_watching_users_to_notify_on_issue_modification_6():
     assert users == {issue.owner}
 
 
+def test_users_to_notify_creates_the_missing_notify_policies():
+    project = f.ProjectFactory.create(anon_permissions=["view_issues"])
+    issue = f.IssueFactory.create(project=project)
+    watching_user = f.UserFactory()
+    issue.add_watcher(watching_user)
+    models.NotifyPolicy.objects.filter(project=project).delete()
+
+    users = services.get_users_to_notify(issue)
+
+    assert users == {watching_user, issue.owner}
+    policies = models.NotifyPolicy.objects.filter(project=project, user__in=[watching_user, issue.owner])
+    assert policies.count() == 2
+    assert {p.notify_level for p in policies} == {NotifyLevel.involved}
+
+
+def test_send_notifications_renders_the_emails_once_per_language(settings, mail):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+    settings.CHANGE_NOTIFICATIONS_SEND_BATCH_SIZE = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=['view_issues'])
+    member1 = f.MembershipFactory.create(project=project, role=role, user__full_name="Member <1>")
+    member2 = f.MembershipFactory.create(project=project, role=role, user__full_name="Member 2")
+    issue = f.IssueFactory.create(project=project, owner=member2.user)
+    history_create = f.HistoryEntryFactory.create(
+        project=project,
+        user={"pk": project.owner.id},
+        comment="",
+        type=HistoryType.create,
+        key="issues.issue:{}".format(issue.id),
+        is_hidden=False,
+        diff=[]
+    )
+
+    for member in (member1, member2):
+        policy = member.user.notify_policies.get(project=project)
+        policy.notify_level = NotifyLevel.all
+        policy.save()
+
+    take_snapshot(issue, user=issue.owner)
+    services.send_notifications(issue, history=history_create)
+    time.sleep(1)
+
+    make_email_object = InlineCSSTemplateMail.make_email_object
+    with patch.object(InlineCSSTemplateMail, "make_email_object", autospec=True,
+                      side_effect=make_email_object) as mocked_make_email_object:
+        services.process_sync_notifications()
+
+    assert mocked_make_email_object.call_count == 1
+    assert len(mail.outbox) == 2
+    for msg in mail.outbox:
+        user = member1.user if msg.to == [member1.user.email] else member2.user
+        html = msg.alternatives[0][0]
+        assert services._RecipientPlaceholder.token not in msg.body + html
+        assert user.get_full_name() in msg.body
+    assert "Member &lt;1&gt;" in "".join(m.alternatives[0][0] for m in mail.outbox)
+    assert services.get_notifications_stats()["batches"] >= 2
+
+
+def test_send_notifications_are_restored_when_the_emails_fail(settings, mail):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+    settings.CHANGE_NOTIFICATIONS_SEND_BATCH_SIZE = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=['view_issues'])
+    member1 = f.MembershipFactory.create(project=project, role=role)
+    member2 = f.MembershipFactory.create(project=project, role=role)
+    issue = f.IssueFactory.create(project=project, owner=member2.user)
+    history_create = f.HistoryEntryFactory.create(
+        project=project,
+        user={"pk": project.owner.id},
+        comment="",
+        type=HistoryType.create,
+        key="issues.issue:{}".format(issue.id),
+        is_hidden=False,
+        diff=[]
+    )
+
+    for member in (member1, member2):
+        policy = member.user.notify_policies.get(project=project)
+        policy.notify_level = NotifyLevel.all
+        policy.save()
+
+    take_snapshot(issue, user=issue.owner)
+    services.send_notifications(issue, history=history_create)
+    time.sleep(1)
+
+    # Only the email of member1 fails
+    send_emails_batch = services._send_emails_batch
+
+    def _send_emails_batch(emails):
+        if emails[0].to == [member1.user.email]:
+            raise ConnectionError("SMTP server unavailable")
+        return send_emails_batch(emails)
+
+    with patch("taiga.projects.notifications.services._send_emails_batch", side_effect=_send_emails_batch):
+        services.process_sync_notifications()
+
+    assert [msg.to for msg in mail.outbox] == [[member2.user.email]]
+    notification = models.HistoryChangeNotification.objects.get()
+    assert list(notification.notify_users.all()) == [member1.user]
+    assert list(notification.history_entries.all()) == [history_create]
+
+    time.sleep(1)
+    services.process_sync_notifications()
+
+    assert [msg.to for msg in mail.outbox] == [[member2.user.email], [member1.user.email]]
+    assert models.HistoryChangeNotification.objects.count() == 0
+
+
+def test_send_notifications_are_restored_when_the_render_fails(settings, mail):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=['view_issues'])
+    member1 = f.MembershipFactory.create(project=project, role=role)
+    member2 = f.MembershipFactory.create(project=project, role=role)
+    issue1 = f.IssueFactory.create(project=project, owner=member2.user)
+    issue2 = f.IssueFactory.create(project=project, owner=member2.user)
+
+    for member in (member1, member2):
+        policy = member.user.notify_policies.get(project=project)
+        policy.notify_level = NotifyLevel.all
+        policy.save()
+
+    for issue in (issue1, issue2):
+        history_create = f.HistoryEntryFactory.create(
+            project=project,
+            user={"pk": project.owner.id},
+            comment="",
+            type=HistoryType.create,
+            key="issues.issue:{}".format(issue.id),
+            is_hidden=False,
+            diff=[]
+        )
+        take_snapshot(issue, user=issue.owner)
+        services.send_notifications(issue, history=history_create)
+    time.sleep(1)
+
+    # Only the render of the issue1 notification fails
+    render_notification_emails = services._render_notification_emails
+
+    def _render_notification_emails(notification, history_entries, notify_users):
+        if notification.key == "issues.issue:{}".format(issue1.id):
+            raise ValueError("Broken template")
+        return render_notification_emails(notification, history_entries, notify_users)
+
+    with patch("taiga.projects.notifications.services._render_notification_emails",
+               side_effect=_render_notification_emails):
+        services.process_sync_notifications()
+
+    assert len(mail.outbox) == 2
+    notification = models.HistoryChangeNotification.objects.get()
+    assert notification.key == "issues.issue:{}".format(issue1.id)
+    assert set(notification.notify_users.all()) == {member1.user, member2.user}
+
+    time.sleep(1)
+    services.process_sync_notifications()
+
+    assert len(mail.outbox) == 4
+    assert models.HistoryChangeNotification.objects.count() == 0
+
+
 def test_send_notifications_using_services_method_for_user_stories(settings, mail):
     settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
 
@@ -132,3 +132,97 @@ def test_authenticated_user_has_perm_on_project_related_object():
 def test_authenticated_user_has_perm_on_invalid_object():
     user1 = factories.UserFactory()
     assert services.user_has_perm(user1, "test", user1) is False
+
+
+def _new_request_user(user):
+    # A new request loads a new user instance without cached memberships
+    from django.contrib.auth import get_user_model
+    return get_user_model().objects.get(id=user.id)
+
+
+def test_user_project_permissions_are_shared_between_requests(settings, shared_cache):
+    settings.PERMISSIONS_CACHE_ENABLED = True
+    settings.PERMISSIONS_CACHE = shared_cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    user1 = factories.UserFactory()
+    project = factories.ProjectFactory(anon_permissions=[], public_permissions=[])
+    role = factories.RoleFactory(project=project, permissions=["view_us"])
+    membership = factories.MembershipFactory(user=user1, project=project, role=role)
+
+    assert services.get_user_project_permissions(user1, project) == set(["view_us"])
+
+    user1 = _new_request_user(user1)
+    with CaptureQueriesContext(connection) as captured:
+        assert services.get_user_project_permissions(user1, project) == set(["view_us"])
+    assert len(captured) == 0
+
+    role.permissions = ["view_us", "view_tasks"]
+    role.save()
+    user1 = _new_request_user(user1)
+    assert services.get_user_project_permissions(user1, project) == set(["view_us", "view_tasks"])
+
+    membership.delete()
+    user1 = _new_request_user(user1)
+    assert services.get_user_project_permissions(user1, project) == set()
+
+
+def test_user_project_permissions_cache_is_invalidated_by_membership_changes(settings, shared_cache):
+    settings.PERMISSIONS_CACHE_ENABLED = True
+    settings.PERMISSIONS_CACHE = shared_cache
+
+    user1 = factories.UserFactory()
+    project = factories.ProjectFactory(anon_permissions=[], public_permissions=[])
+    role1 = factories.RoleFactory(project=project, permissions=["view_us"])
+    role2 = factories.RoleFactory(project=project, permissions=["view_tasks"])
+
+    assert services.get_user_project_permissions(user1, project) == set()
+
+    # New member
+    membership = factories.MembershipFactory(user=user1, project=project, role=role1)
+    user1 = _new_request_user(user1)
+    assert services.get_user_project_permissions(user1, project) == set(["view_us"])
+
+    # Role changed
+    membership.role = role2
+    membership.save()
+    user1 = _new_request_user(user1)
+    assert services.get_user_project_permissions(user1, project) == set(["view_tasks"])
+
+    # Admin flag changed
+    membership.is_admin = True
+    membership.save()
+    user1 = _new_request_user(user1)
+    assert services.is_project_admin(user1, project)
+
+    membership.is_admin = False
+    membership.save()
+    user1 = _new_request_user(user1)
+    assert not services.is_project_admin(user1, project)
+
+    # Role permissions removed
+    role2.permissions = []
+    role2.save()
+    user1 = _new_request_user(user1)
+    assert services.get_user_project_permissions(user1, project) == set()
+
+
+def test_user_project_permissions_are_not_shared_with_a_local_cache(settings):
+    settings.PERMISSIONS_CACHE_ENABLED = True
+    settings.PERMISSIONS_CACHE = "default"
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    user1 = factories.UserFactory()
+    project = factories.ProjectFactory(anon_permissions=[], public_permissions=[])
+    role = factories.RoleFactory(project=project, permissions=["view_us"])
+    factories.MembershipFactory(user=user1, project=project, role=role)
+
+    assert services.get_user_project_permissions(user1, project) == set(["view_us"])
+
+    # The invalidations of a local cache don't reach the other processes
+    user1 = _new_request_user(user1)
+    with CaptureQueriesContext(connection) as captured:
+        assert services.get_user_project_permissions(user1, project) == set(["view_us"])
+    assert len(captured) > 0
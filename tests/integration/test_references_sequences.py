@@ -232,3 +232,42 @@ def test_by_ref_calls_in_api_request(client, refmodels):
     response = client.json.get("{}?project={}&ref={}".format(url, project.slug, wiki_page.slug))
     assert response.status_code == 200
     assert response.data["wikipage"] == wiki_page.id
+
+
+@pytest.mark.django_db
+def test_reference_is_created_with_the_ref_of_the_new_object(seq, refmodels):
+    project = factories.ProjectFactory.create()
+    seq.alter(refmodels.make_sequence_name(project), 10)
+
+    issue = factories.IssueFactory.create(project=project)
+
+    assert issue.ref == 11
+    assert refmodels.Reference.objects.get(project=project, ref=11).object_id == issue.id
+
+
+@pytest.mark.django_db
+def test_reserve_references_in_bulk(seq, refmodels):
+    from taiga.projects.userstories import services
+
+    project = factories.ProjectFactory.create()
+    seq.alter(refmodels.make_sequence_name(project), 10)
+
+    user_stories = services.create_userstories_in_bulk("US 1\nUS 2\nUS 3", project=project)
+
+    assert [us.ref for us in user_stories] == [11, 12, 13]
+    references = refmodels.Reference.objects.filter(project=project).order_by("ref")
+    assert [(r.ref, r.object_id) for r in references] == [(us.ref, us.id) for us in user_stories]
+
+    # The explicit refs are kept and the sequence continues after them
+    issue = factories.IssueFactory.build(project=project, owner=project.owner, ref=50, milestone=None,
+                                         status=factories.IssueStatusFactory.create(project=project),
+                                         severity=factories.SeverityFactory.create(project=project),
+                                         priority=factories.PriorityFactory.create(project=project),
+                                         type=factories.IssueTypeFactory.create(project=project))
+    assert refmodels.reserve_references_in_bulk([issue], project) == []
+    issue.save()
+    refmodels.make_references_in_bulk([issue], project)
+
+    assert issue.ref == 50
+    assert refmodels.Reference.objects.get(project=project, ref=50).object_id == issue.id
+    assert refmodels.make_unique_reference_id(project) == 51
@@ -169,3 +169,37 @@ def test_search_text_query_with_an_invalid_project_id(client, searches_initial_d
 
     response = client.get(reverse("search-list"), {"project": "new", "text": "future"})
     assert response.status_code == 404
+
+
+def test_search_text_query_uses_updated_search_vector(client, searches_initial_data):
+    data = searches_initial_data
+
+    client.login(data.member1.user)
+
+    data.us14.subject = "Flux capacitor"
+    data.us14.save()
+
+    response = client.get(reverse("search-list"), {"project": data.project1.id, "text": "capacitor"})
+    assert response.status_code == 200
+    assert response.data["count"] == 1
+    assert response.data["userstories"][0]["id"] == data.us14.id
+
+
+def test_rebuild_search_index_command(client, searches_initial_data):
+    from django.core.management import call_command
+    from django.db import connection
+
+    data = searches_initial_data
+
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE tasks_task SET search_vector = NULL")
+
+    client.login(data.member1.user)
+
+    response = client.get(reverse("search-list"), {"project": data.project1.id, "text": "future"})
+    assert len(response.data["tasks"]) == 0
+
+    call_command("rebuild_search_index", "--missing", "--table", "tasks_task")
+
+    response = client.get(reverse("search-list"), {"project": data.project1.id, "text": "future"})
+    assert len(response.data["tasks"]) == 3
@@ -19,6 +19,8 @@
 
 import pytest
 
+from unittest.mock import patch
+
 from .. import factories
 
 from taiga.projects.history import services as history_services
@@ -43,6 +45,30 @@ def test_add_to_object_timeline():
     assert Timeline.objects.order_by("-id")[0].data == id(task)
 
 
+def test_push_to_timelines_writes_all_entries_at_once():
+    project = factories.ProjectFactory()
+    user_story = factories.UserStoryFactory(project=project, owner=project.owner)
+    watcher = factories.UserFactory()
+    user_story.add_watcher(watcher)
+    Timeline.objects.all().delete()
+
+    related_people = list(user_story.get_related_people())
+    extra_data = {"values_diff": {}, "user": service.extract_user_info(project.owner)}
+
+    with patch("taiga.timeline.models.Timeline.objects.bulk_create",
+               wraps=Timeline.objects.bulk_create) as bulk_create_mock:
+        written = service.push_to_timelines(project.id, project.owner.id, "userstories", "userstory",
+                                            user_story.id, "create", user_story.created_date,
+                                            extra_data=extra_data)
+
+    assert bulk_create_mock.call_count == 1
+    assert written == 1 + len(related_people)
+    assert Timeline.objects.count() == written
+    assert Timeline.objects.filter(namespace=service.build_project_namespace(project)).count() == 1
+    assert Timeline.objects.filter(object_id=watcher.id,
+                                   namespace=service.build_user_namespace(project.owner)).count() == 1
+
+
 def test_get_timeline():
     Timeline.objects.all().delete()
 
@@ -20,6 +20,7 @@
 import pytest
 
 import datetime
+from unittest import mock
 
 from .. import factories as f
 
@@ -160,3 +161,32 @@ def test_project_totals_updated_on_like(client):
     assert project.total_fans_last_month == 2
     assert project.total_fans_last_year == 3
     assert project.totals_updated_datetime > totals_updated_datetime
+
+
+def test_project_totals_refresh_is_coalesced(settings):
+    from taiga.projects.services import schedule_project_totals_refresh
+
+    settings.PROJECT_TOTALS_REFRESH_INTERVAL = 60
+    project = f.create_project()
+    project.refresh_totals()
+    totals_updated_datetime = Project.objects.get(id=project.id).totals_updated_datetime
+
+    f.LikeFactory.create(content_object=project)
+    with mock.patch("taiga.projects.services.totals._schedule_local_refresh") as schedule_mock:
+        schedule_project_totals_refresh(project)
+
+    # A trailing refresh is scheduled for the end of the interval
+    assert schedule_mock.call_count == 1
+    assert schedule_mock.call_args[0][0] == project.id
+    assert 0 < schedule_mock.call_args[0][1] <= 60
+
+    project = Project.objects.get(id=project.id)
+    assert project.total_fans == 0
+    assert project.totals_updated_datetime == totals_updated_datetime
+
+    project.totals_updated_datetime = timezone.now() - datetime.timedelta(seconds=61)
+    schedule_project_totals_refresh(project)
+
+    project = Project.objects.get(id=project.id)
+    assert project.total_fans == 1
+    assert project.totals_updated_datetime > totals_updated_datetime
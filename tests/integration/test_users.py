@@ -25,10 +25,14 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.urlresolvers import reverse
 from django.core.files import File
 from django.core.cache import cache as default_cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from .. import factories as f
 from ..utils import DUMMY_BMP_DATA
 
+from taiga.base import exceptions as exc
 from taiga.base.utils import json
 from taiga.base.utils.thumbnails import get_thumbnail_url
 from taiga.base.utils.dicts import into_namedtuple
@@ -37,7 +41,8 @@ from taiga.users.serializers import LikedObjectSerializer, VotedObjectSerializer
 from taiga.auth.tokens import get_token_for_user
 from taiga.permissions.choices import MEMBERS_PERMISSIONS, ANON_PERMISSIONS
 from taiga.projects import choices as project_choices
-from taiga.users.services import get_watched_list, get_voted_list, get_liked_list
+from taiga.users.services import get_watched_list, get_voted_list, get_liked_list, get_entity_keyset
+from taiga.users.services import register_last_login, flush_last_logins
 from taiga.projects.notifications.choices import NotifyLevel
 from taiga.projects.notifications.models import NotifyPolicy
 
@@ -526,6 +531,51 @@ def test_mail_permissions(client):
     assert "email" in response.data
 
 
+##############################
+## Last login
+##############################
+
+def test_last_login_is_buffered(settings, shared_cache):
+    settings.LAST_LOGIN_CACHE = shared_cache
+    settings.LAST_LOGIN_FLUSH_INTERVAL = 60
+    user1 = f.UserFactory.create(last_login=None)
+    user2 = f.UserFactory.create(last_login=None)
+    user3 = f.UserFactory.create(last_login=None)
+
+    # The first one triggers the flush
+    register_last_login(user1)
+    user1.refresh_from_db()
+    assert user1.last_login is not None
+
+    register_last_login(user2)
+    register_last_login(user3)
+    # Throttled for a minute
+    register_last_login(user3)
+    user2.refresh_from_db()
+    assert user2.last_login is None
+
+    # The periodic command saves them without other requests
+    call_command("flush_last_logins")
+    user2.refresh_from_db()
+    user3.refresh_from_db()
+    assert user2.last_login is not None
+    assert user3.last_login is not None
+
+    # Nothing left in the buffer
+    with CaptureQueriesContext(connection) as captured:
+        flush_last_logins()
+    assert len(captured) == 0
+
+
+def test_last_login_is_not_buffered_in_a_local_cache(settings):
+    settings.LAST_LOGIN_FLUSH_INTERVAL = 60
+    user = f.UserFactory.create(last_login=None)
+
+    register_last_login(user)
+    user.refresh_from_db()
+    assert user.last_login is not None
+
+
 ##############################
 ## Watchers, Likes and Votes
 ##############################
@@ -620,6 +670,38 @@ def test_get_voted_list():
     assert len(get_voted_list(fav_user, viewer_user, q="unexisting text")) == 0
 
 
+def test_get_watched_list_pagination():
+    fav_user = f.UserFactory()
+    viewer_user = f.UserFactory()
+
+    project = f.ProjectFactory(is_private=False, name="Testing project")
+    user_stories = [f.UserStoryFactory(project=project) for i in range(3)]
+    tasks = [f.TaskFactory(project=project) for i in range(3)]
+    for obj in user_stories + tasks:
+        obj.add_watcher(fav_user)
+
+    watched_list = get_watched_list(fav_user, viewer_user)
+    all_entities = [(e["type"], e["id"]) for e in watched_list]
+    assert len(all_entities) == 6
+    assert set(all_entities) == set([("userstory", us.id) for us in user_stories] +
+                                    [("task", task.id) for task in tasks])
+
+    assert [(e["type"], e["id"]) for e in watched_list[0:4]] == all_entities[0:4]
+    assert [(e["type"], e["id"]) for e in watched_list[4:8]] == all_entities[4:6]
+    assert (watched_list[5]["type"], watched_list[5]["id"]) == all_entities[5]
+
+    keyset = get_entity_keyset(watched_list[1])
+    after_list = get_watched_list(fav_user, viewer_user, after=keyset)
+    assert len(after_list) == 4
+    assert [(e["type"], e["id"]) for e in after_list[0:10]] == all_entities[2:6]
+
+    keyset = get_entity_keyset(watched_list[5])
+    assert len(get_watched_list(fav_user, viewer_user, after=keyset)) == 0
+
+    with pytest.raises(exc.WrongArguments):
+        get_watched_list(fav_user, viewer_user, after="invalid")
+
+
 def test_get_watched_list_valid_info_for_project():
     fav_user = f.UserFactory()
     viewer_user = f.UserFactory()
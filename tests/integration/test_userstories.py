@@ -30,6 +30,7 @@ from django.core.urlresolvers import reverse
 from taiga.base.utils import json
 from taiga.permissions.choices import MEMBERS_PERMISSIONS, ANON_PERMISSIONS
 from taiga.projects.occ import OCCResourceMixin
+from taiga.projects.services import rebalance_orders
 from taiga.projects.userstories import services, models
 
 from .. import factories as f
@@ -69,6 +70,33 @@ def test_update_userstories_order_in_bulk():
                                                                 models.UserStory)
 
 
+def test_update_userstories_order_in_bulk_only_updates_the_affected_ones():
+    project = f.ProjectFactory.create()
+    us1 = f.UserStoryFactory.create(project=project, backlog_order=1000)
+    us2 = f.UserStoryFactory.create(project=project, backlog_order=2000)
+    us3 = f.UserStoryFactory.create(project=project, backlog_order=2001)
+    us4 = f.UserStoryFactory.create(project=project, backlog_order=3000)
+    data = [{"us_id": us4.id, "order": 2000}]
+
+    with mock.patch("taiga.projects.userstories.services.db") as db:
+        services.update_userstories_order_in_bulk(data, "backlog_order", project)
+        db.update_attr_in_bulk_for_ids.assert_called_once_with({us4.id: 2000, us2.id: 2001, us3.id: 2002},
+                                                                "backlog_order",
+                                                                models.UserStory)
+
+
+def test_rebalance_userstories_orders():
+    project = f.ProjectFactory.create()
+    us1 = f.UserStoryFactory.create(project=project, backlog_order=5)
+    us2 = f.UserStoryFactory.create(project=project, backlog_order=3)
+    us3 = f.UserStoryFactory.create(project=project, backlog_order=3000)
+
+    updated = rebalance_orders(project.user_stories.all(), "backlog_order", step=1000)
+
+    assert updated == {us2.id: 1000, us1.id: 2000}
+    assert [us.id for us in project.user_stories.order_by("backlog_order")] == [us2.id, us1.id, us3.id]
+
+
 def test_create_userstory_with_watchers(client):
     user = f.UserFactory.create()
     user_watcher = f.UserFactory.create()
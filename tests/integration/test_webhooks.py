@@ -18,12 +18,18 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import pytest
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
 
 from django.core.urlresolvers import reverse
 from unittest.mock import patch
 from unittest.mock import Mock
 
 from taiga.base.utils import json
+from taiga.webhooks import tasks
+from taiga.webhooks.models import WebhookLog
 
 from .. import factories as f
 
@@ -59,3 +65,69 @@ def test_webhook_action_test_transform_to_json(client, data):
         response = client.json.post(url)
         assert response.status_code == 200
         assert json.loads(response.data["response_data"]) == {"content": "ok"}
+
+
+@pytest.fixture
+def webhook_server():
+    received = []
+    failed = set()
+
+    class Server(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.append((self.path, dict(self.headers), body))
+            status = 200
+            if self.path == "/unavailable" and self.path not in failed:
+                failed.add(self.path)
+                status = 503
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.received = received
+    server.url = "http://127.0.0.1:{}".format(server.server_port)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_send_webhooks_to_several_endpoints(settings, webhook_server):
+    settings.WEBHOOKS_RETRY_BACKOFF = 0
+    project = f.ProjectFactory.create()
+    webhooks = [f.WebhookFactory.create(project=project, url=webhook_server.url + path)
+                for path in ("/unavailable", "/hook1", "/hook2")]
+
+    logs = tasks._send_requests([{"id": w.id, "url": w.url, "key": w.key} for w in webhooks],
+                                {"action": "test"})
+
+    assert len(logs) == 3
+    assert {log.status for log in logs} == {200}
+    assert WebhookLog.objects.filter(webhook__in=webhooks).count() == 3
+    # The 503 response has been retried
+    assert len(webhook_server.received) == 4
+    for path, headers, body in webhook_server.received:
+        webhook = next(w for w in webhooks if w.url.endswith(path))
+        assert headers["X-Hub-Signature"] == "sha1={}".format(tasks._generate_signature(body, webhook.key))
+
+
+def test_send_request_keeps_only_the_last_ten_logs(webhook_server):
+    webhook = f.WebhookFactory.create(url=webhook_server.url + "/hook")
+    f.WebhookLogFactory.create_batch(12, webhook=webhook)
+
+    tasks._send_request(webhook.id, webhook.url, webhook.key, {"action": "test"})
+
+    logs = WebhookLog.objects.filter(webhook=webhook)
+    assert logs.count() == 10
+    assert logs.order_by("-id").first().request_data == {"action": "test"}
@@ -24,6 +24,7 @@ from unittest.mock import Mock
 from .. import factories as f
 
 from taiga.projects.history import services
+from taiga.webhooks import tasks
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -125,3 +126,24 @@ def test_send_request_one_webhook_signal(settings):
         with patch("taiga.webhooks.tasks.requests.Session.send", return_value=response) as session_send_mock:
             services.take_snapshot(obj, user=obj.owner, comment="test", delete=True)
             assert session_send_mock.call_count == 1
+
+
+def test_webhooks_payload_is_serialized_once(settings):
+    settings.WEBHOOKS_ENABLED = True
+    project = f.ProjectFactory()
+    f.WebhookFactory.create(project=project, key="key1")
+    f.WebhookFactory.create(project=project, key="key2")
+    obj = f.IssueFactory.create(project=project)
+
+    response = Mock(status_code=200, headers={}, text="ok")
+    response.elapsed.total_seconds.return_value = 100
+
+    with patch("taiga.webhooks.tasks._serialize", wraps=tasks._serialize) as serialize_mock, \
+            patch("taiga.webhooks.tasks.requests.Session.send", return_value=response) as session_send_mock:
+        services.take_snapshot(obj, user=obj.owner, comment="test")
+
+    assert serialize_mock.call_count == 1
+    assert session_send_mock.call_count == 2
+    requests = [call[0][0] for call in session_send_mock.call_args_list]
+    assert requests[0].body == requests[1].body
+    assert requests[0].headers["X-Hub-Signature"] != requests[1].headers["X-Hub-Signature"]
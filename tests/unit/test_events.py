@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+from unittest import mock
+
+from django.db import transaction
+
+from taiga.base.utils import json
+from taiga.events import events as events_module
+from taiga.events.events import TransactionEvents
+
+
+def _sent_messages(backend):
+    return [(call[1]["routing_key"], json.loads(call[1]["message"])["data"])
+            for call in backend.emit_event.call_args_list]
+
+
+def test_transaction_events_merge_changes_of_the_same_kind():
+    backend = mock.Mock(batch=False)
+    events = TransactionEvents(backend)
+    routing_key = "changes.project.1.userstories"
+
+    for pk in [1, 2, 3, 2]:
+        events.add_changes([pk], "userstories.userstory", routing_key, "create", "events", None, as_list=False)
+
+    events.flush()
+
+    assert _sent_messages(backend) == [
+        (routing_key, {"type": "create", "matches": "userstories.userstory", "pk": [1, 2, 3]}),
+    ]
+
+
+def test_transaction_events_keep_the_shape_of_single_changes():
+    backend = mock.Mock(batch=False)
+    events = TransactionEvents(backend)
+    routing_key = "changes.project.1.tasks"
+
+    events.add_changes([1], "tasks.task", routing_key, "change", "events", None, as_list=False)
+    events.add_changes([1], "tasks.task", routing_key, "change", "events", None, as_list=False)
+    events.add_changes([2], "tasks.task", routing_key, "delete", "events", None, as_list=True)
+
+    events.flush()
+
+    assert _sent_messages(backend) == [
+        (routing_key, {"type": "change", "matches": "tasks.task", "pk": 1}),
+        (routing_key, {"type": "delete", "matches": "tasks.task", "pk": [2]}),
+    ]
+
+
+def test_transaction_events_skip_changes_of_created_objects():
+    backend = mock.Mock(batch=True)
+    events = TransactionEvents(backend)
+    routing_key = "changes.project.1.issues"
+
+    events.add_changes([1], "issues.issue", routing_key, "create", "events", None, as_list=False)
+    events.add_changes([1], "issues.issue", routing_key, "change", "events", None, as_list=False)
+    events.add_changes([2], "issues.issue", routing_key, "change", "events", None, as_list=False)
+
+    events.flush()
+
+    assert backend.emit_event.call_count == 0
+    assert backend.emit_events.call_count == 1
+    messages = backend.emit_events.call_args[0][0]
+    assert [(key, json.loads(message)["data"]) for key, message in messages] == [
+        (routing_key, {"type": "create", "matches": "issues.issue", "pk": 1}),
+        (routing_key, {"type": "change", "matches": "issues.issue", "pk": 2}),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_transaction_events_of_rolled_back_savepoints_are_discarded():
+    backend = mock.Mock(batch=False)
+
+    with mock.patch("taiga.events.backends.get_events_backend", return_value=backend):
+        with transaction.atomic():
+            events_module.emit_event_for_ids([1], "tasks.task", 1, type="change")
+
+            try:
+                with transaction.atomic():
+                    events_module.emit_event_for_ids([2], "tasks.task", 1, type="change")
+                    raise ValueError()
+            except ValueError:
+                pass
+
+            with transaction.atomic():
+                events_module.emit_event_for_ids([3], "tasks.task", 1, type="change")
+
+            events_module.emit_event_for_ids([4], "tasks.task", 1, type="change")
+
+            assert backend.emit_event.call_count == 0
+
+    routing_key = "changes.project.1.tasks"
+    assert _sent_messages(backend) == [
+        (routing_key, {"type": "change", "matches": "tasks.task", "pk": [1, 4]}),
+        (routing_key, {"type": "change", "matches": "tasks.task", "pk": [3]}),
+    ]
+
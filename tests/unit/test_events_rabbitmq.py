@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2017 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2017 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2017 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2017 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import mock
+
+from taiga.events.backends import rabbitmq
+
+
+def _connection_factory(connections):
+    def _make_connection(url):
+        connection = mock.MagicMock()
+        connections.append(connection)
+        return connection
+    return _make_connection
+
+
+def test_rabbitmq_backend_reuses_the_connection():
+    connections = []
+    with mock.patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection",
+                    side_effect=_connection_factory(connections)):
+        backend = rabbitmq.EventsPushBackend(url="//guest:guest@test-reuse/")
+        backend.emit_event("message-1", routing_key="changes.project.1.tasks")
+        backend.emit_event("message-2", routing_key="changes.project.1.tasks")
+
+    assert len(connections) == 1
+    channel = connections[0].channel.return_value
+    assert channel.exchange_declare.call_count == 1
+    assert channel.basic_publish.call_count == 2
+    assert backend.publisher.stats.connections == 1
+    assert backend.publisher.stats.messages == 2
+
+
+def test_rabbitmq_backend_reconnects_on_connection_errors():
+    connections = []
+    with mock.patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection",
+                    side_effect=_connection_factory(connections)):
+        backend = rabbitmq.EventsPushBackend(url="//guest:guest@test-reconnect/")
+        backend.emit_event("message-1", routing_key="changes.project.1.tasks")
+
+        connections[0].channel.return_value.basic_publish.side_effect = ConnectionResetError()
+        backend.emit_event("message-2", routing_key="changes.project.1.tasks")
+
+    assert len(connections) == 2
+    assert connections[0].close.call_count == 1
+    assert connections[1].channel.return_value.basic_publish.call_count == 1
+    assert backend.publisher.stats.connections == 2
+    assert backend.publisher.stats.errors == 0
+
+
+def test_rabbitmq_backend_emit_events_in_one_batch():
+    connections = []
+    with mock.patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection",
+                    side_effect=_connection_factory(connections)):
+        backend = rabbitmq.EventsPushBackend(url="//guest:guest@test-batch/", batch=True)
+        backend.emit_events([("changes.project.1.tasks", "message-1"),
+                             ("changes.project.1.issues", "message-2")])
+
+    assert len(connections) == 1
+    assert connections[0].channel.return_value.basic_publish.call_count == 2
+    assert rabbitmq.get_stats()["//guest:guest@test-batch/"]["batches"] == 1
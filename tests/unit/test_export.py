@@ -56,3 +56,48 @@ def test_export_epic_with_user_stories(client):
 
     assert project_data["epics"][0]["related_user_stories"][0]["user_story"] == user_story.ref
     assert len(project_data["epics"][0]["related_user_stories"]) == 1
+
+
+def test_export_sections_are_stitched_in_order(client):
+    project = f.ProjectFactory.create()
+    f.UserStoryFactory.create_batch(3, project=project)
+    f.IssueFactory.create_batch(2, project=project)
+    f.WikiPageFactory.create(project=project)
+    output = io.BytesIO()
+    stats = render_project(project, output)
+    project_data = json.loads(output.getvalue())
+    assert len(project_data["user_stories"]) == 3
+    assert len(project_data["issues"]) == 2
+    assert len(project_data["wiki_pages"]) == 1
+    assert list(project_data.keys())[-1] == "timeline"
+    assert stats["time"] >= 0
+    assert stats["process_max_rss"] > 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_sections_rendered_by_several_threads(settings):
+    project = f.ProjectFactory.create()
+    f.UserStoryFactory.create_batch(3, project=project)
+    f.TaskFactory.create_batch(2, project=project)
+    f.IssueFactory.create_batch(2, project=project)
+    f.EpicFactory.create(project=project)
+    f.WikiPageFactory.create(project=project)
+
+    settings.EXPORT_RENDER_WORKERS = 1
+    output = io.BytesIO()
+    render_project(project, output)
+    sequential_data = json.loads(output.getvalue())
+
+    # Every thread renders its sections with its own database connection
+    settings.EXPORT_RENDER_WORKERS = 4
+    output = io.BytesIO()
+    render_project(project, output)
+    threaded_data = json.loads(output.getvalue())
+
+    assert len(threaded_data["user_stories"]) == 3
+    assert len(threaded_data["tasks"]) == 2
+    assert len(threaded_data["issues"]) == 2
+    assert len(threaded_data["epics"]) == 1
+    assert len(threaded_data["wiki_pages"]) == 1
+    assert list(threaded_data.keys()) == list(sequential_data.keys())
+    assert threaded_data == sequential_data
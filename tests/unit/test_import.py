@@ -21,7 +21,11 @@ import io
 from .. import factories as f
 
 from taiga.base.utils import json
-from taiga.export_import.services import render_project, store_project_from_dict
+from taiga.export_import.services import render_project, store_project_from_dict, store_project_from_file
+from taiga.export_import.services.stream import JSONStreamReader, load_dump
+from taiga.projects.history.models import HistoryEntry
+from taiga.projects.history.services import make_key_from_model_object
+from taiga.projects.userstories.models import RolePoints
 
 pytestmark = pytest.mark.django_db
 
@@ -55,3 +59,209 @@ def test_import_epic_with_user_stories(client):
     assert related_userstory.user_story.ref == user_story.ref
     assert related_userstory.order == 55
     assert related_userstory.epic.ref == epic.ref
+
+
+def test_stream_reader_with_small_chunks():
+    data = {
+        "slug": "project", "total": 1234, "ratio": 1.5e3, "is_private": True, "logo": None,
+        "description": "ñandú \"quoted\" ]}\n",
+        "issues": [{"ref": i, "subject": "issue {}".format(i), "history": [{"diff": [1, [2]]}]}
+                   for i in range(50)],
+        "tags": [], "timeline": [],
+    }
+
+    reader = JSONStreamReader(io.BytesIO(json.dumps(data, indent=2).encode("utf-8")), chunk_size=3)
+    result = {}
+    for key in reader.iter_object():
+        if key == "issues":
+            result[key] = list(reader.iter_array())
+        else:
+            result[key] = reader.read_value()
+    reader.ensure_end()
+
+    assert result == data
+
+
+def test_load_dump_spools_the_big_sections():
+    dump = load_dump(io.BytesIO(json.dumps({
+        "name": "Project",
+        "issues": [{"ref": 1}, {"ref": 2}],
+        "roles": [{"name": "Role"}],
+    }).encode("utf-8")))
+
+    assert dump["name"] == "Project"
+    assert dump["roles"] == [{"name": "Role"}]
+    assert len(dump["issues"]) == 2
+    assert list(dump["issues"]) == [{"ref": 1}, {"ref": 2}]
+    # Spooled sections can be read again
+    assert list(dump["issues"]) == [{"ref": 1}, {"ref": 2}]
+
+
+def test_import_project_from_file(client, settings):
+    settings.IMPORT_BULK_BATCH_SIZE = 2
+
+    project = f.ProjectFactory()
+    project.default_issue_type = f.IssueTypeFactory.create(project=project)
+    project.default_issue_status = f.IssueStatusFactory.create(project=project)
+    project.default_priority = f.PriorityFactory.create(project=project)
+    project.default_severity = f.SeverityFactory.create(project=project)
+    project.save()
+
+    for i in range(3):
+        f.IssueFactory.create(project=project, status=project.default_issue_status,
+                              type=project.default_issue_type, priority=project.default_priority,
+                              severity=project.default_severity, milestone=None)
+    for i in range(3):
+        f.WikiLinkFactory.create(project=project)
+
+    output = io.BytesIO()
+    render_project(project, output)
+    project.delete()
+    output.seek(0)
+
+    new_project = store_project_from_file(output)
+    assert new_project.issues.count() == 3
+    assert new_project.wiki_links.count() == 3
+
+
+def test_import_project_in_bulk_mode(client, settings):
+    settings.IMPORT_BULK_BATCH_SIZE = 2
+
+    project = f.ProjectFactory()
+    role = f.RoleFactory.create(project=project)
+    points = f.PointsFactory.create(project=project, value=5)
+    project.default_points = f.PointsFactory.create(project=project, value=None)
+    project.default_epic_status = f.EpicStatusFactory.create(project=project)
+    project.default_us_status = f.UserStoryStatusFactory.create(project=project)
+    project.default_task_status = f.TaskStatusFactory.create(project=project)
+    project.save()
+
+    watcher = f.UserFactory.create()
+    custom_attribute = f.UserStoryCustomAttributeFactory.create(project=project)
+    user_stories = [f.UserStoryFactory.create(project=project, status=project.default_us_status, milestone=None)
+                    for i in range(3)]
+    user_stories[0].role_points.filter(role=role).update(points=points)
+    user_stories[0].add_watcher(watcher)
+    user_stories[0].custom_attributes_values.attributes_values = {str(custom_attribute.id): "value"}
+    user_stories[0].custom_attributes_values.save()
+    task = f.TaskFactory.create(project=project, status=project.default_task_status,
+                                user_story=user_stories[0], milestone=None)
+    epic = f.EpicFactory.create(project=project, status=project.default_epic_status)
+    f.RelatedUserStory.create(epic=epic, user_story=user_stories[1], order=55)
+
+    output = io.BytesIO()
+    render_project(project, output)
+    project_data = json.loads(output.getvalue())
+    project.delete()
+
+    new_project = store_project_from_dict(project_data, bulk=True)
+
+    assert sorted(new_project.user_stories.values_list("ref", flat=True)) == sorted(us.ref for us in user_stories)
+    new_user_story = new_project.user_stories.get(ref=user_stories[0].ref)
+    assert new_user_story.role_points.get(role__name=role.name).points.name == points.name
+    assert [user.email for user in new_user_story.get_watchers()] == [watcher.email]
+    new_custom_attribute = new_project.userstorycustomattributes.get(name=custom_attribute.name)
+    assert new_user_story.custom_attributes_values.attributes_values == {str(new_custom_attribute.id): "value"}
+    assert HistoryEntry.objects.filter(key=make_key_from_model_object(new_user_story)).count() == 1
+
+    new_task = new_project.tasks.get()
+    assert new_task.ref == task.ref
+    assert new_task.user_story == new_user_story
+
+    new_epic = new_project.epics.get()
+    assert new_epic.ref == epic.ref
+    assert new_epic.relateduserstory_set.get().user_story.ref == user_stories[1].ref
+
+
+def test_import_project_from_file_in_bulk_mode_is_like_the_default_mode(client, settings):
+    settings.IMPORT_BULK_BATCH_SIZE = 2
+
+    project = f.ProjectFactory()
+    project.default_us_status = f.UserStoryStatusFactory.create(project=project)
+    project.default_task_status = f.TaskStatusFactory.create(project=project)
+    project.default_issue_type = f.IssueTypeFactory.create(project=project)
+    project.default_issue_status = f.IssueStatusFactory.create(project=project)
+    project.default_priority = f.PriorityFactory.create(project=project)
+    project.default_severity = f.SeverityFactory.create(project=project)
+    project.save()
+
+    watcher = f.UserFactory.create()
+    user_stories = [f.UserStoryFactory.create(project=project, status=project.default_us_status,
+                                              milestone=None, tags=["a", "b"])
+                    for i in range(3)]
+    user_stories[0].add_watcher(watcher)
+    f.TaskFactory.create(project=project, status=project.default_task_status,
+                         user_story=user_stories[0], milestone=None)
+    for i in range(3):
+        f.IssueFactory.create(project=project, status=project.default_issue_status,
+                              type=project.default_issue_type, priority=project.default_priority,
+                              severity=project.default_severity, milestone=None)
+
+    output = io.BytesIO()
+    render_project(project, output)
+    project.delete()
+
+    def summary(new_project):
+        return {
+            "user_stories": sorted((us.ref, us.subject, us.tags, us.status.name,
+                                    [user.email for user in us.get_watchers()])
+                                   for us in new_project.user_stories.all()),
+            "tasks": sorted((task.ref, task.subject, task.user_story.ref) for task in new_project.tasks.all()),
+            "issues": sorted((issue.ref, issue.subject, issue.type.name) for issue in new_project.issues.all()),
+            "history": HistoryEntry.objects.filter(project=new_project).count(),
+        }
+
+    output.seek(0)
+    default_project = store_project_from_file(output, ignore_fields=["slug"])
+    default_summary = summary(default_project)
+
+    output.seek(0)
+    bulk_project = store_project_from_file(output, ignore_fields=["slug"], bulk=True)
+    bulk_summary = summary(bulk_project)
+
+    assert len(bulk_summary["user_stories"]) == 3
+    assert len(bulk_summary["issues"]) == 3
+    assert bulk_summary == default_summary
+
+
+def test_import_project_role_points_in_bulk_mode_are_like_the_default_mode(client, settings):
+    settings.IMPORT_BULK_BATCH_SIZE = 2
+
+    project = f.ProjectFactory()
+    role = f.RoleFactory.create(project=project, computable=True)
+    f.RoleFactory.create(project=project, computable=False)
+    points = f.PointsFactory.create(project=project, value=5)
+    project.default_points = f.PointsFactory.create(project=project, value=3)
+    project.default_us_status = f.UserStoryStatusFactory.create(project=project)
+    project.save()
+
+    user_stories = [f.UserStoryFactory.create(project=project, status=project.default_us_status, milestone=None)
+                    for i in range(3)]
+    user_stories[0].role_points.filter(role=role).update(points=points)
+    user_stories[1].role_points.all().delete()
+
+    output = io.BytesIO()
+    render_project(project, output)
+    project.delete()
+
+    def summary(new_project):
+        return {
+            "role_points": sorted((role_points.user_story.ref, role_points.role.name,
+                                   role_points.points.name, role_points.points.value)
+                                  for role_points in RolePoints.objects.filter(user_story__project=new_project)),
+            "total_points": sorted((us.ref, us.get_total_points()) for us in new_project.user_stories.all()),
+        }
+
+    output.seek(0)
+    default_project = store_project_from_file(output, ignore_fields=["slug"])
+    default_summary = summary(default_project)
+
+    output.seek(0)
+    bulk_project = store_project_from_file(output, ignore_fields=["slug"], bulk=True)
+    bulk_summary = summary(bulk_project)
+
+    assert [(ref, points_value) for ref, role_name, points_name, points_value in bulk_summary["role_points"]
+            if role_name == role.name] == [(user_stories[0].ref, 5),
+                                            (user_stories[1].ref, None),
+                                            (user_stories[2].ref, None)]
+    assert bulk_summary == default_summary
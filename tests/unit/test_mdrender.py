@@ -17,9 +17,12 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import pytest
+
 from unittest.mock import patch, MagicMock
 
 from taiga.mdrender.extensions import emojify
+from taiga.mdrender import service
 from taiga.mdrender.service import render, cache_by_sha, get_diff_of_htmls, render_and_extract
 
 from datetime import datetime
@@ -30,6 +33,14 @@ dummy_project.id = 1
 dummy_project.slug = "test"
 
 
+@pytest.fixture(autouse=True)
+def clear_render_cache():
+    # The renders of other tests with the same text would be reused
+    service._local_cache.clear()
+    service._local_versions.clear()
+    service._get_shared_cache().clear()
+
+
 def test_proccessor_valid_emoji():
     result = emojify.EmojifyPreprocessor().run(["**:smile:**"])
     assert result == ["**![smile](http://localhost:8000/static/img/emojis/smile.png)**"]
@@ -230,6 +241,80 @@ def test_cache_by_sha():
     assert result1 == result3
 
 
+def test_cache_by_sha_local_and_shared_tiers():
+    @cache_by_sha
+    def test_cache(project, text):
+        return datetime.now(pytz.utc)
+
+    service._stats.reset()
+    result1 = test_cache(dummy_project, "test two tiers")
+    result2 = test_cache(dummy_project, "test two tiers")
+    service._local_cache.clear()
+    result3 = test_cache(dummy_project, "test two tiers")
+
+    assert result1 == result2 == result3
+    stats = service.get_render_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["local_hits"] == 1
+    assert stats["shared_hits"] == 1
+
+
+def test_cache_by_sha_invalidate_project():
+    @cache_by_sha
+    def test_cache(project, text):
+        return datetime.now(pytz.utc)
+
+    result1 = test_cache(dummy_project, "test invalidation")
+    service.invalidate_project_render_cache(dummy_project.id)
+    result2 = test_cache(dummy_project, "test invalidation")
+    assert result1 != result2
+
+
+def test_render_and_extract_mentions_are_cached():
+    with patch("taiga.mdrender.extensions.mentions.get_user_model") as get_user_model_mock, \
+            patch("taiga.mdrender.service.get_user_model") as service_get_user_model_mock:
+        dummy_user = MagicMock()
+        dummy_user.id = 7
+        dummy_user.get_full_name.return_value = "Ginny Weasley"
+        get_user_model_mock.return_value.objects.get = MagicMock(return_value=dummy_user)
+        service_get_user_model_mock.return_value.objects.in_bulk = MagicMock(return_value={7: dummy_user})
+
+        (result1, extracted1) = render_and_extract(dummy_project, "cached @ginny")
+        (result2, extracted2) = render_and_extract(dummy_project, "cached @ginny")
+
+        assert get_user_model_mock.return_value.objects.get.call_count == 1
+        assert result1 == result2
+        assert extracted1["mentions"] == extracted2["mentions"] == [dummy_user]
+
+        # Only the ids are cached, the users are loaded on every use
+        assert service_get_user_model_mock.return_value.objects.in_bulk.call_count == 2
+        service_get_user_model_mock.return_value.objects.in_bulk.assert_called_with([7])
+        assert service._render_and_extract(dummy_project, "cached @ginny")[1]["mentions"] == [7]
+
+
+def test_render_reuses_the_converters_between_projects():
+    other_project = MagicMock()
+    other_project.id = 2
+    other_project.slug = "other"
+
+    service._markdown_pool.clear()
+    (result1, _) = service._convert(dummy_project, "[[Pool]]")
+    (result2, _) = service._convert(other_project, "[[Pool]]")
+
+    assert len(service._markdown_pool._converters) == 1
+    assert "http://localhost:9001/project/test/wiki/pool" in result1
+    assert "http://localhost:9001/project/other/wiki/pool" in result2
+
+
+def test_render_does_not_keep_the_abbreviations_between_texts():
+    service._markdown_pool.clear()
+    (result1, _) = service._convert(dummy_project, "*[HTML]: Hyper Text Markup Language\n\nHTML")
+    (result2, _) = service._convert(dummy_project, "HTML")
+
+    assert "Hyper Text Markup Language" in result1
+    assert result2 == "<p>HTML</p>"
+
+
 def test_get_diff_of_htmls_insertions():
     result = get_diff_of_htmls("", "<p>test</p>")
     assert result == "<ins style=\"background:#e6ffe6;\">&lt;p&gt;test&lt;/p&gt;</ins>"
@@ -246,9 +331,15 @@ def test_get_diff_of_htmls_modifications():
 
 
 def test_render_and_extract_references():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
+    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock, \
+            patch("taiga.mdrender.service.apps") as apps_mock:
         instance = mock.return_value
         instance.content_type.model = "issue"
         instance.content_object.subject = "test"
+        instance.content_object.pk = 3
+        instance.content_object._meta.app_label = "issues"
+        instance.content_object._meta.model_name = "issue"
+        apps_mock.get_model.return_value.objects.in_bulk.return_value = {3: instance.content_object}
         (_, extracted) = render_and_extract(dummy_project, "**#1**")
+        apps_mock.get_model.assert_called_with("issues", "issue")
         assert extracted['references'] == [instance.content_object]
@@ -186,3 +186,24 @@ def test_apply_order_invalid_new_order():
         "e": 5,
         "f": 6
     }
+
+
+def test_apply_order_updates_sparse_orders():
+    orders = {
+        "a": 1000,
+        "b": 2000,
+        "c": 2001,
+        "d": 3000,
+        "e": 4000,
+    }
+    new_orders = {
+        "e": 1500,
+        "a": 2000
+    }
+    apply_order_updates(orders, new_orders)
+    assert orders == {
+        "e": 1500,
+        "a": 2000,
+        "b": 2001,
+        "c": 2002
+    }
@@ -30,32 +30,32 @@ import pytest
 pytestmark = pytest.mark.django_db
 
 def test_push_to_timeline_many_objects():
-    with patch("taiga.timeline.service._add_to_object_timeline") as mock:
+    with patch("taiga.timeline.service._add_to_objects_timeline") as mock:
         users = [get_user_model(), get_user_model(), get_user_model()]
         owner = get_user_model()
         project = Project()
         service._push_to_timeline(users, project, "test", project.created_date)
-        assert mock.call_count == 3
+        assert mock.call_count == 1
         assert mock.mock_calls == [
-            call(users[0], project, "test", project.created_date, "default", {}),
-            call(users[1], project, "test", project.created_date, "default", {}),
-            call(users[2], project, "test", project.created_date, "default", {}),
+            call(users, project, "test", project.created_date, "default", {}),
         ]
         with pytest.raises(Exception):
             service._push_to_timeline(None, project, "test")
 
 
 def test_add_to_objects_timeline():
-    with patch("taiga.timeline.service._add_to_object_timeline") as mock:
+    with patch("taiga.timeline.service._build_timeline_entries") as build_mock, \
+            patch("taiga.timeline.service._save_timeline_entries") as save_mock:
         users = [get_user_model(), get_user_model(), get_user_model()]
         project = Project()
         service._add_to_objects_timeline(users, project, "test", project.created_date)
-        assert mock.call_count == 3
-        assert mock.mock_calls == [
-            call(users[0], project, "test", project.created_date, "default", {}),
-            call(users[1], project, "test", project.created_date, "default", {}),
-            call(users[2], project, "test", project.created_date, "default", {}),
+        assert build_mock.call_count == 1
+        assert build_mock.mock_calls == [
+            call([(users[0], "default"), (users[1], "default"), (users[2], "default")],
+                 project, "test", project.created_date, {}),
         ]
+        assert save_mock.call_count == 1
+        assert save_mock.mock_calls == [call(build_mock.return_value)]
         with pytest.raises(Exception):
             service._push_to_timeline(None, project, "test")
 
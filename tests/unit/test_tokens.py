@@ -19,6 +19,12 @@
 
 import pytest
 
+from unittest import mock
+
+from django.core import signing
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from .. import factories as f
 
 from taiga.base import exceptions as exc
@@ -53,3 +59,45 @@ def test_invalid_token_scope():
     user = f.UserFactory.create(email="old@email.com")
     token = get_token_for_user(user, "testing_scope")
     get_user_for_token(token, "testing_invalid_scope")
+
+
+def test_cached_token(settings, shared_cache):
+    settings.AUTH_TOKEN_CACHE = shared_cache
+    settings.AUTH_TOKEN_CACHE_TIMEOUT = 60
+    user = f.UserFactory.create(email="old@email.com")
+    token = get_token_for_user(user, "testing_scope")
+    assert get_user_for_token(token, "testing_scope", use_cache=True).id == user.id
+
+    with CaptureQueriesContext(connection) as captured, \
+            mock.patch("taiga.auth.tokens.signing.loads") as loads_mock:
+        user_from_token = get_user_for_token(token, "testing_scope", use_cache=True)
+    assert len(captured) == 0
+    assert loads_mock.call_count == 0
+    assert user_from_token.id == user.id
+    assert user_from_token.is_active
+
+    # The changes of the user discard the cached token
+    user.is_active = False
+    user.save()
+    assert not get_user_for_token(token, "testing_scope", use_cache=True).is_active
+
+
+def test_token_is_not_cached_in_a_local_cache(settings):
+    settings.AUTH_TOKEN_CACHE_TIMEOUT = 60
+    user = f.UserFactory.create(email="old@email.com")
+    token = get_token_for_user(user, "testing_scope")
+    get_user_for_token(token, "testing_scope", use_cache=True)
+
+    with mock.patch("taiga.auth.tokens.signing.loads", wraps=signing.loads) as loads_mock:
+        assert get_user_for_token(token, "testing_scope", use_cache=True).id == user.id
+    assert loads_mock.call_count == 1
+
+
+@pytest.mark.xfail(raises=exc.NotAuthenticated)
+def test_cached_token_scope(settings, shared_cache):
+    settings.AUTH_TOKEN_CACHE = shared_cache
+    settings.AUTH_TOKEN_CACHE_TIMEOUT = 60
+    user = f.UserFactory.create(email="old@email.com")
+    token = get_token_for_user(user, "testing_scope")
+    get_user_for_token(token, "testing_scope", use_cache=True)
+    get_user_for_token(token, "testing_invalid_scope", use_cache=True)